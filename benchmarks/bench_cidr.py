@@ -0,0 +1,53 @@
+"""Measure CIDR trie bulk loading, lookups and save/load times.
+
+Usage: python benchmarks/bench_cidr.py [prefixes]
+"""
+
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from l9format import Network
+from l9format.cidr import CidrTrie, Prefix
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    rng = random.Random(0)
+    networks = []
+    for i in range(count):
+        length = rng.choice((16, 20, 22, 24, 24, 24))
+        value = rng.getrandbits(length) << (32 - length)
+        networks.append(Network(f"org {i}", i, str(Prefix(4, value, length))))
+
+    start = time.perf_counter()
+    trie = CidrTrie.from_networks(networks)
+    elapsed = time.perf_counter() - start
+    print(f"bulk load     {count / elapsed:12.0f} prefixes/s")
+
+    ips = [
+        f"{rng.getrandbits(8)}.{rng.getrandbits(8)}."
+        f"{rng.getrandbits(8)}.{rng.getrandbits(8)}"
+        for _ in range(200000)
+    ]
+    start = time.perf_counter()
+    for ip in ips:
+        trie.lookup(ip)
+    elapsed = time.perf_counter() - start
+    print(f"lookup        {elapsed / len(ips) * 1e6:12.2f} us")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "networks.trie"
+        start = time.perf_counter()
+        trie.save(path)
+        print(f"save          {time.perf_counter() - start:12.2f} s")
+        start = time.perf_counter()
+        CidrTrie.load(path)
+        print(f"load          {time.perf_counter() - start:12.2f} s")
+        print(f"file size     {path.stat().st_size / 1e6:12.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
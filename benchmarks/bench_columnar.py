@@ -0,0 +1,60 @@
+"""Compare columnar export with flattening to_dict() output per event.
+
+Usage: python benchmarks/bench_columnar.py [count]
+"""
+
+import csv
+import io
+import json
+import sys
+import time
+from pathlib import Path
+
+from l9format import L9Event
+from l9format.columnar import to_columns, write_csv
+
+TESTS_DIR = Path(__file__).parent.parent / "tests"
+
+PATHS = ["ip", "port", "time", "http.status", "geoip.country_iso_code"]
+
+
+def naive_rows(events: list[L9Event]) -> list[list[object]]:
+    rows = []
+    for event in events:
+        d = event.to_dict()
+        row = []
+        for path in PATHS:
+            value = d
+            for part in path.split("."):
+                value = value.get(part) if isinstance(value, dict) else None
+            row.append(value)
+        rows.append(row)
+    return rows
+
+
+def naive_csv(events: list[L9Event]) -> None:
+    writer = csv.writer(io.StringIO())
+    writer.writerow(PATHS)
+    writer.writerows(naive_rows(events))
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    with open(TESTS_DIR / "l9event.json") as f:
+        event = L9Event.from_dict(json.load(f))
+    events = [event] * count
+    runs = [
+        ("to_dict() + flatten", lambda: naive_rows(events)),
+        ("to_columns()", lambda: to_columns(events, PATHS)),
+        ("to_dict() + csv", lambda: naive_csv(events)),
+        ("write_csv()", lambda: write_csv(events, io.StringIO(), PATHS)),
+    ]
+    for name, run in runs:
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+        print(f"{name:24} {count / elapsed:12.0f} events/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Measure the throughput of sort_events() against sorting in memory, with
+a memory budget forcing many runs, by number of workers.
+
+Usage: python benchmarks/bench_extsort.py [events] [memory MB]
+"""
+
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from l9format.extsort import sort_events
+from l9format.ndjson import EventWriter, iter_lines
+
+TESTS_DIR = Path(__file__).parent.parent / "tests"
+
+
+def write_input(path: str, count: int) -> None:
+    with open(TESTS_DIR / "l9event.json") as f:
+        raw = json.load(f)
+    rng = random.Random(0)
+    start = datetime(2021, 12, 19, tzinfo=timezone.utc)
+    with EventWriter(path) as writer:
+        for i in range(count):
+            raw["ip"] = f"10.{rng.randrange(256)}.{rng.randrange(256)}.1"
+            raw["port"] = str(rng.choice([22, 80, 443, 8080]))
+            raw["time"] = (start + timedelta(seconds=i)).isoformat()
+            raw["event_fingerprint"] = str(rng.randrange(count))
+            writer.write_line(json.dumps(raw))
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    memory = (int(sys.argv[2]) if len(sys.argv) > 2 else 16) << 20
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, "in.ndjson.gz")
+        output = os.path.join(directory, "out.ndjson.gz")
+        write_input(source, count)
+
+        start = time.perf_counter()
+        lines = list(iter_lines(source))
+        lines.sort(key=lambda line: _key(json.loads(line)))
+        with EventWriter(output) as writer:
+            for line in lines:
+                writer.write_line(line.rstrip("\n"))
+        elapsed = time.perf_counter() - start
+        print(f"in memory  {count / elapsed:10.0f} records/s")
+        del lines
+
+        for workers in sorted({1, 2, os.cpu_count() or 1}):
+            done = sort_events(
+                source,
+                output,
+                dedup="event_fingerprint",
+                memory=memory,
+                workers=workers,
+                tmpdir=directory,
+            )
+            print(
+                f"{workers:2} workers {done.rate:10.0f} records/s"
+                f" {done.runs:6} runs {done.duplicates:8} duplicates"
+            )
+
+
+def _key(d: dict) -> tuple:
+    return d["ip"], d["port"], d["time"]
+
+
+if __name__ == "__main__":
+    main()
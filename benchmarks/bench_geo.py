@@ -0,0 +1,66 @@
+"""Measure GeoPoint decoding per representation and bulk geo filters.
+
+Usage: python benchmarks/bench_geo.py [events]
+"""
+
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+from l9format import GeoPoint, L9Event
+from l9format.geo import GeoBatch
+
+TESTS_DIR = Path(__file__).parent.parent / "tests"
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    rng = random.Random(0)
+    points = [
+        {
+            "lat": f"{rng.uniform(-90, 90):.6f}",
+            "lon": f"{rng.uniform(-180, 180):.6f}",
+        }
+        for _ in range(count)
+    ]
+
+    for representation in ("decimal", "float"):
+        floats = representation == "float"
+        start = time.perf_counter()
+        decoded = [
+            GeoPoint.from_dict(d, float_coordinates=floats) for d in points
+        ]
+        elapsed = time.perf_counter() - start
+        print(f"decode {representation:8} {count / elapsed:12.0f} points/s")
+        start = time.perf_counter()
+        for point in decoded:
+            point.to_dict()
+        elapsed = time.perf_counter() - start
+        print(f"encode {representation:8} {count / elapsed:12.0f} points/s")
+
+    with open(TESTS_DIR / "l9event.json") as f:
+        event = L9Event.from_dict(json.load(f))
+    events = [
+        event.evolve(geoip=event.geoip.evolve(location=point))
+        for point in decoded
+    ]
+    for vectorize in (False, True):
+        try:
+            batch = GeoBatch(events, vectorize=vectorize)
+        except ImportError:
+            continue
+        name = "numpy" if vectorize else "python"
+        start = time.perf_counter()
+        batch.in_bbox(34.0, -25.0, 72.0, 45.0)
+        elapsed = time.perf_counter() - start
+        print(f"bbox   {name:8} {count / elapsed:12.0f} points/s")
+        start = time.perf_counter()
+        batch.within(48.8566, 2.3522, 500)
+        elapsed = time.perf_counter() - start
+        print(f"radius {name:8} {count / elapsed:12.0f} points/s")
+
+
+if __name__ == "__main__":
+    main()
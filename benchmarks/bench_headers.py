@@ -0,0 +1,82 @@
+"""Compare the memory held by HTTP headers as dicts and as HeaderMaps.
+
+Usage: python benchmarks/bench_headers.py [events]
+"""
+
+import json
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable
+
+from l9format import HeaderMap, L9Event
+
+TESTS_DIR = Path(__file__).parent.parent / "tests"
+
+NAMES = [
+    "Server",
+    "Date",
+    "Content-Type",
+    "Content-Length",
+    "Connection",
+    "Cache-Control",
+    "Last-Modified",
+    "ETag",
+    "Accept-Ranges",
+    "X-Powered-By",
+    "X-Frame-Options",
+    "Strict-Transport-Security",
+    "Set-Cookie",
+    "Vary",
+]
+
+
+def held(build: Callable[[], Any]) -> tuple[float, int]:
+    tracemalloc.start()
+    start = time.perf_counter()
+    kept = build()
+    elapsed = time.perf_counter() - start
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+    return elapsed, size
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    rng = random.Random(0)
+    layouts = [rng.sample(NAMES, rng.randint(4, 10)) for _ in range(30)]
+    lines = []
+    for i in range(count):
+        names = rng.choice(layouts)
+        values = ["nginx", "Mon, 18 Oct 2021", "text/html", str(i), "close"]
+        lines.append(json.dumps({n: rng.choice(values) for n in names}))
+
+    with open(TESTS_DIR / "l9event.json") as f:
+        raw = json.load(f)
+    documents = []
+    for line in lines:
+        document = dict(raw)
+        document["http"] = dict(raw["http"], header=json.loads(line))
+        documents.append(json.dumps(document))
+
+    for name, build in (
+        ("dict", lambda: [json.loads(line) for line in lines]),
+        ("HeaderMap", lambda: [HeaderMap(json.loads(line)) for line in lines]),
+    ):
+        elapsed, size = held(build)
+        print(
+            f"{name:10} {size / count:8.0f} B/header set "
+            f"{count / elapsed:10.0f} sets/s"
+        )
+    elapsed, size = held(lambda: [L9Event.from_json(d) for d in documents])
+    print(
+        f"events     {size / count:8.0f} B/event      "
+        f"{count / elapsed:10.0f} events/s"
+    )
+
+
+if __name__ == "__main__":
+    main()
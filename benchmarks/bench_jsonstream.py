@@ -0,0 +1,60 @@
+"""Compare json.load with incremental parsing of a large aggregation.
+
+Usage: python benchmarks/bench_jsonstream.py [events]
+"""
+
+import json
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from l9format import L9Event
+from l9format.jsonstream import iter_models
+
+TESTS_DIR = Path(__file__).parent.parent / "tests"
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    with open(TESTS_DIR / "l9event.json") as f:
+        event = json.load(f)
+    raw = {
+        "ip": "127.0.0.1",
+        "open_ports": ["80", "443"],
+        "events": [dict(event, port=str(i)) for i in range(count)],
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "aggregation.json"
+        with open(path, "w") as f:
+            json.dump(raw, f)
+        del raw
+        size = path.stat().st_size
+        print(f"document      {size / 1e6:10.1f} MB")
+
+        def full() -> None:
+            with open(path) as f:
+                for d in json.load(f)["events"]:
+                    L9Event.from_dict(d)
+
+        def incremental() -> None:
+            with open(path, "rb") as f:
+                for _ in iter_models(f, path="events"):
+                    pass
+
+        for name, run in (("json.load", full), ("iter_models", incremental)):
+            tracemalloc.start()
+            start = time.perf_counter()
+            run()
+            elapsed = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(
+                f"{name:12} {count / elapsed:10.0f} events/s "
+                f"peak {peak / 1e6:8.1f} MB"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""Compare eager and lazy decoding of large L9Aggregation documents.
+
+Usage: python benchmarks/bench_lazy.py [events]
+"""
+
+import json
+import sys
+import time
+from pathlib import Path
+
+from l9format import L9Aggregation
+
+TESTS_DIR = Path(__file__).parent.parent / "tests"
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    with open(TESTS_DIR / "l9event.json") as f:
+        event = json.load(f)
+    raw = {
+        "ip": "127.0.0.1",
+        "resource_id": "r",
+        "open_ports": ["80", "443"],
+        "leak_count": 1,
+        "leak_event_count": count,
+        "events": [event] * count,
+        "plugins": [],
+        "geoip": event["geoip"],
+        "network": event["network"],
+        "creation_date": event["time"],
+        "update_date": event["time"],
+        "fresh": False,
+    }
+
+    for lazy in (False, True):
+        name = "lazy" if lazy else "eager"
+        start = time.perf_counter()
+        agg = L9Aggregation.from_dict(raw, lazy_events=lazy)
+        elapsed = time.perf_counter() - start
+        print(f"{name:6} from_dict     {elapsed * 1e3:10.2f} ms")
+        start = time.perf_counter()
+        for item in agg.events:
+            item.port
+        elapsed = time.perf_counter() - start
+        print(f"{name:6} iterate       {elapsed * 1e3:10.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
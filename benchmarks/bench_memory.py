@@ -0,0 +1,46 @@
+"""Compare memory_footprint() estimates with tracemalloc, and the cost of
+sampling.
+
+Usage: python benchmarks/bench_memory.py [events]
+"""
+
+import glob
+import json
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+from l9format import L9Event
+from l9format.memory import batch_footprint
+
+TESTS_DIR = Path(__file__).parent.parent / "tests"
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    texts = []
+    for path in sorted(glob.glob(str(TESTS_DIR / "l9event*.json"))):
+        with open(path) as f:
+            texts.append(f.read())
+    tracemalloc.start()
+    events = [
+        L9Event.from_dict(json.loads(texts[i % len(texts)]))
+        for i in range(count)
+    ]
+    traced = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f"tracemalloc       {traced / count:10.0f} bytes/event")
+    for sample in (None, 1000, 100):
+        start = time.perf_counter()
+        fp = batch_footprint(events, sample=sample, seed=0)
+        elapsed = time.perf_counter() - start
+        label = "full" if sample is None else f"sample {sample}"
+        print(
+            f"{label:16} {fp.per_model:10.0f} bytes/event"
+            f" {elapsed * 1000:10.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Compare merge_events() with loading every file and sorting, in time and
+memory, over time-ordered NDJSON files.
+
+Usage: python benchmarks/bench_merge.py [files] [events per file]
+"""
+
+import json
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable
+
+from l9format.merge import merge_events
+from l9format.ndjson import read_dicts
+
+TESTS_DIR = Path(__file__).parent.parent / "tests"
+
+
+def write_files(directory: str, files: int, count: int) -> list[Path]:
+    with open(TESTS_DIR / "l9event.json") as f:
+        raw = json.load(f)
+    rng = random.Random(0)
+    start = datetime(2021, 12, 19, tzinfo=timezone.utc)
+    paths = []
+    for n in range(files):
+        path = Path(directory) / f"node{n}.ndjson"
+        t = start
+        with open(path, "w") as f:
+            for _ in range(count):
+                t += timedelta(milliseconds=rng.randrange(1000))
+                raw["time"] = t.isoformat()
+                f.write(json.dumps(raw) + "\n")
+        paths.append(path)
+    return paths
+
+
+def measure(label: str, run: Callable[[], int]) -> None:
+    """Time a run, then trace the memory of another one."""
+    start = time.perf_counter()
+    count = run()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    run()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(
+        f"{label:12} {count / elapsed:10.0f} records/s"
+        f" {peak / 1e6:10.1f} MB peak"
+    )
+
+
+def main() -> None:
+    files = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+    with tempfile.TemporaryDirectory() as directory:
+        paths = write_files(directory, files, count)
+
+        def sort() -> int:
+            records = [d for path in paths for d in read_dicts(path)]
+            records.sort(key=lambda d: d["time"])
+            return len(records)
+
+        def merge() -> int:
+            return sum(1 for _ in merge_events(paths, decode=False))
+
+        # Decoding dominates; one file is enough to measure it.
+        def decode() -> int:
+            return sum(1 for _ in merge_events(paths[:1]))
+
+        measure("sort", sort)
+        measure("merge", merge)
+        measure("merge+decode", decode)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Measure the cost of metrics on decoding and encoding.
+
+Usage: python benchmarks/bench_metrics.py [events]
+"""
+
+import glob
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Callable
+
+from l9format import L9Event, metrics
+from l9format.encoder import dumps
+
+TESTS_DIR = Path(__file__).parent.parent / "tests"
+
+
+def best(run: Callable[[], object], repeat: int = 5) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    raws = []
+    for path in sorted(glob.glob(str(TESTS_DIR / "l9event*.json"))):
+        with open(path) as f:
+            raws.append(json.load(f))
+    raws = [raws[i % len(raws)] for i in range(count)]
+    events = [L9Event.from_dict(d) for d in raws]
+
+    def decode() -> None:
+        for d in raws:
+            L9Event.from_dict(d)
+
+    def encode() -> None:
+        for event in events:
+            dumps(event)
+
+    for name, run in (("decode", decode), ("encode", encode)):
+        metrics.disable()
+        off = best(run)
+        registry = metrics.enable()
+        on = best(run)
+        metrics.disable()
+        print(
+            f"{name}: {off / count * 1e6:7.1f} us/event disabled,"
+            f" {on / count * 1e6:7.1f} us/event enabled"
+            f" ({(on / off - 1) * 100:+.1f}%)"
+        )
+    print(registry.render().count("\n"), "lines of exposition")
+
+
+if __name__ == "__main__":
+    main()
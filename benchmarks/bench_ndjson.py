@@ -0,0 +1,56 @@
+"""Compare EventWriter throughput with a naive per-event write loop.
+
+Usage: python benchmarks/bench_ndjson.py [count]
+"""
+
+import gzip
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from l9format import L9Event
+from l9format.ndjson import EventWriter
+
+TESTS_DIR = Path(__file__).parent.parent / "tests"
+
+
+def naive(events: list[L9Event], path: Path) -> None:
+    with gzip.open(path, "wt") as fp:
+        for ev in events:
+            fp.write(ev.to_json() + "\n")
+
+
+def buffered(events: list[L9Event], path: Path, level: int) -> None:
+    with EventWriter(path, level=level) as writer:
+        writer.write_many(events)
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    with open(TESTS_DIR / "l9event.json") as f:
+        event = L9Event.from_dict(json.load(f))
+    events = [event] * count
+    with tempfile.TemporaryDirectory() as tmp:
+        runs = [("naive gzip", lambda p: naive(events, p))]
+        for level in (1, 6, 9):
+            runs.append(
+                (
+                    f"EventWriter gzip level={level}",
+                    lambda p, lv=level: buffered(events, p, lv),
+                )
+            )
+        for name, run in runs:
+            path = Path(tmp) / "out.ndjson.gz"
+            start = time.perf_counter()
+            run(path)
+            elapsed = time.perf_counter() - start
+            print(
+                f"{name:32} {count / elapsed:12.0f} events/s "
+                f"{path.stat().st_size:12d} bytes"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Compare trigram index queries with scans of the text, and time building,
+saving and loading the index.
+
+Usage: python benchmarks/bench_ngram.py [events]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+from l9format.ngram import TrigramIndex
+
+PRODUCTS = ["OpenSSH", "dropbear", "ProFTPD", "vsFTPd", "Postfix", "Exim"]
+QUERIES = ["openssh_7.4", "dropbear_2019", "exim 4.9", "ssh"]
+
+
+def records(count: int) -> list[dict]:
+    rng = random.Random(0)
+    result = []
+    for _ in range(count):
+        product = rng.choice(PRODUCTS)
+        version = f"{rng.randrange(10)}.{rng.randrange(100)}"
+        result.append(
+            {
+                "ssh": {"banner": f"SSH-2.0-{product}_{version}"},
+                "http": {"title": f"{product} admin {rng.randrange(10**6)}"},
+            }
+        )
+    return result
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    items = records(count)
+    fields = ["ssh.banner", "http.title"]
+    start = time.perf_counter()
+    index = TrigramIndex(fields)
+    index.extend(items)
+    print(f"build  {count / (time.perf_counter() - start):10.0f} events/s")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "index.l9ngram")
+        start = time.perf_counter()
+        index.save(path)
+        saved = time.perf_counter() - start
+        start = time.perf_counter()
+        index = TrigramIndex.load(path)
+        loaded = time.perf_counter() - start
+        size = os.path.getsize(path) / 1e6
+        print(f"save   {saved:10.2f} s, load {loaded:.2f} s, {size:.1f} MB")
+    texts = [
+        [d["ssh"]["banner"].casefold(), d["http"]["title"].casefold()]
+        for d in items
+    ]
+    for query in QUERIES:
+        start = time.perf_counter()
+        scanned = [
+            i
+            for i, values in enumerate(texts)
+            if any(query in v for v in values)
+        ]
+        scan = time.perf_counter() - start
+        start = time.perf_counter()
+        rows = index.search(query)
+        indexed = time.perf_counter() - start
+        assert rows == scanned
+        print(
+            f"{query!r:16} {len(rows):8} rows  scan {scan * 1000:8.1f} ms"
+            f"  index {indexed * 1000:8.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
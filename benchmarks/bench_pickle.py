@@ -0,0 +1,78 @@
+"""Compare payload size and speed of model pickling strategies.
+
+"default" is the dataclass pickling used before models defined
+``__reduce__``: a class reference and a dict of attributes per object.
+
+Usage: python benchmarks/bench_pickle.py [events]
+"""
+
+import copyreg
+import gc
+import io
+import json
+import pickle
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable
+
+from l9format import L9Event
+from l9format.l9format import Model
+from l9format.pickling import dumps_batch, loads_batch
+
+TESTS_DIR = Path(__file__).parent.parent / "tests"
+
+
+class DefaultPickler(pickle.Pickler):
+    def reducer_override(self, obj: Any) -> Any:
+        if isinstance(obj, Model):
+            return copyreg.__newobj__, (type(obj),), dict(vars(obj))
+        return NotImplemented
+
+
+def default_dumps(models: list[Model]) -> bytes:
+    buffer = io.BytesIO()
+    DefaultPickler(buffer, pickle.HIGHEST_PROTOCOL).dump(models)
+    return buffer.getvalue()
+
+
+def reduce_dumps(models: list[Model]) -> bytes:
+    return pickle.dumps(models, pickle.HIGHEST_PROTOCOL)
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    raws = []
+    for path in sorted(TESTS_DIR.glob("l9event*.json")):
+        with open(path) as f:
+            raws.append(json.load(f))
+    events = [L9Event.from_dict(raws[i % len(raws)]) for i in range(count)]
+
+    strategies: list[tuple[str, Callable[..., bytes], Callable[..., Any]]] = [
+        ("default", default_dumps, pickle.loads),
+        ("__reduce__", reduce_dumps, pickle.loads),
+        ("dumps_batch", dumps_batch, loads_batch),
+    ]
+    # As timeit does, keep the garbage collector from skewing the timings.
+    gc.disable()
+    for name, dumps, loads in strategies:
+        dumps_time = loads_time = float("inf")
+        for _ in range(3):
+            start = time.perf_counter()
+            data = dumps(events)
+            dumped = time.perf_counter()
+            loaded = loads(data)
+            end = time.perf_counter()
+            dumps_time = min(dumps_time, dumped - start)
+            loads_time = min(loads_time, end - dumped)
+        assert loaded == events
+        print(
+            f"{name:12} {len(data) / count:8.0f} B/event "
+            f"dumps {dumps_time / count * 1e6:7.1f} us "
+            f"loads {loads_time / count * 1e6:7.1f} us"
+        )
+    gc.enable()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Compare sending event batches to another process through a pipe and
+through shared memory.
+
+Both transports have the child decode every event of every batch.
+
+Usage: python benchmarks/bench_shm.py [batches] [batch size]
+"""
+
+import json
+import multiprocessing
+import sys
+import time
+from multiprocessing.connection import Connection
+from pathlib import Path
+
+from l9format import L9Event
+from l9format.shm import SegmentRing, SharedBatch
+
+TESTS_DIR = Path(__file__).parent.parent / "tests"
+
+
+def pipe_reader(conn: Connection) -> None:
+    while True:
+        batch = conn.recv()
+        if batch is None:
+            return
+        conn.send(len(batch))
+
+
+def shm_reader(conn: Connection) -> None:
+    while True:
+        handle = conn.recv()
+        if handle is None:
+            return
+        with SharedBatch(handle) as batch:
+            count = sum(1 for _ in batch)
+            batch.release()
+        conn.send(count)
+
+
+def main() -> None:
+    batches = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    size = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    raws = []
+    for path in sorted(TESTS_DIR.glob("l9event*.json")):
+        with open(path) as f:
+            raws.append(json.load(f))
+    events = [L9Event.from_dict(raws[i % len(raws)]) for i in range(size)]
+    context = multiprocessing.get_context("fork")
+
+    conn, child = context.Pipe()
+    process = context.Process(target=pipe_reader, args=(child,))
+    process.start()
+    start = time.perf_counter()
+    for _ in range(batches):
+        conn.send(events)
+        conn.recv()
+    elapsed = time.perf_counter() - start
+    conn.send(None)
+    process.join()
+    print(f"pipe          {batches * size / elapsed:10.0f} events/s")
+
+    with SegmentRing(segments=4, segment_size=64 << 20) as ring:
+        conn, child = context.Pipe()
+        process = context.Process(target=shm_reader, args=(child,))
+        process.start()
+        start = time.perf_counter()
+        pending = 0
+        for _ in range(batches):
+            conn.send(ring.write(events))
+            pending += 1
+            # Keep the writer at most a ring ahead of the reader.
+            if pending == len(ring):
+                conn.recv()
+                pending -= 1
+        for _ in range(pending):
+            conn.recv()
+        elapsed = time.perf_counter() - start
+        conn.send(None)
+        process.join()
+    print(f"shared memory {batches * size / elapsed:10.0f} events/s")
+
+
+if __name__ == "__main__":
+    main()
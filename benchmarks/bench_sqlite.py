@@ -0,0 +1,52 @@
+"""Compare EventStore bulk loading with one INSERT per event.
+
+Usage: python benchmarks/bench_sqlite.py [count]
+"""
+
+import json
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+from l9format import L9Event
+from l9format.sqlite import EventStore
+
+TESTS_DIR = Path(__file__).parent.parent / "tests"
+
+
+def naive(events: list[L9Event]) -> None:
+    connection = sqlite3.connect(":memory:")
+    connection.execute(
+        "CREATE TABLE events (ip TEXT, port TEXT, protocol TEXT, doc TEXT)"
+    )
+    for event in events:
+        connection.execute(
+            "INSERT INTO events VALUES (?, ?, ?, ?)",
+            (event.ip, event.port, event.protocol, event.to_json()),
+        )
+        connection.commit()
+
+
+def bulk(events: list[L9Event]) -> None:
+    with EventStore(":memory:", indexes=()) as store:
+        store.insert_many(events)
+        store.create_indexes()
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    for name in ("l9event.json", "l9event_ip4scout_20211219_0.json"):
+        with open(TESTS_DIR / name) as f:
+            event = L9Event.from_dict(json.load(f))
+        events = [event] * count
+        print(name)
+        for label, run in (("row per commit", naive), ("EventStore", bulk)):
+            start = time.perf_counter()
+            run(events)
+            elapsed = time.perf_counter() - start
+            print(f"  {label:16} {count / elapsed:12.0f} events/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Compare FieldStats with exact counting, in time and memory, over a
+stream of raw events.
+
+Usage: python benchmarks/bench_stats.py [events]
+"""
+
+import json
+import random
+import sys
+import time
+import tracemalloc
+from collections import Counter
+from pathlib import Path
+from typing import Callable, cast
+
+from l9format.fields import path_getter
+from l9format.stats import FieldStats
+
+TESTS_DIR = Path(__file__).parent.parent / "tests"
+PATHS = ["port", "geoip.country_iso_code", "ip"]
+
+
+def events(count: int) -> list[dict]:
+    with open(TESTS_DIR / "l9event.json") as f:
+        raw = json.load(f)
+    rng = random.Random(0)
+    records = []
+    for _ in range(count):
+        record = json.loads(json.dumps(raw))
+        record["port"] = str(int(rng.paretovariate(1.2)) % 65536)
+        record["ip"] = ".".join(str(rng.randrange(256)) for _ in range(4))
+        record["geoip"]["country_iso_code"] = f"C{int(rng.expovariate(0.1))}"
+        records.append(record)
+    return records
+
+
+def measure(label: str, make: Callable[[], Callable[[], object]]) -> None:
+    """Time a run, then trace the memory of another one."""
+    run = make()
+    start = time.perf_counter()
+    run()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    make()()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(f"{label:8} {elapsed:8.2f} s {peak / 1e6:10.1f} MB peak")
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    records = events(count)
+    getters = [path_getter(p) for p in PATHS]
+    results: dict[str, object] = {}
+
+    def exact() -> Callable[[], object]:
+        counters = results["exact"] = [Counter[object]() for _ in PATHS]
+
+        def run() -> None:
+            for record in records:
+                for get, counter in zip(getters, counters):
+                    counter[get(record)] += 1
+
+        return run
+
+    def sketch() -> Callable[[], object]:
+        stats = results["sketch"] = FieldStats(top=PATHS[:2], distinct=PATHS)
+        return lambda: stats.update(records)
+
+    measure("exact", exact)
+    measure("sketch", sketch)
+    counters = cast(list[Counter[object]], results["exact"])
+    stats = cast(FieldStats, results["sketch"])
+    for path, counter in zip(PATHS, counters):
+        print(
+            f"{path}: {len(counter)} distinct, {stats.distinct(path)} estimated"
+        )
+    print("top ports, exact:", counters[0].most_common(5))
+    print("top ports, sketch:", [tuple(i) for i in stats.top("port", 5)])
+
+
+if __name__ == "__main__":
+    main()
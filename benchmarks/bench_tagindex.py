@@ -0,0 +1,52 @@
+"""Compare tag queries on bitmaps with scans of the tag lists.
+
+Usage: python benchmarks/bench_tagindex.py [events]
+"""
+
+import random
+import sys
+import time
+from typing import Callable
+
+from l9format.tagindex import TagIndex
+
+TAGS = [f"cve-{i}" for i in range(40)] + ["honeypot", "tor", "cdn", "scanner"]
+
+
+def measure(label: str, count: int, run: Callable[[], int]) -> None:
+    start = time.perf_counter()
+    matched = run()
+    elapsed = time.perf_counter() - start
+    print(f"{label:16} {count / elapsed / 1e6:8.2f} M rows/s {matched:8} rows")
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    rng = random.Random(0)
+    tags = [rng.sample(TAGS, rng.randrange(6)) for _ in range(count)]
+    start = time.perf_counter()
+    index = TagIndex()
+    for t in tags:
+        index.add_tags(t)
+    print(
+        f"{'encode':16} {count / (time.perf_counter() - start) / 1e6:8.2f}"
+        " M rows/s"
+    )
+    wanted = ("honeypot", "cve-7")
+
+    def scan() -> int:
+        return sum(1 for t in tags if all(tag in t for tag in wanted))
+
+    measure("list scan", count, scan)
+    measure("bitmap", count, lambda: index.count(all_of=wanted))
+    try:
+        import numpy  # noqa: F401
+    except ImportError:
+        return
+    bits = index.to_numpy()
+    query = index.dictionary.query(all_of=wanted)
+    measure("numpy", count, lambda: int(query.matches_array(bits).sum()))
+
+
+if __name__ == "__main__":
+    main()
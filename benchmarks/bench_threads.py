@@ -0,0 +1,46 @@
+"""Measure batch decoding throughput as the number of threads grows.
+
+Run it on a regular and on a free-threaded interpreter (3.13t/3.14t) to
+compare scaling. Usage: python benchmarks/bench_threads.py [count]
+"""
+
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+from l9format.batch import decode_batch, decode_batch_parallel
+
+TESTS_DIR = Path(__file__).parent.parent / "tests"
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    with open(TESTS_DIR / "l9event.json") as f:
+        line = json.dumps(json.load(f))
+    lines = [line] * count
+    is_gil_enabled = getattr(sys, "_is_gil_enabled", lambda: True)
+    print(
+        f"Python {sys.version.split()[0]}, "
+        f"GIL {'enabled' if is_gil_enabled() else 'disabled'}, "
+        f"{os.cpu_count()} CPUs"
+    )
+    start = time.perf_counter()
+    decode_batch(lines)
+    baseline = count / (time.perf_counter() - start)
+    print(f"{'sequential':>12} {baseline:12.0f} events/s")
+    threads = 1
+    while threads <= (os.cpu_count() or 1) * 2:
+        start = time.perf_counter()
+        decode_batch_parallel(lines, workers=threads)
+        rate = count / (time.perf_counter() - start)
+        print(
+            f"{threads:>4} threads {rate:12.0f} events/s "
+            f"x{rate / baseline:.2f}"
+        )
+        threads *= 2
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,7 @@ from importlib.metadata import version
 
 __version__ = version("l9format")
 
+from l9format.headers import HeaderMap
 from l9format.l9format import (
     Certificate,
     DatasetSummary,
@@ -35,12 +36,14 @@ from l9format.l9format import (
     SoftwareModule,
     ValidationError,
 )
+from l9format.lazy import LazyList
 
 __all__ = [
     "Certificate",
     "DatasetSummary",
     "GeoLocation",
     "GeoPoint",
+    "HeaderMap",
     "L9Aggregation",
     "L9AMQPEvent",
     "L9DNSEvent",
@@ -63,6 +66,7 @@ __all__ = [
     "L9SSLEvent",
     "L9TelnetEvent",
     "L9VNCEvent",
+    "LazyList",
     "Network",
     "ServiceCredentials",
     "Software",
@@ -0,0 +1,5 @@
+import sys
+
+from l9format.cli import main
+
+sys.exit(main())
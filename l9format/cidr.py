@@ -0,0 +1,433 @@
+"""Integer IP addresses, ports and CIDR longest-prefix matching.
+
+``parse_ip()``, ``parse_port()`` and ``parse_cidr()`` turn the string
+fields of the models into integers; ``L9Event.ip_int``, ``L9Event.port_int``
+and ``Network.prefix`` cache their results on the instance.
+
+``CidrTrie`` is a path-compressed binary (Patricia) trie mapping IPv4 and
+IPv6 prefixes to values, typically ``Network`` models, for longest-prefix
+match. Nodes live in flat arrays, so millions of prefixes can be loaded,
+and ``save()``/``load()`` write and read those arrays directly instead of
+re-inserting every prefix at startup.
+"""
+
+import array
+import ipaddress
+import json
+import os
+import socket
+import struct
+import sys
+from typing import IO, Any, Iterable, NamedTuple, Optional, Union
+
+from l9format.l9format import Model, Network
+
+_MAGIC = b"L9CIDR1\n"
+_WIDTHS = {4: 32, 6: 128}
+
+
+class Prefix(NamedTuple):
+    """An IP network as integers."""
+
+    version: int
+    value: int
+    length: int
+
+    def __contains__(self, address: object) -> bool:
+        if not isinstance(address, str):
+            return False
+        parsed = parse_ip(address)
+        if parsed is None or parsed[0] != self.version:
+            return False
+        shift = _WIDTHS[self.version] - self.length
+        return parsed[1] >> shift == self.value >> shift
+
+    def __str__(self) -> str:
+        network = ipaddress.ip_network((self.value, self.length))
+        return str(network)
+
+
+def parse_ip(text: object) -> Optional[tuple[int, int]]:
+    """Return ``(version, value)`` of an IP address string, or ``None``
+    when ``text`` is not an IP address."""
+    if not isinstance(text, str):
+        return None
+    try:
+        return 4, int.from_bytes(socket.inet_pton(socket.AF_INET, text), "big")
+    except OSError:
+        pass
+    try:
+        address = ipaddress.ip_address(text)
+    except ValueError:
+        return None
+    return address.version, int(address)
+
+
+def parse_port(text: object) -> Optional[int]:
+    """Return the port number in ``text``, or ``None`` when it is not a
+    decimal number between 0 and 65535. Signs, blanks and underscores,
+    which ``int()`` would accept, are rejected."""
+    if not isinstance(text, str) or not (text.isascii() and text.isdigit()):
+        return None
+    try:
+        port = int(text)
+    except ValueError:
+        # More digits than int() converts.
+        return None
+    return port if port <= 65535 else None
+
+
+def parse_cidr(text: object) -> Optional[Prefix]:
+    """Return the ``Prefix`` of a CIDR string, or ``None`` when ``text``
+    is not one. Host bits are cleared and a bare address is a full-length
+    prefix."""
+    if not isinstance(text, str) or not text:
+        return None
+    address, slash, length = text.partition("/")
+    try:
+        value = int.from_bytes(socket.inet_pton(socket.AF_INET, address), "big")
+    except OSError:
+        pass
+    else:
+        # Netmask forms such as "/255.255.0.0" are left to ipaddress.
+        if not slash or (length.isascii() and length.isdigit()):
+            bits = int(length) if slash else 32
+            if bits > 32:
+                return None
+            return Prefix(4, value >> (32 - bits) << (32 - bits), bits)
+    try:
+        network = ipaddress.ip_network(text, strict=False)
+    except ValueError:
+        return None
+    return Prefix(
+        network.version, int(network.network_address), network.prefixlen
+    )
+
+
+class _Tree:
+    """Patricia trie over ``width``-bit keys.
+
+    Node ``i`` holds the prefix ``keys[i]`` (left-aligned, host bits
+    cleared) of ``lengths[i]`` bits, its children by next bit in
+    ``zero``/``one`` (-1 when absent) and the index of its value in
+    ``values`` (-1 for internal nodes). Node 0 is the root, the empty
+    prefix.
+    """
+
+    def __init__(self, width: int) -> None:
+        self.width = width
+        self.keys: list[int] = [0]
+        self.lengths = array.array("B", [0])
+        self.zero = array.array("i", [-1])
+        self.one = array.array("i", [-1])
+        self.values = array.array("i", [-1])
+
+    def _node(self, key: int, length: int, value: int) -> int:
+        self.keys.append(key)
+        self.lengths.append(length)
+        self.zero.append(-1)
+        self.one.append(-1)
+        self.values.append(value)
+        return len(self.keys) - 1
+
+    def _bit(self, key: int, index: int) -> int:
+        return (key >> (self.width - 1 - index)) & 1
+
+    def _link(self, parent: int, bit: int, child: int) -> None:
+        (self.one if bit else self.zero)[parent] = child
+
+    def insert(self, key: int, length: int, value: int) -> int:
+        """Set the value of a prefix and return the index of the value it
+        replaced, or -1."""
+        width = self.width
+        keys, lengths = self.keys, self.lengths
+        zero, one = self.zero, self.one
+        node = 0
+        while True:
+            node_length = lengths[node]
+            if node_length == length:
+                old = self.values[node]
+                self.values[node] = value
+                return old
+            bit = (key >> (width - 1 - node_length)) & 1
+            child = one[node] if bit else zero[node]
+            if child < 0:
+                self._link(node, bit, self._node(key, length, value))
+                return -1
+            child_length = lengths[child]
+            if child_length <= length and not (
+                (key ^ keys[child]) >> (width - child_length)
+            ):
+                node = child
+                continue
+            common = min(
+                length, child_length, width - (key ^ keys[child]).bit_length()
+            )
+            if common == length:
+                new = self._node(key, length, value)
+                self._link(new, self._bit(keys[child], length), child)
+                self._link(node, bit, new)
+                return -1
+            mask = ((1 << common) - 1) << (width - common)
+            split = self._node(key & mask, common, -1)
+            self._link(split, self._bit(keys[child], common), child)
+            self._link(
+                split, self._bit(key, common), self._node(key, length, value)
+            )
+            self._link(node, bit, split)
+            return -1
+
+    def lookup(self, address: int) -> int:
+        """Return the node of the longest prefix containing ``address``
+        that has a value, or -1."""
+        width = self.width
+        keys, lengths = self.keys, self.lengths
+        zero, one, values = self.zero, self.one, self.values
+        node = 0
+        best = 0 if values[0] >= 0 else -1
+        while True:
+            length = lengths[node]
+            if length == width:
+                return best
+            bit = (address >> (width - 1 - length)) & 1
+            child = one[node] if bit else zero[node]
+            if child < 0:
+                return best
+            if (address ^ keys[child]) >> (width - lengths[child]):
+                return best
+            node = child
+            if values[node] >= 0:
+                best = node
+
+    def dump(self) -> list[bytes]:
+        size = self.width // 8
+        arrays = [self.lengths, self.zero, self.one, self.values]
+        if sys.byteorder == "big":
+            arrays = [array.array(a.typecode, a) for a in arrays]
+            for a in arrays:
+                a.byteswap()
+        keys = b"".join(k.to_bytes(size, "big") for k in self.keys)
+        return [keys] + [a.tobytes() for a in arrays]
+
+    @classmethod
+    def load(cls, width: int, count: int, fp: IO[bytes]) -> "_Tree":
+        tree = cls(width)
+        size = width // 8
+        data = _read(fp, count * size)
+        if width == 32:
+            keys = array.array("I")
+            keys.frombytes(data)
+            if sys.byteorder == "little":
+                keys.byteswap()
+            tree.keys = keys.tolist()
+        else:
+            unpack = struct.Struct(">QQ").iter_unpack
+            tree.keys = [hi << 64 | lo for hi, lo in unpack(data)]
+        for name in ("lengths", "zero", "one", "values"):
+            a = array.array(getattr(tree, name).typecode)
+            a.frombytes(_read(fp, count * a.itemsize))
+            if sys.byteorder == "big":
+                a.byteswap()
+            setattr(tree, name, a)
+        return tree
+
+
+def _read(fp: IO[bytes], size: int) -> bytes:
+    data = fp.read(size)
+    if len(data) != size:
+        raise ValueError("truncated CIDR trie file")
+    return data
+
+
+class CidrTrie:
+    """Longest-prefix match of IP addresses against CIDR prefixes.
+
+    ::
+
+        trie = CidrTrie.from_networks(networks)
+        network = trie.lookup_event(event)
+    """
+
+    def __init__(self) -> None:
+        self._trees = {
+            version: _Tree(width) for version, width in _WIDTHS.items()
+        }
+        self._values: list[Any] = []
+        # Values of a loaded trie are decoded on first use.
+        self._encoded: Optional[list[bytes]] = None
+        self._cls: Optional[type[Model]] = None
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def insert(self, cidr: Union[str, Prefix], value: Any) -> None:
+        """Map the prefix ``cidr`` to ``value``, replacing any previous
+        value. Raises ``ValueError`` when ``cidr`` is not a prefix."""
+        prefix = cidr if isinstance(cidr, Prefix) else parse_cidr(cidr)
+        if prefix is None:
+            raise ValueError(f"invalid CIDR prefix: {cidr!r}")
+        self._decode_all()
+        self._values.append(value)
+        tree = self._trees[prefix.version]
+        old = tree.insert(prefix.value, prefix.length, len(self._values) - 1)
+        if old < 0:
+            self._count += 1
+        else:
+            self._values[old] = None
+
+    def insert_many(
+        self, items: Iterable[tuple[Union[str, Prefix], Any]]
+    ) -> int:
+        """Insert ``(cidr, value)`` pairs and return how many there were."""
+        count = 0
+        for cidr, value in items:
+            self.insert(cidr, value)
+            count += 1
+        return count
+
+    @classmethod
+    def from_networks(cls, networks: Iterable[Network]) -> "CidrTrie":
+        """Build a trie mapping each ``Network.network`` to its model.
+
+        Networks without a valid CIDR are skipped.
+        """
+        trie = cls()
+        for network in networks:
+            prefix = network.prefix
+            if prefix is not None:
+                trie.insert(prefix, network)
+        return trie
+
+    def _value(self, index: int) -> Any:
+        value = self._values[index]
+        if value is None and self._encoded is not None:
+            raw = json.loads(self._encoded[index])
+            if raw is not None and self._cls is not None:
+                value = self._cls.from_dict(raw)
+            else:
+                value = raw
+            self._values[index] = value
+        return value
+
+    def _decode_all(self) -> None:
+        if self._encoded is not None:
+            for index in range(len(self._values)):
+                self._value(index)
+            self._encoded = None
+
+    def _find(self, ip: str) -> tuple[Optional[_Tree], int]:
+        parsed = parse_ip(ip)
+        if parsed is None:
+            return None, -1
+        tree = self._trees[parsed[0]]
+        return tree, tree.lookup(parsed[1])
+
+    def lookup(self, ip: str) -> Any:
+        """Return the value of the longest prefix containing ``ip``, or
+        ``None``."""
+        tree, node = self._find(ip)
+        if tree is None or node < 0:
+            return None
+        return self._value(tree.values[node])
+
+    def lookup_int(self, version: int, address: int) -> Any:
+        """Like ``lookup()``, for an address given as an integer."""
+        tree = self._trees[version]
+        node = tree.lookup(address)
+        return None if node < 0 else self._value(tree.values[node])
+
+    def lookup_event(self, event: Any) -> Any:
+        """Like ``lookup()``, for the ``ip`` of an event, using its cached
+        integer form."""
+        version = event.ip_version
+        if version is None:
+            return None
+        return self.lookup_int(version, event.ip_int)
+
+    def match(self, ip: str) -> Optional[tuple[Prefix, Any]]:
+        """Return the longest prefix containing ``ip`` with its value, or
+        ``None``."""
+        tree, node = self._find(ip)
+        if tree is None or node < 0:
+            return None
+        version = 4 if tree.width == 32 else 6
+        prefix = Prefix(version, tree.keys[node], tree.lengths[node])
+        return prefix, self._value(tree.values[node])
+
+    def save(self, out: Union[str, "os.PathLike[str]", IO[bytes]]) -> None:
+        """Write the trie to a path or binary file. Values must be models
+        or JSON-encodable."""
+        if hasattr(out, "write"):
+            self._save(out)  # type: ignore[arg-type]
+        else:
+            with open(out, "wb") as fp:  # type: ignore[arg-type]
+                self._save(fp)
+
+    def _save(self, fp: IO[bytes]) -> None:
+        values = [
+            self._encode(i).encode("utf-8") for i in range(len(self._values))
+        ]
+        header = json.dumps(
+            {
+                "count": self._count,
+                "nodes": {v: len(t.keys) for v, t in self._trees.items()},
+                "values": len(values),
+            }
+        ).encode("utf-8")
+        fp.write(_MAGIC)
+        fp.write(struct.pack("<I", len(header)))
+        fp.write(header)
+        for tree in self._trees.values():
+            for part in tree.dump():
+                fp.write(part)
+        fp.write(struct.pack(f"<{len(values)}Q", *map(len, values)))
+        fp.write(b"".join(values))
+
+    def _encode(self, index: int) -> str:
+        if self._encoded is not None and self._values[index] is None:
+            return self._encoded[index].decode("utf-8")
+        value = self._values[index]
+        if isinstance(value, Model):
+            return value.to_json()
+        return json.dumps(value)
+
+    @classmethod
+    def load(
+        cls,
+        source: Union[str, "os.PathLike[str]", IO[bytes]],
+        model: Optional[type[Model]] = Network,
+    ) -> "CidrTrie":
+        """Read a trie written by ``save()`` from a path or binary file.
+
+        Values are decoded on first lookup with ``model.from_dict()``, or
+        kept as plain JSON values when ``model`` is ``None``.
+        """
+        if hasattr(source, "read"):
+            return cls._load(source, model)  # type: ignore[arg-type]
+        with open(source, "rb") as fp:  # type: ignore[arg-type]
+            return cls._load(fp, model)
+
+    @classmethod
+    def _load(cls, fp: IO[bytes], model: Optional[type[Model]]) -> "CidrTrie":
+        if fp.read(len(_MAGIC)) != _MAGIC:
+            raise ValueError("not a CIDR trie file")
+        (size,) = struct.unpack("<I", _read(fp, 4))
+        header = json.loads(_read(fp, size))
+        trie = cls()
+        for version, width in _WIDTHS.items():
+            count = header["nodes"][str(version)]
+            trie._trees[version] = _Tree.load(width, count, fp)
+        count = header["values"]
+        lengths = struct.unpack(f"<{count}Q", _read(fp, 8 * count))
+        data = _read(fp, sum(lengths))
+        encoded = []
+        offset = 0
+        for length in lengths:
+            encoded.append(data[offset : offset + length])
+            offset += length
+        trie._encoded = encoded
+        trie._values = [None] * count
+        trie._cls = model
+        trie._count = header["count"]
+        return trie
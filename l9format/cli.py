@@ -0,0 +1,714 @@
+"""Command-line tool for files of events, run as ``python -m l9format``.
+
+::
+
+    python -m l9format validate events.ndjson.gz
+    python -m l9format convert events.ndjson.gz events.pickle.xz
+    python -m l9format filter events.ndjson.gz "protocol == 'redis'"
+    python -m l9format stats events.ndjson.gz --by protocol --by port \\
+        --distinct ip
+    python -m l9format split events.ndjson.gz "out/{partition}.ndjson.gz" \\
+        --by geoip.country_iso_code
+    python -m l9format sort events.ndjson.gz sorted.ndjson.gz \\
+        --dedup event_fingerprint --memory 1024
+
+The format of a file follows its extension: ``.json`` for a JSON document
+holding an array (see ``--json-path``) or a single record, ``.pickle`` for
+a stream of ``dumps_batch()`` payloads, ``.sqlite`` or ``.db`` for an
+``EventStore`` database, and NDJSON otherwise, ``-`` being standard input
+or output.
+JSON, NDJSON and pickle files may be compressed with gzip, bz2 or xz.
+
+Records are read in chunks, which a pool of worker processes decodes with
+``from_dict()``, filters and encodes again; results come back in input
+order. Records that fail to decode are skipped and counted, and the exit
+status is 1 when there were any. A summary with the throughput and the
+most common errors is printed to standard error.
+"""
+
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+from collections import Counter, deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator, NamedTuple, Optional
+
+from l9format.encoder import dumps
+from l9format.extsort import (
+    DEFAULT_KEY,
+    DEFAULT_MEMORY,
+    SortProgress,
+    sort_events,
+)
+from l9format.fields import field_type, path_getter
+from l9format.filter import parse_filter
+from l9format.l9format import L9Aggregation, L9Event, Model, ValidationError
+from l9format.ndjson import (
+    EventWriter,
+    PartitionedWriter,
+    codec_for_path,
+    detect_codec,
+    iter_lines,
+)
+from l9format.pickling import dumps_batch, iter_batches, loads_batch
+from l9format.stats import FieldStats
+
+MODELS: dict[str, type[Model]] = {
+    "event": L9Event,
+    "aggregation": L9Aggregation,
+}
+
+DEFAULT_CHUNK_SIZE = 2000
+
+_EXTENSIONS = {
+    "json": (".json",),
+    "pickle": (".pickle", ".pkl"),
+    "sqlite": (".sqlite", ".sqlite3", ".db"),
+}
+# Number of failed records reported with their error message.
+_MAX_SAMPLES = 5
+
+
+def file_format(path: str) -> str:
+    """Return the format of the file at ``path`` from its extension."""
+    if path == "-":
+        return "ndjson"
+    extension = codec_for_path(path).extension
+    name = path[: -len(extension)] if extension else path
+    for fmt, extensions in _EXTENSIONS.items():
+        if name.endswith(extensions):
+            return fmt
+    return "ndjson"
+
+
+# --- Workers ---
+
+
+class _Job(NamedTuple):
+    """What workers do with the records, sent to each of them once.
+
+    ``output`` is ``"none"``, ``"lines"`` (NDJSON lines), ``"pickle"`` (a
+    ``dumps_batch()`` payload), ``"partitions"`` (partition keys and
+    lines) or ``"stats"`` (a ``FieldStats`` of the top values of the
+    ``by`` fields and the distinct values of those and ``distinct``).
+    """
+
+    model: str
+    output: str
+    where: Optional[str] = None
+    by: tuple[str, ...] = ()
+    distinct: tuple[str, ...] = ()
+    capacity: int = 1000
+
+
+class _Result(NamedTuple):
+    """The outcome of a chunk: the records kept, the errors by kind,
+    messages of the first failed records by position, and the output."""
+
+    kept: int
+    errors: Counter[str]
+    samples: list[tuple[int, str]]
+    output: Any
+
+
+def _error_kind(error: Exception) -> str:
+    if isinstance(error, ValidationError) and error.field:
+        return f"field {error.field}"
+    return type(error).__name__
+
+
+class _Worker:
+    def __init__(self, job: _Job) -> None:
+        self.job = job
+        self.cls = MODELS[job.model]
+        self.where = (
+            None if job.where is None else parse_filter(job.where, self.cls)
+        )
+        self.getters = [path_getter(path) for path in job.by]
+
+    def decode(self, chunk: list[Any]) -> Iterator[tuple[int, Any]]:
+        """Yield the position and model of the matching records, or an
+        exception for those failing to decode."""
+        from_dict = self.cls.from_dict
+        where = self.where
+        for i, item in enumerate(chunk):
+            try:
+                if isinstance(item, Model):
+                    if where is None or where.matches(item):
+                        yield i, item
+                    continue
+                d = json.loads(item) if isinstance(item, str) else item
+                if where is not None and not where.matches_raw(d):
+                    continue
+                yield i, from_dict(d)
+            except (ValidationError, ValueError, TypeError) as e:
+                yield i, e
+
+    def process(self, chunk: list[Any]) -> _Result:
+        output = self.job.output
+        errors: Counter[str] = Counter()
+        samples: list[tuple[int, str]] = []
+        models: list[Model] = []
+        lines: list[str] = []
+        pairs: list[tuple[object, str]] = []
+        stats = FieldStats(
+            top=self.job.by,
+            distinct=dict.fromkeys(self.job.by + self.job.distinct),
+            capacity=self.job.capacity,
+        )
+        kept = 0
+        for i, model in self.decode(chunk):
+            if isinstance(model, Exception):
+                kind = _error_kind(model)
+                errors[kind] += 1
+                if len(samples) < _MAX_SAMPLES:
+                    samples.append((i, f"{kind}: {model}"))
+                continue
+            kept += 1
+            if output == "lines":
+                lines.append(dumps(model))
+            elif output == "pickle":
+                models.append(model)
+            elif output == "partitions":
+                pairs.append((self.getters[0](model), dumps(model)))
+            elif output == "stats":
+                stats.add(model)
+        result: Any = None
+        if output == "lines":
+            result = lines
+        elif output == "pickle":
+            result = dumps_batch(models)
+        elif output == "partitions":
+            result = pairs
+        elif output == "stats":
+            result = stats
+        return _Result(kept, errors, samples, result)
+
+
+_WORKER: Optional[_Worker] = None
+
+
+def _init_worker(job: _Job) -> None:
+    global _WORKER
+    _WORKER = _Worker(job)
+
+
+def _process(chunk: list[Any]) -> _Result:
+    assert _WORKER is not None
+    return _WORKER.process(chunk)
+
+
+def _results(
+    job: _Job, chunks: Iterable[list[Any]], workers: int
+) -> Iterator[tuple[int, _Result]]:
+    """Yield the size and result of each chunk, in order."""
+    if workers <= 1:
+        worker = _Worker(job)
+        for chunk in chunks:
+            yield len(chunk), worker.process(chunk)
+        return
+    with ProcessPoolExecutor(
+        workers, initializer=_init_worker, initargs=(job,)
+    ) as pool:
+        # At most two chunks per worker are in flight, so memory stays
+        # bounded whatever the size of the input.
+        pending: deque[tuple[int, Future[_Result]]] = deque()
+        try:
+            for chunk in chunks:
+                pending.append((len(chunk), pool.submit(_process, chunk)))
+                if len(pending) >= 2 * workers:
+                    size, future = pending.popleft()
+                    yield size, future.result()
+            while pending:
+                size, future = pending.popleft()
+                yield size, future.result()
+        finally:
+            for _, future in pending:
+                future.cancel()
+
+
+# --- Inputs and outputs ---
+
+
+class _Input:
+    """The records of a file: JSON lines, dicts or models. ``size``
+    counts the characters of JSON lines read so far."""
+
+    def __init__(
+        self, path: str, cls: type[Model], json_path: str = ""
+    ) -> None:
+        self.path = path
+        self.cls = cls
+        self.json_path = json_path
+        self.size = 0
+
+    def _lines(self, lines: Iterable[str]) -> Iterator[str]:
+        for line in lines:
+            if line.strip():
+                self.size += len(line)
+                yield line
+
+    def _json(self) -> Iterator[Any]:
+        from l9format.jsonstream import iter_items
+
+        if not self.json_path:
+            # A document holding a single object is one record.
+            with detect_codec(self.path).open_read(self.path) as f:
+                head = f.read(4096).lstrip()
+                if head.startswith(b"{"):
+                    yield json.loads(head + f.read())
+                    return
+        yield from iter_items(Path(self.path), self.json_path)
+
+    def records(self) -> Iterator[Any]:
+        fmt = file_format(self.path)
+        if self.path == "-":
+            yield from self._lines(sys.stdin)
+        elif fmt == "json":
+            yield from self._json()
+        elif fmt == "pickle":
+            codec = detect_codec(self.path)
+            with codec.open_read(self.path) as f:
+                for batch in iter_batches(f):  # type: ignore[arg-type]
+                    yield from batch
+        elif fmt == "sqlite":
+            from l9format.sqlite import EventStore
+
+            with EventStore(self.path, self.cls, indexes=()) as store:
+                yield from store
+        else:
+            yield from self._lines(iter_lines(self.path))
+
+
+def _chunks(records: Iterable[Any], size: int) -> Iterator[list[Any]]:
+    it = iter(records)
+    while chunk := list(itertools.islice(it, size)):
+        yield chunk
+
+
+class _Output:
+    """Writes the outputs of a ``"lines"`` or ``"pickle"`` job to a file
+    in the format of its extension."""
+
+    def __init__(self, path: str, cls: type[Model]) -> None:
+        self.format = file_format(path)
+        if self.format == "json":
+            raise ValueError("JSON documents can only be read, use NDJSON")
+        self.path = path
+        self.write: Callable[[Any], object]
+        if path == "-":
+            self.write = self._write_stdout
+        elif self.format == "pickle":
+            self._file = codec_for_path(path).open_write(path, "wb", None)
+            self.write = self._file.write
+        elif self.format == "sqlite":
+            from l9format.sqlite import EventStore
+
+            self._store = EventStore(path, cls, indexes=())
+            self.write = self._insert
+        else:
+            self._writer = EventWriter(path)
+            self.write = self._write_lines
+
+    @property
+    def job_output(self) -> str:
+        return "pickle" if self.format in ("pickle", "sqlite") else "lines"
+
+    def _write_stdout(self, lines: list[str]) -> None:
+        sys.stdout.write("".join(line + "\n" for line in lines))
+
+    def _write_lines(self, lines: list[str]) -> None:
+        write_line = self._writer.write_line
+        for line in lines:
+            write_line(line)
+
+    def _insert(self, payload: bytes) -> None:
+        self._store.insert_many(loads_batch(payload))
+
+    def close(self) -> None:
+        if self.path == "-":
+            sys.stdout.flush()
+        elif self.format == "pickle":
+            self._file.close()
+        elif self.format == "sqlite":
+            self._store.create_indexes()
+            self._store.close()
+        else:
+            self._writer.close()
+
+
+# --- Commands ---
+
+
+class _Summary:
+    """Counts of a run, printed to standard error."""
+
+    def __init__(self, command: str) -> None:
+        self.command = command
+        self.records = 0
+        self.kept = 0
+        self.errors: Counter[str] = Counter()
+        self.samples: list[str] = []
+        self.start = time.perf_counter()
+
+    @property
+    def failed(self) -> int:
+        return sum(self.errors.values())
+
+    def add(self, size: int, result: _Result) -> None:
+        for i, message in result.samples:
+            if len(self.samples) < _MAX_SAMPLES:
+                self.samples.append(f"record {self.records + i + 1}: {message}")
+        self.records += size
+        self.kept += result.kept
+        self.errors.update(result.errors)
+
+    def report(self, size: int) -> None:
+        elapsed = time.perf_counter() - self.start
+        rate = self.records / elapsed if elapsed > 0 else 0.0
+        line = (
+            f"{self.command}: {self.records} records, {self.kept} kept, "
+            f"{self.failed} failed in {elapsed:.2f} s "
+            f"({rate:.0f} records/s"
+        )
+        if size and elapsed > 0:
+            line += f", {size / elapsed / 1e6:.1f} MB/s"
+        print(line + ")", file=sys.stderr)
+        for kind, count in self.errors.most_common(10):
+            print(f"{count:>10}  {kind}", file=sys.stderr)
+        for sample in self.samples:
+            print(f"  {sample}", file=sys.stderr)
+
+
+def _run(
+    args: argparse.Namespace,
+    job: _Job,
+    consume: Callable[[Any], object],
+) -> _Summary:
+    source = _Input(args.input, MODELS[job.model], args.json_path)
+    summary = _Summary(args.command)
+    chunks = _chunks(source.records(), args.chunk_size)
+    for size, result in _results(job, chunks, args.workers):
+        summary.add(size, result)
+        consume(result.output)
+    if not args.quiet:
+        summary.report(source.size)
+    return summary
+
+
+def _convert(args: argparse.Namespace, where: Optional[str]) -> _Summary:
+    output = _Output(args.output, MODELS[args.model])
+    try:
+        job = _Job(args.model, output.job_output, where)
+        return _run(args, job, output.write)
+    finally:
+        output.close()
+
+
+def _command_validate(args: argparse.Namespace) -> _Summary:
+    return _run(args, _Job(args.model, "none"), lambda output: None)
+
+
+def _command_convert(args: argparse.Namespace) -> _Summary:
+    return _convert(args, args.where)
+
+
+def _command_filter(args: argparse.Namespace) -> _Summary:
+    return _convert(args, args.expression)
+
+
+def _command_stats(args: argparse.Namespace) -> _Summary:
+    by = tuple(args.by or ("protocol", "event_type"))
+    distinct = tuple(args.distinct or ())
+    totals: list[FieldStats] = []
+
+    def consume(stats: FieldStats) -> None:
+        if totals:
+            totals[0].merge(stats)
+        else:
+            totals.append(stats)
+
+    job = _Job(
+        args.model,
+        "stats",
+        args.where,
+        by,
+        distinct=distinct,
+        capacity=args.capacity,
+    )
+    summary = _run(args, job, consume)
+    print(f"records: {summary.kept}")
+    if not totals:
+        return summary
+    stats = totals[0]
+    for path in by:
+        print(f"{path}: {stats.distinct(path)} distinct")
+        for value, estimate, error in stats.top(path, args.top):
+            line = f"{estimate:>10}  {_show(value)}"
+            print(f"{line}  (error {error})" if error else line)
+    for path in distinct:
+        if path not in by:
+            print(f"{path}: {stats.distinct(path)} distinct")
+    return summary
+
+
+def _show(value: Any) -> str:
+    if isinstance(value, tuple):
+        return ", ".join(_show(v) for v in value)
+    if value is None:
+        return "null"
+    return str(value) if value != "" else '""'
+
+
+def _command_split(args: argparse.Namespace) -> _Summary:
+    writer = PartitionedWriter(args.output, args.by, buckets=args.buckets)
+
+    def consume(pairs: list[tuple[object, str]]) -> None:
+        for key, line in pairs:
+            partition = writer.partition_of_key(key)
+            if partition not in writer.paths:
+                path = args.output.format(partition=partition)
+                os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            writer.write_line(partition, line)
+
+    job = _Job(args.model, "partitions", args.where, (args.by,))
+    try:
+        summary = _run(args, job, consume)
+    finally:
+        writer.close()
+    if not args.quiet:
+        print(f"{len(writer.paths)} partitions", file=sys.stderr)
+    return summary
+
+
+def _command_sort(args: argparse.Namespace) -> _Summary:
+    if "ndjson" != file_format(args.input) or "ndjson" != file_format(
+        args.output
+    ):
+        raise ValueError("sort reads and writes NDJSON")
+    if args.output == "-":
+        raise ValueError("sort writes to a file")
+
+    def report(progress: SortProgress) -> None:
+        if progress.phase == "done":
+            return
+        print(
+            f"{args.command}: {progress.phase}: {progress.records} read, "
+            f"{progress.written} written, {progress.runs} runs "
+            f"({progress.rate:.0f} records/s)",
+            file=sys.stderr,
+        )
+
+    summary = _Summary(args.command)
+    done = sort_events(
+        args.input,
+        args.output,
+        key=args.key or DEFAULT_KEY,
+        dedup=args.dedup,
+        dedup_scope=args.dedup_scope,
+        cls=MODELS[args.model],
+        memory=args.memory << 20,
+        workers=args.workers,
+        tmpdir=args.tmpdir,
+        progress=None if args.quiet else report,
+        skip_invalid=True,
+    )
+    summary.records = done.records
+    summary.kept = done.written
+    if done.failed:
+        summary.errors["invalid record"] = done.failed
+    if not args.quiet:
+        summary.report(0)
+        print(f"{done.duplicates} duplicates", file=sys.stderr)
+    return summary
+
+
+def _parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m l9format",
+        description="Validate, convert, filter, count, split and sort events.",
+    )
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("input", help="input file, or - for standard input")
+    common.add_argument(
+        "--model",
+        choices=sorted(MODELS),
+        default="event",
+        help="type of the records (default: event)",
+    )
+    common.add_argument(
+        "--json-path",
+        default="",
+        metavar="PATH",
+        help="dotted path of the array in a .json input, such as events",
+    )
+    common.add_argument(
+        "-j",
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="worker processes; 1 decodes in this process (default: CPUs)",
+    )
+    common.add_argument(
+        "--chunk-size",
+        type=int,
+        default=DEFAULT_CHUNK_SIZE,
+        help="records sent to a worker at a time",
+    )
+    common.add_argument(
+        "-q", "--quiet", action="store_true", help="do not print a summary"
+    )
+    where = argparse.ArgumentParser(add_help=False)
+    where.add_argument(
+        "-w",
+        "--where",
+        metavar="EXPR",
+        help="only keep the records matching a filter expression",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    p = commands.add_parser(
+        "validate", parents=[common], help="decode every record"
+    )
+    p.set_defaults(run=_command_validate)
+
+    p = commands.add_parser(
+        "convert",
+        parents=[common, where],
+        help="rewrite records in the format of the output extension",
+    )
+    p.add_argument("output", help="output file, or - for standard output")
+    p.set_defaults(run=_command_convert)
+
+    p = commands.add_parser(
+        "filter",
+        parents=[common],
+        help="keep the records matching a filter expression",
+    )
+    p.add_argument("expression", help="filter expression, see parse_filter()")
+    p.add_argument(
+        "-o",
+        "--output",
+        default="-",
+        help="output file (default: standard output)",
+    )
+    p.set_defaults(run=_command_filter)
+
+    p = commands.add_parser(
+        "stats", parents=[common, where], help="count values of fields"
+    )
+    p.add_argument(
+        "--by",
+        action="append",
+        metavar="FIELD",
+        help="dotted field to count values of, repeatable "
+        "(default: protocol and event_type)",
+    )
+    p.add_argument(
+        "--distinct",
+        action="append",
+        metavar="FIELD",
+        help="dotted field to count distinct values of, repeatable",
+    )
+    p.add_argument("--top", type=int, default=10, help="values shown per field")
+    p.add_argument(
+        "--capacity",
+        type=int,
+        default=1000,
+        help="values tracked per field; counts are exact below it",
+    )
+    p.set_defaults(run=_command_stats)
+
+    p = commands.add_parser(
+        "split",
+        parents=[common, where],
+        help="write records to one NDJSON file per value of a field",
+    )
+    p.add_argument("output", help="output path with a {partition} placeholder")
+    p.add_argument("--by", required=True, metavar="FIELD", help="dotted field")
+    p.add_argument(
+        "--buckets",
+        type=int,
+        help="hash values into this many partitions",
+    )
+    p.set_defaults(run=_command_split)
+
+    p = commands.add_parser(
+        "sort",
+        parents=[common],
+        help="sort NDJSON records larger than memory, dropping duplicates",
+    )
+    p.add_argument("output", help="output NDJSON file")
+    p.add_argument(
+        "--key",
+        action="append",
+        metavar="FIELD",
+        help="dotted field to sort by, repeatable (default: ip, port, time)",
+    )
+    p.add_argument(
+        "--dedup",
+        metavar="FIELD",
+        help="drop records repeating this field, such as event_fingerprint",
+    )
+    p.add_argument(
+        "--dedup-scope",
+        type=int,
+        metavar="N",
+        help="look for duplicates among records sharing the first N key "
+        "fields (default: all of them)",
+    )
+    p.add_argument(
+        "--memory",
+        type=int,
+        default=DEFAULT_MEMORY >> 20,
+        metavar="MB",
+        help="memory budget for sorting (default: %(default)s)",
+    )
+    p.add_argument("--tmpdir", help="directory for the sorted runs")
+    p.set_defaults(run=_command_sort)
+    return parser
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """Run the tool and return its exit status."""
+    parser = _parser()
+    args = parser.parse_args(argv)
+    cls = MODELS[args.model]
+    by = getattr(args, "by", None)
+    if isinstance(by, str):
+        paths = [by]
+    else:
+        # Statistics count the comma-separated fields of a path together.
+        paths = [
+            part.strip()
+            for path in [
+                *(by or ()),
+                *(getattr(args, "distinct", None) or ()),
+                *(getattr(args, "key", None) or ()),
+                *([args.dedup] if getattr(args, "dedup", None) else []),
+            ]
+            for part in path.split(",")
+        ]
+    try:
+        for path in paths:
+            field_type(cls, path)
+        for expression in (
+            getattr(args, "where", None),
+            getattr(args, "expression", None),
+        ):
+            if expression is not None:
+                parse_filter(expression, cls)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.chunk_size < 1:
+        parser.error("--chunk-size must be at least 1")
+    try:
+        summary = args.run(args)
+    except (OSError, ValueError) as e:
+        print(f"{args.command}: {e}", file=sys.stderr)
+        return 1
+    return 1 if summary.failed else 0
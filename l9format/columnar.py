@@ -0,0 +1,382 @@
+"""Columnar export of model batches.
+
+``iter_columns()`` flattens a chosen set of dotted fields of a stream of
+models into typed column buffers, one chunk at a time, without building
+an intermediate ``to_dict()`` per model. Numeric, boolean and datetime
+fields are stored in ``array.array`` buffers with a separate null mask;
+other fields are kept as lists of Python objects.
+
+``to_numpy()`` turns the columns into a NumPy structured array when numpy
+is installed, and ``write_csv()`` writes the fields as CSV or TSV rows.
+"""
+
+import array
+import csv
+import decimal
+import json
+import math
+import os
+from datetime import datetime, timedelta, timezone
+from operator import attrgetter
+from typing import IO, Any, Callable, Iterable, Iterator, NamedTuple, Union
+
+from l9format.fields import field_type, path_getter
+from l9format.headers import HeaderMap
+from l9format.l9format import L9Event, Model, _numpy
+from l9format.lazy import LazyList
+
+DEFAULT_CHUNK_SIZE = 65536
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+
+# Array type codes of the typed column kinds.
+_TYPECODES = {"bool": "b", "int": "q", "float": "d", "datetime": "q"}
+
+# NumPy dtypes of the column kinds.
+_DTYPES = {
+    "bool": "?",
+    "int": "i8",
+    "float": "f8",
+    "datetime": "datetime64[us]",
+    "str": "O",
+    "object": "O",
+}
+
+
+def _kind(tp: Any) -> str:
+    if not isinstance(tp, type) or issubclass(tp, Model):
+        return "object"
+    if issubclass(tp, bool):
+        return "bool"
+    if issubclass(tp, int):
+        return "int"
+    if issubclass(tp, (float, decimal.Decimal)):
+        return "float"
+    if issubclass(tp, datetime):
+        return "datetime"
+    if issubclass(tp, str):
+        return "str"
+    return "object"
+
+
+class _ColumnSpec(NamedTuple):
+    path: str
+    kind: str
+    get: Callable[[object], Any]
+    get_fast: Callable[[object], Any]
+
+
+def _specs(cls: type[Model], paths: Iterable[str]) -> list[_ColumnSpec]:
+    specs = []
+    for path in paths:
+        kind = _kind(field_type(cls, path))
+        specs.append(
+            _ColumnSpec(path, kind, path_getter(path), attrgetter(path))
+        )
+    if not specs:
+        raise ValueError("at least one field path is required")
+    if len({s.path for s in specs}) != len(specs):
+        raise ValueError("field paths must be unique")
+    return specs
+
+
+def _extract(spec: _ColumnSpec, chunk: list[Model]) -> list[Any]:
+    # attrgetter only fails on a missing intermediate model; fall back to
+    # the None-safe getter for the chunks that have one.
+    try:
+        return list(map(spec.get_fast, chunk))
+    except AttributeError:
+        return list(map(spec.get, chunk))
+
+
+def _micros(value: datetime) -> int:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return (value - _EPOCH) // _MICROSECOND
+
+
+_CONVERTERS: dict[str, Callable[[Any], Any]] = {
+    "bool": bool,
+    "int": int,
+    "float": float,
+    "datetime": _micros,
+}
+
+_NULLS = {"bool": 0, "int": 0, "float": math.nan, "datetime": 0}
+
+
+class Column:
+    """The values of one field for the rows of a batch.
+
+    For ``bool``, ``int``, ``float`` and ``datetime`` columns, ``values`` is
+    an ``array.array``: decimals are stored as floats and datetimes as
+    microseconds since the Unix epoch (naive datetimes are taken as UTC).
+    Nulls are stored as 0 (NaN for floats) and flagged in ``mask``. Other
+    columns keep the Python values, including ``None``, in a list and have
+    an empty mask.
+    """
+
+    __slots__ = ("path", "kind", "values", "mask")
+
+    def __init__(
+        self,
+        path: str,
+        kind: str,
+        values: Union[array.array, list[Any]],
+        mask: bytearray,
+    ) -> None:
+        self.path = path
+        self.kind = kind
+        self.values = values
+        self.mask = mask
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def to_list(self) -> list[Any]:
+        """Return the values as Python objects, with ``None`` for nulls."""
+        values: list[Any]
+        if self.kind == "bool":
+            values = [bool(v) for v in self.values]
+        elif self.kind == "datetime":
+            values = [_EPOCH + v * _MICROSECOND for v in self.values]
+        else:
+            values = list(self.values)
+        if self.mask:
+            return [None if m else v for v, m in zip(values, self.mask)]
+        return values
+
+
+def _column(spec: _ColumnSpec, raw: list[Any]) -> Column:
+    typecode = _TYPECODES.get(spec.kind)
+    if typecode is None:
+        return Column(spec.path, spec.kind, raw, bytearray())
+    convert = _CONVERTERS[spec.kind]
+    null = _NULLS[spec.kind]
+    try:
+        values = array.array(
+            typecode, [null if v is None else convert(v) for v in raw]
+        )
+    except (TypeError, ValueError, OverflowError) as e:
+        raise ValueError(f"{spec.path!r}: cannot store value: {e}") from e
+    mask = bytearray(v is None for v in raw) if None in raw else bytearray()
+    return Column(spec.path, spec.kind, values, mask)
+
+
+class ColumnBatch:
+    """Typed columns holding the same number of rows."""
+
+    def __init__(self, columns: Iterable[Column]) -> None:
+        self.columns = {c.path: c for c in columns}
+
+    def __len__(self) -> int:
+        return len(next(iter(self.columns.values())))
+
+    def __getitem__(self, path: str) -> Column:
+        return self.columns[path]
+
+    def extend(self, other: "ColumnBatch") -> None:
+        """Append the rows of ``other``, which must have the same fields."""
+        if list(other.columns) != list(self.columns):
+            raise ValueError("batches have different fields")
+        size = len(self)
+        for path, column in self.columns.items():
+            theirs = other.columns[path]
+            if column.mask or theirs.mask:
+                column.mask = column.mask or bytearray(size)
+                column.mask.extend(theirs.mask or bytearray(len(theirs)))
+            column.values.extend(theirs.values)  # type: ignore[arg-type]
+
+    def rows(self) -> Iterator[tuple[Any, ...]]:
+        """Iterate over the rows as tuples of Python values."""
+        return zip(*(c.to_list() for c in self.columns.values()))
+
+    def to_numpy(self, masked: bool = False) -> Any:
+        """Return the columns as a NumPy structured array.
+
+        Field names are the dotted paths. Nulls in typed columns are 0,
+        ``False``, NaN or NaT; with ``masked=True`` a ``numpy.ma`` masked
+        array flagging them is returned instead. Raises ``ImportError``
+        when numpy is not installed.
+        """
+        np = _numpy("to_numpy()")
+        columns = list(self.columns.values())
+        dtype = np.dtype([(c.path, _DTYPES[c.kind]) for c in columns])
+        result = np.empty(len(self), dtype=dtype)
+        for c in columns:
+            if c.kind not in _TYPECODES:
+                result[c.path] = c.values
+                continue
+            values = np.frombuffer(
+                c.values, dtype=_TYPECODES[c.kind]  # type: ignore[arg-type]
+            )
+            if c.kind == "datetime":
+                values = values.view("datetime64[us]")
+                if c.mask:
+                    values = values.copy()
+                    values[np.frombuffer(c.mask, dtype=np.bool_)] = (
+                        np.datetime64("NaT")
+                    )
+            result[c.path] = values
+        if not masked:
+            return result
+        mask = np.zeros(len(self), dtype=[(c.path, np.bool_) for c in columns])
+        for c in columns:
+            if c.mask:
+                mask[c.path] = np.frombuffer(c.mask, dtype=np.bool_)
+            elif c.kind not in _TYPECODES:
+                mask[c.path] = [v is None for v in c.values]
+        return np.ma.array(result, mask=mask)
+
+
+def _chunks(events: Iterable[Model], size: int) -> Iterator[list[Model]]:
+    chunk: list[Model] = []
+    for event in events:
+        chunk.append(event)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def iter_columns(
+    events: Iterable[Model],
+    paths: Iterable[str],
+    cls: type[Model] = L9Event,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Iterator[ColumnBatch]:
+    """Flatten the fields at ``paths`` into one ``ColumnBatch`` per chunk.
+
+    Only ``chunk_size`` models are held at a time. Raises ``ValueError``
+    when a path does not name a field of ``cls``.
+    """
+    specs = _specs(cls, paths)
+    for chunk in _chunks(events, chunk_size):
+        yield ColumnBatch(_column(s, _extract(s, chunk)) for s in specs)
+
+
+def to_columns(
+    events: Iterable[Model],
+    paths: Iterable[str],
+    cls: type[Model] = L9Event,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> ColumnBatch:
+    """Flatten the fields at ``paths`` of all models into a single batch."""
+    specs = _specs(cls, paths)
+    result = ColumnBatch(_column(s, []) for s in specs)
+    for batch in iter_columns(events, [s.path for s in specs], cls, chunk_size):
+        result.extend(batch)
+    return result
+
+
+def to_numpy(
+    events: Iterable[Model],
+    paths: Iterable[str],
+    cls: type[Model] = L9Event,
+    masked: bool = False,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Any:
+    """Return the fields at ``paths`` as a NumPy structured array.
+
+    See ``ColumnBatch.to_numpy()``. Typed columns are accumulated in
+    compact arrays and handed to numpy without copying them to Python
+    objects.
+    """
+    return to_columns(events, paths, cls, chunk_size).to_numpy(masked)
+
+
+def _format_bool(value: Any) -> str:
+    return "" if value is None else ("true" if value else "false")
+
+
+def _format_number(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, decimal.Decimal):
+        return f"{value:f}"
+    return str(value)
+
+
+def _format_datetime(value: Any) -> str:
+    return "" if value is None else value.isoformat()
+
+
+def _format_str(value: Any) -> str:
+    return "" if value is None else value  # type: ignore[no-any-return]
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (Model, HeaderMap)):
+        return value.to_dict()
+    if isinstance(value, LazyList):
+        return list(value.stream())
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return f"{value:f}"
+    raise TypeError(f"cannot encode {type(value).__name__}")
+
+
+def _format_object(value: Any) -> str:
+    if value is None:
+        return ""
+    return json.dumps(value, separators=(",", ":"), default=_json_default)
+
+
+_FORMATTERS: dict[str, Callable[[Any], str]] = {
+    "bool": _format_bool,
+    "int": _format_number,
+    "float": _format_number,
+    "datetime": _format_datetime,
+    "str": _format_str,
+    "object": _format_object,
+}
+
+
+def write_csv(
+    events: Iterable[Model],
+    out: Union[str, "os.PathLike[str]", IO[str]],
+    paths: Iterable[str],
+    cls: type[Model] = L9Event,
+    delimiter: str = ",",
+    header: bool = True,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> int:
+    """Write the fields at ``paths`` as delimited rows and return the row
+    count.
+
+    ``out`` is a path or a text file; pass ``delimiter="\\t"`` for TSV.
+    Values are formatted as in ``to_json()``: booleans as ``true``/
+    ``false``, datetimes in ISO 8601, and lists and nested models as
+    compact JSON. Nulls are written as empty fields.
+    """
+    specs = _specs(cls, paths)
+    if hasattr(out, "write"):
+        return _write_rows(events, out, specs, delimiter, header, chunk_size)
+    with open(out, "w", newline="", encoding="utf-8") as fp:
+        return _write_rows(events, fp, specs, delimiter, header, chunk_size)
+
+
+def _write_rows(
+    events: Iterable[Model],
+    fp: Any,
+    specs: list[_ColumnSpec],
+    delimiter: str,
+    header: bool,
+    chunk_size: int,
+) -> int:
+    writer = csv.writer(fp, delimiter=delimiter, lineterminator="\n")
+    if header:
+        writer.writerow([s.path for s in specs])
+    formatters = [_FORMATTERS[s.kind] for s in specs]
+    count = 0
+    for chunk in _chunks(events, chunk_size):
+        columns = [
+            list(map(fmt, _extract(s, chunk)))
+            for s, fmt in zip(specs, formatters)
+        ]
+        writer.writerows(zip(*columns))
+        count += len(chunk)
+    return count
@@ -0,0 +1,236 @@
+"""Streaming JSON encoder for l9format models.
+
+The encoder walks a model field by field and writes JSON text straight to
+a sink, without building the ``OrderedDict`` tree returned by
+``Model.to_dict()``. Its output is byte-identical to ``Model.to_json()``
+called without arguments.
+"""
+
+import decimal
+import io
+from datetime import datetime
+from json.encoder import encode_basestring_ascii
+from typing import IO, Any, Callable, Mapping, Optional
+
+from l9format import metrics
+from l9format.headers import HeaderMap
+from l9format.l9format import _RETAINED, Model, _class_cache
+from l9format.lazy import LazyList
+
+# Number of pending string fragments after which the encoder hands its
+# buffer to the sink. Flushing only happens between elements of a list of
+# models, so a single event is always written in one call.
+DEFAULT_CHUNK_SIZE = 4096
+
+_INFINITY = float("inf")
+
+_KEY_PREFIXES: dict[type, tuple[str, ...]] = {}
+
+
+def _key_prefixes(cls: type[Model]) -> tuple[str, ...]:
+    """Return the pre-encoded ``"name": `` prefix of every field."""
+    return _class_cache(
+        _KEY_PREFIXES,
+        cls,
+        lambda: tuple(
+            encode_basestring_ascii(spec.name) + ": " for spec in cls._schema()
+        ),
+    )
+
+
+def _encode_float(value: float) -> str:
+    """Encode a float the way ``json.dumps`` does (``allow_nan=True``)."""
+    if value != value:
+        return "NaN"
+    if value == _INFINITY:
+        return "Infinity"
+    if value == -_INFINITY:
+        return "-Infinity"
+    return float.__repr__(value)
+
+
+def _encode_key(key: object) -> str:
+    """Encode a dict key, coercing scalars like ``json.dumps`` does."""
+    if isinstance(key, str):
+        return encode_basestring_ascii(key)
+    if key is True:
+        return '"true"'
+    if key is False:
+        return '"false"'
+    if key is None:
+        return '"null"'
+    if isinstance(key, int):
+        return '"' + int.__repr__(key) + '"'
+    if isinstance(key, float):
+        return '"' + _encode_float(key) + '"'
+    raise TypeError(
+        f"keys must be str, int, float, bool or None, "
+        f"not {type(key).__name__}"
+    )
+
+
+class _Encoder:
+    """Accumulate JSON fragments and hand them to a sink in chunks."""
+
+    def __init__(
+        self,
+        write: Optional[Callable[[str], Any]],
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ) -> None:
+        self.parts: list[str] = []
+        self.write = write
+        self.chunk_size = chunk_size
+
+    def flush(self) -> None:
+        if self.write is not None and self.parts:
+            self.write("".join(self.parts))
+            self.parts.clear()
+
+    def model(self, obj: Model) -> None:
+        cls = type(obj)
+        if (
+            cls.to_dict is not Model.to_dict
+            or cls._to_dict is not Model._to_dict
+            or cls._serialize_field is not Model._serialize_field
+            or _RETAINED in obj.__dict__
+        ):
+            # Subclasses customising to_dict() or _serialize_field() define
+            # their own encoding, and retained models reuse the dict they
+            # were decoded from.
+            self.value(obj.to_dict())
+            return
+        append = self.parts.append
+        prefixes = _key_prefixes(cls)
+        first = True
+        append("{")
+        for spec, prefix in zip(cls._schema(), prefixes):
+            value = getattr(obj, spec.name)
+            if value is None and spec.optional:
+                continue
+            if first:
+                first = False
+            else:
+                append(", ")
+            append(prefix)
+            self.value(value)
+        append("}")
+
+    def value(self, value: object) -> None:
+        append = self.parts.append
+        tp = type(value)
+        if tp is str:
+            append(encode_basestring_ascii(value))  # type: ignore[arg-type]
+        elif value is None:
+            append("null")
+        elif value is True:
+            append("true")
+        elif value is False:
+            append("false")
+        elif tp is int:
+            append(int.__repr__(value))  # type: ignore[arg-type]
+        elif isinstance(value, Model):
+            self.model(value)
+        elif isinstance(value, datetime):
+            append(encode_basestring_ascii(value.isoformat()))
+        elif isinstance(value, decimal.Decimal):
+            append(encode_basestring_ascii(f"{value:f}"))
+        elif isinstance(value, (list, tuple, LazyList)):
+            self.array(value)
+        elif isinstance(value, (dict, HeaderMap)):
+            self.object(value)
+        elif isinstance(value, str):
+            append(encode_basestring_ascii(value))
+        elif isinstance(value, int):
+            append(int.__repr__(value))
+        elif isinstance(value, float):
+            append(_encode_float(value))
+        else:
+            raise TypeError(
+                f"Object of type {tp.__name__} is not JSON serializable"
+            )
+
+    def array(
+        self, items: "list[Any] | tuple[Any, ...] | LazyList[Any]"
+    ) -> None:
+        append = self.parts.append
+        if not items:
+            append("[]")
+            return
+        append("[")
+        first = True
+        for item in items.stream() if isinstance(items, LazyList) else items:
+            if first:
+                first = False
+            else:
+                append(", ")
+            self.value(item)
+            if len(self.parts) >= self.chunk_size and isinstance(item, Model):
+                self.flush()
+        append("]")
+
+    def object(self, mapping: Mapping[Any, Any]) -> None:
+        append = self.parts.append
+        if not mapping:
+            append("{}")
+            return
+        append("{")
+        first = True
+        for key, item in mapping.items():
+            if first:
+                first = False
+            else:
+                append(", ")
+            append(_encode_key(key))
+            append(": ")
+            self.value(item)
+        append("}")
+
+
+def _dumps(model: Model) -> str:
+    encoder = _Encoder(None)
+    encoder.model(model)
+    return "".join(encoder.parts)
+
+
+def dumps(model: Model) -> str:
+    """Return the JSON encoding of ``model``, identical to ``to_json()``."""
+    registry = metrics.active
+    if registry is None:
+        return _dumps(model)
+    s = registry.observe("encode", type(model), _dumps, model)
+    registry.add_size("encode", type(model).__name__, len(s))
+    return s
+
+
+def _is_binary(fp: IO[Any]) -> bool:
+    if isinstance(fp, io.TextIOBase):
+        return False
+    if isinstance(fp, (io.RawIOBase, io.BufferedIOBase)):
+        return True
+    mode = getattr(fp, "mode", "")
+    return isinstance(mode, str) and "b" in mode
+
+
+def dump(
+    model: Model,
+    fp: IO[Any],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> None:
+    """Write the JSON encoding of ``model`` to ``fp``.
+
+    ``fp`` may be a text or a binary file object. The encoding only
+    contains ASCII characters, so binary sinks receive ASCII bytes.
+    """
+    write: Callable[[str], Any] = fp.write
+    if _is_binary(fp):
+
+        def write(chunk: str) -> None:
+            fp.write(chunk.encode("ascii"))
+
+    encoder = _Encoder(write, chunk_size)
+    registry = metrics.active
+    if registry is None:
+        encoder.model(model)
+    else:
+        registry.observe("encode", type(model), encoder.model, model)
+    encoder.flush()
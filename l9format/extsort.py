@@ -0,0 +1,392 @@
+"""External sort and deduplication of NDJSON event files.
+
+``sort_events()`` sorts files larger than memory by dotted fields, by
+default ``(ip, port, time)``::
+
+    sort_events("archive.ndjson.gz", "sorted.ndjson.gz",
+                dedup="event_fingerprint", memory=512 << 20)
+
+The input is read in runs of at most a share of ``memory``. A pool of
+worker processes parses the JSON lines of each run for their keys only,
+sorts them and spills them to a temporary file as compressed pickled
+batches of ``(key, dedup key, line)``, so runs are merged without parsing
+JSON again. The runs are then merged, ``fan_in`` at a time, and written
+out. Records are never decoded to models: lines are copied as they are.
+"""
+
+import heapq
+import json
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import datetime
+from operator import itemgetter
+from typing import (
+    Any,
+    Callable,
+    Hashable,
+    Iterable,
+    Iterator,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Union,
+)
+
+from l9format.fields import field_type, path_getter
+from l9format.l9format import L9Event, Model, ValidationError
+from l9format.merge import _sort_key, _time
+from l9format.ndjson import CODECS, EventWriter, iter_lines
+
+DEFAULT_KEY = ("ip", "port", "time")
+DEFAULT_MEMORY = 256 << 20
+DEFAULT_FAN_IN = 64
+
+# Estimated memory used by a record besides its line: its parsed key and
+# the tuples holding it.
+_RECORD_OVERHEAD = 256
+# Records per pickled batch in run files.
+_BATCH_SIZE = 4096
+# Records merged between two progress reports.
+_PROGRESS_EVERY = 100_000
+# Compression levels for spilled runs: fast rather than small.
+_SPILL_LEVELS = {"gzip": 1, "bz2": 1, "xz": 0}
+
+Source = Union[str, "os.PathLike[str]", Iterable[str]]
+DedupKey = Union[str, Callable[[dict], Hashable], None]
+_Entry = tuple[tuple[Any, ...], Hashable, str]
+
+
+class SortProgress(NamedTuple):
+    """Where a sort stands: its ``phase`` (``"runs"``, ``"merge"`` or
+    ``"done"``), the records read and written so far, the duplicates
+    dropped, the runs spilled, the seconds elapsed and the invalid records
+    skipped."""
+
+    phase: str
+    records: int
+    written: int
+    duplicates: int
+    runs: int
+    seconds: float
+    failed: int = 0
+
+    @property
+    def rate(self) -> float:
+        """Records read per second while making runs, written after."""
+        done = self.records if self.phase == "runs" else self.written
+        return done / self.seconds if self.seconds > 0 else 0.0
+
+
+class _Spec(NamedTuple):
+    """How to key records, sent to workers with every run."""
+
+    paths: tuple[str, ...]
+    times: tuple[bool, ...]
+    dedup: DedupKey
+    scope: int
+    spill: str
+    skip_invalid: bool
+
+
+class _Dedup:
+    """Drop the records whose dedup key was seen among the records sharing
+    the first ``scope`` key fields. Records without a dedup key are
+    kept."""
+
+    def __init__(self, scope: int) -> None:
+        self.scope = scope
+        self.dropped = 0
+
+    def __call__(self, entries: Iterable[_Entry]) -> Iterator[_Entry]:
+        scope = self.scope
+        group: Any = None
+        seen: set[Hashable] = set()
+        for entry in entries:
+            key, dedup_key, _ = entry
+            prefix = key[:scope]
+            if prefix != group:
+                group = prefix
+                seen.clear()
+            if dedup_key is not None:
+                if dedup_key in seen:
+                    self.dropped += 1
+                    continue
+                seen.add(dedup_key)
+            yield entry
+
+
+def _entry_function(spec: _Spec) -> Callable[[str], _Entry]:
+    loads = json.loads
+    parts = [
+        (path_getter(path), _time if is_time else _sort_key(path))
+        for path, is_time in zip(spec.paths, spec.times)
+    ]
+    dedup = spec.dedup
+    get_dedup = path_getter(dedup) if isinstance(dedup, str) else dedup
+
+    def entry(line: str) -> _Entry:
+        d = loads(line)
+        key = tuple([normalize(get(d)) for get, normalize in parts])
+        return key, None if get_dedup is None else get_dedup(d), line
+
+    return entry
+
+
+def _write_entries(entries: Iterable[_Entry], path: str, spill: str) -> int:
+    count = 0
+    with CODECS[spill].open_write(path, "wb", _SPILL_LEVELS.get(spill)) as f:
+        batch: list[_Entry] = []
+        for entry in entries:
+            batch.append(entry)
+            if len(batch) >= _BATCH_SIZE:
+                pickle.dump(batch, f, pickle.HIGHEST_PROTOCOL)
+                count += len(batch)
+                batch = []
+        if batch:
+            pickle.dump(batch, f, pickle.HIGHEST_PROTOCOL)
+            count += len(batch)
+    return count
+
+
+def _read_entries(path: str, spill: str) -> Iterator[_Entry]:
+    with CODECS[spill].open_read(path) as f:
+        while True:
+            try:
+                batch = pickle.load(f)
+            except EOFError:
+                return
+            yield from batch
+
+
+def _write_run(
+    spec: _Spec, lines: list[str], path: str
+) -> tuple[int, int, int]:
+    """Sort ``lines`` into a run file; return the records written, the
+    duplicates dropped and the invalid records skipped."""
+    entry = _entry_function(spec)
+    entries = []
+    failed = 0
+    for line in lines:
+        try:
+            entries.append(entry(line))
+        except (ValueError, ValidationError):
+            if not spec.skip_invalid:
+                raise
+            failed += 1
+    # The lines live on in the entries; free the list holding them.
+    del lines[:]
+    entries.sort(key=itemgetter(0))
+    dedup = _Dedup(spec.scope)
+    source = entries if spec.dedup is None else dedup(entries)
+    return _write_entries(source, path, spec.spill), dedup.dropped, failed
+
+
+def _lines(source: Source) -> Iterator[str]:
+    if isinstance(source, (str, os.PathLike)):
+        lines: Iterable[str] = (
+            sys.stdin if os.fspath(source) == "-" else iter_lines(source)
+        )
+    else:
+        lines = source
+    for line in lines:
+        line = line.rstrip("\r\n")
+        if line.strip():
+            yield line
+
+
+class _Sorter:
+    def __init__(
+        self,
+        spec: _Spec,
+        directory: str,
+        progress: Optional[Callable[[SortProgress], object]],
+    ) -> None:
+        self.spec = spec
+        self.directory = directory
+        self.progress = progress
+        self.start = time.perf_counter()
+        self.records = 0
+        self.written = 0
+        self.duplicates = 0
+        self.failed = 0
+        self.runs: list[str] = []
+        self._names = 0
+
+    def report(self, phase: str) -> SortProgress:
+        state = SortProgress(
+            phase,
+            self.records,
+            self.written,
+            self.duplicates,
+            len(self.runs),
+            time.perf_counter() - self.start,
+            self.failed,
+        )
+        if self.progress is not None:
+            self.progress(state)
+        return state
+
+    def run_path(self) -> str:
+        self._names += 1
+        return os.path.join(self.directory, f"run-{self._names:06d}")
+
+    def chunks(self, source: Source, budget: int) -> Iterator[list[str]]:
+        chunk: list[str] = []
+        size = 0
+        for line in _lines(source):
+            chunk.append(line)
+            size += len(line) + _RECORD_OVERHEAD
+            if size >= budget:
+                self.records += len(chunk)
+                yield chunk
+                chunk = []
+                size = 0
+        if chunk:
+            self.records += len(chunk)
+            yield chunk
+
+    def finish_run(self, path: str, result: tuple[int, int, int]) -> None:
+        self.runs.append(path)
+        self.duplicates += result[1]
+        self.failed += result[2]
+        self.report("runs")
+
+    def make_runs(self, source: Source, memory: int, workers: int) -> None:
+        spec = self.spec
+        if workers <= 1:
+            # One run in memory at a time, with its parsed keys.
+            for chunk in self.chunks(source, memory // 2):
+                path = self.run_path()
+                self.finish_run(path, _write_run(spec, chunk, path))
+            return
+        # A run being read, plus one per worker being sorted.
+        budget = memory // (2 * (workers + 1))
+        with ProcessPoolExecutor(workers) as pool:
+            pending: deque[tuple[str, Future[tuple[int, int, int]]]] = deque()
+            try:
+                for chunk in self.chunks(source, budget):
+                    path = self.run_path()
+                    pending.append(
+                        (path, pool.submit(_write_run, spec, chunk, path))
+                    )
+                    if len(pending) >= workers:
+                        path, future = pending.popleft()
+                        self.finish_run(path, future.result())
+                while pending:
+                    path, future = pending.popleft()
+                    self.finish_run(path, future.result())
+            finally:
+                for _, future in pending:
+                    future.cancel()
+
+    def merged(self, runs: list[str]) -> Iterator[_Entry]:
+        spill = self.spec.spill
+        entries: Iterable[_Entry] = heapq.merge(
+            *(_read_entries(path, spill) for path in runs), key=itemgetter(0)
+        )
+        if self.spec.dedup is not None:
+            dedup = _Dedup(self.spec.scope)
+            entries = dedup(entries)
+        yield from entries
+        if self.spec.dedup is not None:
+            self.duplicates += dedup.dropped
+        for path in runs:
+            os.remove(path)
+
+    def merge(self, output: "str | os.PathLike[str]", fan_in: int) -> None:
+        # Merge runs in order, so records with equal keys keep the order
+        # of the input.
+        runs = self.runs
+        while len(runs) > fan_in:
+            passes = []
+            for i in range(0, len(runs), fan_in):
+                path = self.run_path()
+                _write_entries(
+                    self.merged(runs[i : i + fan_in]), path, self.spec.spill
+                )
+                passes.append(path)
+            runs = passes
+        with EventWriter(output) as writer:
+            write_line = writer.write_line
+            for _, _, line in self.merged(runs):
+                write_line(line)
+                self.written += 1
+                if self.written % _PROGRESS_EVERY == 0:
+                    self.report("merge")
+
+
+def sort_events(
+    source: Source,
+    output: "str | os.PathLike[str]",
+    key: Sequence[str] = DEFAULT_KEY,
+    dedup: DedupKey = None,
+    dedup_scope: Optional[int] = None,
+    cls: type[Model] = L9Event,
+    memory: int = DEFAULT_MEMORY,
+    workers: Optional[int] = None,
+    tmpdir: Optional[str] = None,
+    fan_in: int = DEFAULT_FAN_IN,
+    spill: str = "gzip",
+    progress: Optional[Callable[[SortProgress], object]] = None,
+    skip_invalid: bool = False,
+) -> SortProgress:
+    """Sort the records of an NDJSON file by the dotted ``key`` fields.
+
+    ``source`` is a path, possibly compressed, ``"-"`` for standard input,
+    or an iterable of JSON lines; ``output`` is written with an
+    ``EventWriter``, compressed after its extension. Fields typed as
+    datetimes in ``cls`` sort by instant, with naive times taken as UTC.
+    Fields named ``ip`` sort as addresses, IPv4 before IPv6, and fields
+    named ``port`` numerically; nulls come first. Records with equal keys
+    keep their input order.
+
+    ``dedup`` drops duplicate records: it is the dotted path of a field,
+    such as ``"event_fingerprint"``, or a function of the raw JSON object,
+    which must be picklable when ``workers`` is more than one. The first
+    record of each dedup key is kept among those sharing the first
+    ``dedup_scope`` key fields, all of them by default. A smaller scope
+    finds more duplicates, remembering the keys of a whole group: with
+    ``dedup_scope=2`` and the default key, every fingerprint seen for an
+    ip and port. Records without a dedup key are always kept.
+
+    ``memory`` is the approximate budget, in bytes, of the records held
+    while making runs, shared by ``workers`` processes (one per CPU by
+    default). Runs are spilled to ``tmpdir`` compressed with the ``spill``
+    codec. ``progress`` is called with a ``SortProgress`` after every run
+    and every 100,000 records merged. Returns the final ``SortProgress``.
+
+    A line that is not JSON, or whose datetime key field is not a valid
+    time, raises ``ValueError`` or ``ValidationError``; with
+    ``skip_invalid`` it is dropped instead and counted in ``failed``.
+    """
+    if not key:
+        raise ValueError("key must name at least one field")
+    times = tuple(
+        isinstance(tp := field_type(cls, path), type)
+        and issubclass(tp, datetime)
+        for path in key
+    )
+    scope = len(key) if dedup_scope is None else dedup_scope
+    if not 0 <= scope <= len(key):
+        raise ValueError(f"dedup_scope must be between 0 and {len(key)}")
+    if fan_in < 2:
+        raise ValueError("fan_in must be at least 2")
+    if spill not in CODECS:
+        raise ValueError(f"unknown codec: {spill}")
+    if workers is None:
+        workers = os.cpu_count() or 1
+    spec = _Spec(tuple(key), times, dedup, scope, spill, skip_invalid)
+    directory = tempfile.mkdtemp(prefix="l9format-sort-", dir=tmpdir)
+    try:
+        sorter = _Sorter(spec, directory, progress)
+        sorter.make_runs(source, memory, workers)
+        sorter.merge(output, fan_in)
+        return sorter.report("done")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
@@ -0,0 +1,71 @@
+"""Dotted field paths over models and raw JSON objects.
+
+A path such as ``"geoip.country_iso_code"`` names a field of a nested
+model. The same path can be resolved on a decoded model or on the raw
+dict it was decoded from.
+"""
+
+from typing import Any, Callable, Union
+
+from l9format.headers import HeaderMap
+from l9format.l9format import Model, _unwrap_optional
+
+
+def split_path(path: str) -> tuple[str, ...]:
+    """Split a dotted path into its components."""
+    parts = tuple(path.split("."))
+    if not all(parts):
+        raise ValueError(f"invalid field path: {path!r}")
+    return parts
+
+
+def get_path(obj: object, path: Union[str, tuple[str, ...]]) -> Any:
+    """Return the value at ``path`` in a model or a raw dict.
+
+    Missing fields and ``None`` along the way resolve to ``None``. In a
+    ``HeaderMap``, header names are matched in any case:
+    ``"http.header.server"``.
+    """
+    parts = split_path(path) if isinstance(path, str) else path
+    for part in parts:
+        if obj is None:
+            return None
+        if isinstance(obj, (dict, HeaderMap)):
+            obj = obj.get(part)
+        else:
+            obj = getattr(obj, part, None)
+    return obj
+
+
+def path_getter(path: str) -> Callable[[object], Any]:
+    """Return a function resolving ``path`` on a model or a raw dict."""
+    parts = split_path(path)
+    if len(parts) == 1:
+        name = parts[0]
+
+        def get_one(obj: object) -> Any:
+            if isinstance(obj, dict):
+                return obj.get(name)
+            return getattr(obj, name, None)
+
+        return get_one
+    return lambda obj: get_path(obj, parts)
+
+
+def field_type(cls: type[Model], path: str) -> Any:
+    """Return the declared type of the field at ``path`` in ``cls``.
+
+    ``Optional`` wrappers are removed. Raises ``ValueError`` when the path
+    does not name a field of the schema.
+    """
+    tp: Any = cls
+    for part in split_path(path):
+        if not (isinstance(tp, type) and issubclass(tp, Model)):
+            raise ValueError(f"{path!r}: {part!r} is not a field of a model")
+        for spec in tp._schema():
+            if spec.name == part:
+                tp = _unwrap_optional(spec.tp)
+                break
+        else:
+            raise ValueError(f"{path!r}: {tp.__name__} has no field {part!r}")
+    return tp
@@ -0,0 +1,442 @@
+"""Predicates over dotted field paths, evaluated before model construction.
+
+A ``Filter`` can be evaluated on a decoded model with ``matches()`` or on
+the raw JSON object it would be decoded from with ``matches_raw()``. Both
+give the same answer for any input that decodes successfully, so readers
+can drop non-matching records before paying for ``from_dict()``.
+
+Filters are built with ``field()``::
+
+    redis_open = (field("protocol") == "redis") & (
+        field("redis.auth_required") == False
+    )
+
+or parsed from a small expression language with ``parse_filter()``::
+
+    parse_filter("protocol == 'redis' and redis.auth_required == false")
+"""
+
+import decimal
+import re
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Any, Callable, Iterable, Optional
+
+from l9format.fields import field_type, split_path
+from l9format.headers import HeaderMap
+from l9format.l9format import L9Event, Model
+
+
+class Filter(ABC):
+    """A predicate evaluable on models and on raw JSON objects."""
+
+    @abstractmethod
+    def matches(self, model: Model) -> bool:
+        """Whether ``model`` satisfies the predicate."""
+
+    @abstractmethod
+    def matches_raw(self, d: dict) -> bool:
+        """Whether the model ``d`` decodes to satisfies the predicate."""
+
+    def __and__(self, other: "Filter") -> "Filter":
+        return _And((self, other))
+
+    def __or__(self, other: "Filter") -> "Filter":
+        return _Or((self, other))
+
+    def __invert__(self) -> "Filter":
+        return _Not(self)
+
+
+def _model_getter(parts: tuple[str, ...]) -> Callable[[object], Any]:
+    def get(obj: object) -> Any:
+        for part in parts:
+            if obj is None:
+                return None
+            obj = getattr(obj, part, None)
+        return obj
+
+    return get
+
+
+def _is_converted(tp: Any) -> bool:
+    """Whether ``from_dict`` turns JSON values of type ``tp`` into another
+    Python type."""
+    return isinstance(tp, type) and issubclass(tp, (datetime, decimal.Decimal))
+
+
+def _owner(cls: type[Model], parts: tuple[str, ...]) -> type[Model]:
+    """Return the model class declaring the last field of a path."""
+    if len(parts) == 1:
+        return cls
+    return field_type(cls, ".".join(parts[:-1]))  # type: ignore[no-any-return]
+
+
+def _raw_getter(
+    parts: tuple[str, ...], tp: Any, owner: type[Model]
+) -> Callable[[dict], Any]:
+    """Return a getter decoding the raw leaf the way ``from_dict`` does."""
+    convert = _is_converted(tp)
+    name = parts[-1]
+
+    def get(d: object) -> Any:
+        for part in parts:
+            if not isinstance(d, dict):
+                return None
+            d = d.get(part)
+        if convert and d is not None:
+            return owner._decode_field(name, d)
+        return d
+
+    return get
+
+
+class _Leaf(Filter):
+    """A predicate on the value at a single path."""
+
+    def __init__(self, path: str, cls: type[Model]) -> None:
+        self.path = path
+        parts = split_path(path)
+        self.tp = field_type(cls, path)
+        self.owner = _owner(cls, parts)
+        self.name = parts[-1]
+        self._get = _model_getter(parts)
+        self._get_raw = _raw_getter(parts, self.tp, self.owner)
+        if self.tp is decimal.Decimal:
+            # Models decoded with float_coordinates hold floats: compare
+            # them as the Decimals raw values decode to.
+            get = self._get
+            decode = self.owner._decode_field
+            name = self.name
+
+            def get_decimal(model: object) -> Any:
+                value = get(model)
+                if isinstance(value, float):
+                    return decode(name, value)
+                return value
+
+            self._get = get_decimal
+
+    def operand(self, value: object) -> object:
+        """Convert a comparison operand to the type of the field."""
+        if (isinstance(value, str) and _is_converted(self.tp)) or (
+            self.tp is decimal.Decimal
+            and isinstance(value, (int, float))
+            and not isinstance(value, bool)
+        ):
+            return self.owner._decode_field(self.name, value)
+        return value
+
+    @abstractmethod
+    def test(self, value: Any) -> bool:
+        """Whether the value at the path satisfies the predicate."""
+
+    def matches(self, model: Model) -> bool:
+        return self.test(self._get(model))
+
+    def matches_raw(self, d: dict) -> bool:
+        return self.test(self._get_raw(d))
+
+
+_COMPARATORS: dict[str, Callable[[Any, Any], bool]] = {
+    "==": lambda a, b: a == b,
+    "!=": lambda a, b: a != b,
+    "<": lambda a, b: a < b,
+    "<=": lambda a, b: a <= b,
+    ">": lambda a, b: a > b,
+    ">=": lambda a, b: a >= b,
+}
+
+
+class _Compare(_Leaf):
+    def __init__(
+        self, path: str, cls: type[Model], op: str, value: object
+    ) -> None:
+        super().__init__(path, cls)
+        self.op = op
+        self.value = self.operand(value)
+        self._compare = _COMPARATORS[op]
+        self._ordering = op not in ("==", "!=")
+
+    def test(self, value: Any) -> bool:
+        if self._ordering and (value is None or self.value is None):
+            return False
+        try:
+            return bool(self._compare(value, self.value))
+        except TypeError:
+            return False
+
+
+class _In(_Leaf):
+    def __init__(
+        self, path: str, cls: type[Model], values: Iterable[object]
+    ) -> None:
+        super().__init__(path, cls)
+        self.values = [self.operand(v) for v in values]
+
+    def test(self, value: Any) -> bool:
+        return value in self.values
+
+
+class _Exists(_Leaf):
+    def test(self, value: Any) -> bool:
+        return value is not None
+
+
+class _Contains(_Leaf):
+    def __init__(self, path: str, cls: type[Model], item: object) -> None:
+        super().__init__(path, cls)
+        self.item = item
+
+    def test(self, value: Any) -> bool:
+        if isinstance(value, str):
+            return isinstance(self.item, str) and self.item in value
+        if isinstance(value, (list, tuple)):
+            return self.item in value
+        if isinstance(value, HeaderMap):
+            # Header names, in any case.
+            return self.item in value
+        if isinstance(value, dict):
+            # Header names decoded as a plain dict, in any case too.
+            return isinstance(self.item, str) and self.item in HeaderMap.lazy(
+                value
+            )
+        return False
+
+
+class _And(Filter):
+    def __init__(self, filters: Iterable[Filter]) -> None:
+        self.filters = tuple(filters)
+
+    def matches(self, model: Model) -> bool:
+        return all(f.matches(model) for f in self.filters)
+
+    def matches_raw(self, d: dict) -> bool:
+        return all(f.matches_raw(d) for f in self.filters)
+
+
+class _Or(Filter):
+    def __init__(self, filters: Iterable[Filter]) -> None:
+        self.filters = tuple(filters)
+
+    def matches(self, model: Model) -> bool:
+        return any(f.matches(model) for f in self.filters)
+
+    def matches_raw(self, d: dict) -> bool:
+        return any(f.matches_raw(d) for f in self.filters)
+
+
+class _Not(Filter):
+    def __init__(self, inner: Filter) -> None:
+        self.inner = inner
+
+    def matches(self, model: Model) -> bool:
+        return not self.inner.matches(model)
+
+    def matches_raw(self, d: dict) -> bool:
+        return not self.inner.matches_raw(d)
+
+
+class Field:
+    """Builder of filters on the field at a dotted path of ``cls``.
+
+    Comparison operators return a ``Filter`` instead of a boolean.
+    """
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __init__(self, path: str, cls: type[Model] = L9Event) -> None:
+        field_type(cls, path)
+        self.path = path
+        self.cls = cls
+
+    def __eq__(self, value: object) -> Filter:  # type: ignore[override]
+        return _Compare(self.path, self.cls, "==", value)
+
+    def __ne__(self, value: object) -> Filter:  # type: ignore[override]
+        return _Compare(self.path, self.cls, "!=", value)
+
+    def __lt__(self, value: object) -> Filter:
+        return _Compare(self.path, self.cls, "<", value)
+
+    def __le__(self, value: object) -> Filter:
+        return _Compare(self.path, self.cls, "<=", value)
+
+    def __gt__(self, value: object) -> Filter:
+        return _Compare(self.path, self.cls, ">", value)
+
+    def __ge__(self, value: object) -> Filter:
+        return _Compare(self.path, self.cls, ">=", value)
+
+    def isin(self, values: Iterable[object]) -> Filter:
+        """Match when the value is one of ``values``."""
+        return _In(self.path, self.cls, values)
+
+    def between(self, low: object, high: object) -> Filter:
+        """Match when ``low <= value <= high``."""
+        return _And((self >= low, self <= high))
+
+    def exists(self) -> Filter:
+        """Match when the field is present and not null."""
+        return _Exists(self.path, self.cls)
+
+    def contains(self, item: object) -> Filter:
+        """Match lists holding ``item``, strings containing it or headers
+        named ``item``."""
+        return _Contains(self.path, self.cls, item)
+
+
+def field(path: str, cls: type[Model] = L9Event) -> Field:
+    """Return a filter builder for the field at ``path`` of ``cls``."""
+    return Field(path, cls)
+
+
+def all_of(*filters: Filter) -> Filter:
+    """Match when every filter matches."""
+    return _And(filters)
+
+
+def any_of(*filters: Filter) -> Filter:
+    """Match when at least one filter matches."""
+    return _Or(filters)
+
+
+# --- Expression language ---
+
+_TOKEN = re.compile(
+    r"""\s*(?:
+        (?P<string>'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*")
+      | (?P<number>-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?)
+      | (?P<op>==|!=|<=|>=|<|>|\(|\)|\[|\]|,)
+      | (?P<word>[A-Za-z_][A-Za-z0-9_.]*)
+    )""",
+    re.VERBOSE,
+)
+
+_KEYWORDS = {"and", "or", "not", "in", "exists", "contains"}
+_CONSTANTS = {"true": True, "false": False, "null": None}
+
+
+def _tokenize(text: str) -> list[tuple[str, str]]:
+    tokens = []
+    pos = 0
+    text = text.rstrip()
+    while pos < len(text):
+        m = _TOKEN.match(text, pos)
+        if m is None:
+            raise ValueError(f"invalid filter syntax at: {text[pos:]!r}")
+        kind = m.lastgroup
+        assert kind is not None
+        tokens.append((kind, m.group(kind)))
+        pos = m.end()
+    return tokens
+
+
+class _Parser:
+    """Recursive descent parser for ``parse_filter``."""
+
+    def __init__(self, text: str, cls: type[Model]) -> None:
+        self.tokens = _tokenize(text)
+        self.pos = 0
+        self.cls = cls
+
+    def peek(self) -> Optional[tuple[str, str]]:
+        if self.pos < len(self.tokens):
+            return self.tokens[self.pos]
+        return None
+
+    def next(self) -> tuple[str, str]:
+        token = self.peek()
+        if token is None:
+            raise ValueError("unexpected end of filter")
+        self.pos += 1
+        return token
+
+    def accept(self, text: str) -> bool:
+        token = self.peek()
+        if token is not None and token[1] == text and token[0] != "string":
+            self.pos += 1
+            return True
+        return False
+
+    def expect(self, text: str) -> None:
+        if not self.accept(text):
+            raise ValueError(f"expected {text!r} in filter")
+
+    def parse(self) -> Filter:
+        result = self.disjunction()
+        if self.peek() is not None:
+            raise ValueError(f"unexpected {self.next()[1]!r} in filter")
+        return result
+
+    def disjunction(self) -> Filter:
+        filters = [self.conjunction()]
+        while self.accept("or"):
+            filters.append(self.conjunction())
+        return filters[0] if len(filters) == 1 else _Or(filters)
+
+    def conjunction(self) -> Filter:
+        filters = [self.negation()]
+        while self.accept("and"):
+            filters.append(self.negation())
+        return filters[0] if len(filters) == 1 else _And(filters)
+
+    def negation(self) -> Filter:
+        if self.accept("not"):
+            return _Not(self.negation())
+        if self.accept("("):
+            inner = self.disjunction()
+            self.expect(")")
+            return inner
+        return self.predicate()
+
+    def predicate(self) -> Filter:
+        kind, path = self.next()
+        if kind != "word" or path in _KEYWORDS or path in _CONSTANTS:
+            raise ValueError(f"expected a field path, got {path!r}")
+        target = Field(path, self.cls)
+        kind, op = self.next()
+        if op == "exists" and kind == "word":
+            return target.exists()
+        if op == "contains" and kind == "word":
+            return target.contains(self.value())
+        if op == "in" and kind == "word":
+            return target.isin(self.values())
+        if kind == "op" and op in _COMPARATORS:
+            return _Compare(path, self.cls, op, self.value())
+        raise ValueError(f"unknown operator {op!r} in filter")
+
+    def values(self) -> list[object]:
+        if not (self.accept("[") or self.accept("(")):
+            raise ValueError("expected a list after 'in'")
+        result: list[object] = []
+        while not (self.accept("]") or self.accept(")")):
+            if result:
+                self.expect(",")
+            result.append(self.value())
+        return result
+
+    def value(self) -> object:
+        kind, text = self.next()
+        if kind == "string":
+            return re.sub(r"\\(.)", r"\1", text[1:-1])
+        if kind == "number":
+            if any(c in text for c in ".eE"):
+                return float(text)
+            return int(text)
+        if kind == "word" and text in _CONSTANTS:
+            return _CONSTANTS[text]
+        raise ValueError(f"expected a value, got {text!r}")
+
+
+def parse_filter(text: str, cls: type[Model] = L9Event) -> Filter:
+    """Parse a filter expression over the fields of ``cls``.
+
+    The language supports ``==``, ``!=``, ``<``, ``<=``, ``>``, ``>=``,
+    ``in [..]``, ``exists``, ``contains``, ``and``, ``or``, ``not`` and
+    parentheses. Values are quoted strings, numbers, ``true``, ``false``
+    and ``null``::
+
+        protocol in ['redis', 'mongodb'] and not tags contains 'honeypot'
+    """
+    return _Parser(text, cls).parse()
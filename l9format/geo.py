@@ -0,0 +1,151 @@
+"""Bulk bounding-box and distance filters over ``GeoPoint`` coordinates.
+
+``GeoBatch`` extracts the coordinates at a dotted path of many models into
+two flat float arrays once; the filters then run over the arrays, with
+numpy when it is installed and in plain Python otherwise.
+
+::
+
+    batch = GeoBatch(events)
+    europe = batch.select(batch.in_bbox(34.0, -25.0, 72.0, 45.0))
+    near_paris = batch.select(batch.within(48.8566, 2.3522, radius_km=50))
+"""
+
+import array
+import math
+from typing import Iterable, Optional, Sequence
+
+from l9format.fields import field_type, path_getter
+from l9format.l9format import GeoPoint, L9Event, Model, _numpy
+
+# Mean Earth radius (IUGG).
+EARTH_RADIUS_KM = 6371.0088
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Return the great-circle distance between two points in km."""
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = (
+        math.sin(dphi / 2) ** 2
+        + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(a, 1.0)))
+
+
+class GeoBatch:
+    """Coordinates of a batch of models, for bulk geographic filters.
+
+    ``path`` names a ``GeoPoint`` field of ``cls``. Models without a point
+    there never match. Filters return the indices of the matching models;
+    pass them to ``select()`` to get the models. ``vectorize`` forces
+    (``True``) or disables (``False``) the numpy implementation; by
+    default it is used when numpy is installed.
+    """
+
+    def __init__(
+        self,
+        models: Iterable[Model],
+        path: str = "geoip.location",
+        cls: type[Model] = L9Event,
+        vectorize: Optional[bool] = None,
+    ) -> None:
+        tp = field_type(cls, path)
+        if not (isinstance(tp, type) and issubclass(tp, GeoPoint)):
+            raise ValueError(f"{path!r} is not a GeoPoint field")
+        self.models = list(models)
+        get = path_getter(path)
+        nan = math.nan
+        self.lats = array.array("d")
+        self.lons = array.array("d")
+        for model in self.models:
+            point = get(model)
+            if point is None:
+                self.lats.append(nan)
+                self.lons.append(nan)
+            else:
+                self.lats.append(float(point.lat))
+                self.lons.append(float(point.lon))
+        self._np = _numpy() if vectorize is not False else None
+        if vectorize and self._np is None:
+            raise ImportError("vectorize=True requires numpy")
+
+    def __len__(self) -> int:
+        return len(self.models)
+
+    def select(self, indices: Iterable[int]) -> list[Model]:
+        """Return the models at ``indices``."""
+        models = self.models
+        return [models[i] for i in indices]
+
+    def in_bbox(
+        self, south: float, west: float, north: float, east: float
+    ) -> list[int]:
+        """Return the indices of the points inside a bounding box.
+
+        Bounds are inclusive. A box with ``west > east`` crosses the
+        antimeridian.
+        """
+        np = self._np
+        if np is not None:
+            lat = np.frombuffer(self.lats)
+            lon = np.frombuffer(self.lons)
+            mask = (lat >= south) & (lat <= north)
+            if west <= east:
+                mask &= (lon >= west) & (lon <= east)
+            else:
+                mask &= (lon >= west) | (lon <= east)
+            return [int(i) for i in np.flatnonzero(mask)]
+        result = []
+        wraps = west > east
+        for i, (lat, lon) in enumerate(zip(self.lats, self.lons)):
+            if not south <= lat <= north:
+                continue
+            if (west <= lon or lon <= east) if wraps else west <= lon <= east:
+                result.append(i)
+        return result
+
+    def distances_km(self, lat: float, lon: float) -> Sequence[float]:
+        """Return the distance in km of every point to ``(lat, lon)``, NaN
+        for models without a point."""
+        np = self._np
+        if np is not None:
+            phi1 = math.radians(lat)
+            phi2 = np.radians(np.frombuffer(self.lats))
+            dlambda = np.radians(np.frombuffer(self.lons) - lon)
+            a = (
+                np.sin((phi2 - phi1) / 2) ** 2
+                + math.cos(phi1) * np.cos(phi2) * np.sin(dlambda / 2) ** 2
+            )
+            distances = (
+                2 * EARTH_RADIUS_KM * np.arcsin(np.minimum(1.0, np.sqrt(a)))
+            )
+            return array.array("d", distances.tobytes())
+        return array.array(
+            "d",
+            (
+                haversine_km(lat, lon, p_lat, p_lon)
+                for p_lat, p_lon in zip(self.lats, self.lons)
+            ),
+        )
+
+    def within(self, lat: float, lon: float, radius_km: float) -> list[int]:
+        """Return the indices of the points at most ``radius_km`` from
+        ``(lat, lon)``."""
+        np = self._np
+        if np is not None:
+            distances = np.frombuffer(self.distances_km(lat, lon))
+            return [int(i) for i in np.flatnonzero(distances <= radius_km)]
+        # Latitude bounds are exact on a sphere and discard most points
+        # before the trigonometry.
+        margin = math.degrees(radius_km / EARTH_RADIUS_KM)
+        south, north = lat - margin, lat + margin
+        result = []
+        for i, (p_lat, p_lon) in enumerate(zip(self.lats, self.lons)):
+            if south <= p_lat <= north and (
+                haversine_km(lat, lon, p_lat, p_lon) <= radius_km
+            ):
+                result.append(i)
+        return result
@@ -0,0 +1,180 @@
+"""Canonical content hashing of l9format models.
+
+The hash walks a model in schema order and feeds a type-tagged encoding of
+every value to a ``hashlib`` digest. No JSON is produced, and the encoding
+does not depend on how values were formatted on input:
+
+- fields are identified by name, and optional fields set to ``None`` are
+  skipped, so adding a new optional field to a model does not change the
+  hash of existing data;
+- ``Decimal`` values are normalized (``1.50`` and ``1.5`` hash equal), and
+  float values of ``Decimal`` fields, such as ``GeoPoint`` coordinates in
+  the float representation, hash as the ``Decimal`` they serialize to;
+- timezone-aware ``datetime`` values are converted to UTC first;
+- mapping entries are sorted by key.
+
+The encoding is part of the public contract: it only changes with a major
+version of the library.
+"""
+
+import decimal
+import hashlib
+from collections.abc import Mapping
+from datetime import datetime, timezone
+from typing import Any, Iterable, Union
+
+from l9format.l9format import Model, _class_cache
+from l9format.lazy import LazyList
+
+# Fields that differ between two observations of the same service.
+DEFAULT_EVENT_EXCLUDE = ("time", "event_pipeline", "event_fingerprint")
+
+_FLUSH_SIZE = 1 << 12
+
+_ExcludeTree = dict[str, Union["_ExcludeTree", bool]]
+
+
+def _exclude_tree(paths: Iterable[str]) -> _ExcludeTree:
+    """Turn dotted paths into a nested lookup tree.
+
+    A leaf is ``True``; an inner node is another tree.
+    """
+    tree: _ExcludeTree = {}
+    for path in paths:
+        node = tree
+        *parents, leaf = path.split(".")
+        for part in parents:
+            child = node.setdefault(part, {})
+            if child is True:
+                break
+            node = child  # type: ignore[assignment]
+        else:
+            node[leaf] = True
+    return tree
+
+
+_FIELD_TAGS: dict[type, tuple[str, ...]] = {}
+
+
+def _field_tags(cls: type[Model]) -> tuple[str, ...]:
+    """Return the pre-encoded field tag of every field of ``cls``."""
+    return _class_cache(
+        _FIELD_TAGS,
+        cls,
+        lambda: tuple(
+            f"F{len(spec.name)}:{spec.name}" for spec in cls._schema()
+        ),
+    )
+
+
+class _Hasher:
+    """Build the canonical encoding as text fragments.
+
+    Every variable-length value is written as a one letter tag, its length
+    in code points, a colon and the text itself, which keeps the encoding
+    unambiguous. Fragments are encoded to UTF-8 and fed to the digest in
+    batches.
+    """
+
+    def __init__(self, digest: Any) -> None:
+        self.digest = digest
+        self.parts: list[str] = []
+
+    def flush(self) -> None:
+        data = "".join(self.parts).encode("utf-8", "surrogatepass")
+        self.digest.update(data)
+        self.parts.clear()
+
+    def model(self, obj: Model, exclude: _ExcludeTree) -> None:
+        append = self.parts.append
+        cls = type(obj)
+        name = cls.__name__
+        append(f"M{len(name)}:{name}")
+        for spec, tag in zip(cls._schema(), _field_tags(cls)):
+            sub = exclude.get(spec.name) if exclude else None
+            if sub is True:
+                continue
+            value = getattr(obj, spec.name)
+            if value is None and spec.optional:
+                continue
+            append(tag)
+            tp = type(value)
+            if tp is str:
+                append(f"s{len(value)}:")
+                append(value)
+            elif isinstance(value, float) and spec.tp is decimal.Decimal:
+                # Float coordinates hash like the Decimal they serialize to.
+                text = obj._serialize_field(value, spec.tp)
+                self.value(decimal.Decimal(str(text)), {})
+            else:
+                self.value(value, sub or {})
+        append("E")
+        if len(self.parts) >= _FLUSH_SIZE:
+            self.flush()
+
+    def value(self, value: Any, exclude: _ExcludeTree) -> None:
+        append = self.parts.append
+        tp = type(value)
+        if tp is str:
+            append(f"s{len(value)}:")
+            append(value)
+        elif value is None:
+            append("n")
+        elif value is True:
+            append("t")
+        elif value is False:
+            append("f")
+        elif tp is int:
+            text = int.__repr__(value)
+            append(f"i{len(text)}:{text}")
+        elif isinstance(value, Model):
+            self.model(value, exclude)
+        elif isinstance(value, (list, tuple, LazyList)):
+            append(f"L{len(value)}:")
+            items = value.stream() if isinstance(value, LazyList) else value
+            for item in items:
+                self.value(item, exclude)
+        elif isinstance(value, str):
+            self.value(str(value), exclude)
+        elif isinstance(value, int):
+            self.value(int(value), exclude)
+        elif isinstance(value, float):
+            text = float.__repr__(value)
+            append(f"d{len(text)}:{text}")
+        elif isinstance(value, decimal.Decimal):
+            if value.is_finite():
+                value = value.normalize()
+            text = f"{value:f}"
+            append(f"D{len(text)}:{text}")
+        elif isinstance(value, datetime):
+            if value.tzinfo is not None:
+                text = value.astimezone(timezone.utc).isoformat()
+                append(f"T{len(text)}:{text}")
+            else:
+                text = value.isoformat()
+                append(f"N{len(text)}:{text}")
+        elif isinstance(value, Mapping):
+            items = sorted(value.items(), key=lambda kv: str(kv[0]))
+            append(f"O{len(items)}:")
+            for key, item in items:
+                self.value(key, {})
+                self.value(item, {})
+        else:
+            raise TypeError(f"cannot hash value of type {type(value).__name__}")
+
+
+def content_hash(
+    model: Model,
+    exclude: Iterable[str] = (),
+    algorithm: str = "sha256",
+) -> str:
+    """Return the hex digest of the canonical encoding of ``model``.
+
+    ``exclude`` lists dotted field paths left out of the hash, such as
+    ``"time"`` or ``"ssl.certificate.not_before"``. ``algorithm`` is any
+    name accepted by ``hashlib.new``.
+    """
+    hasher = _Hasher(hashlib.new(algorithm))
+    hasher.model(model, _exclude_tree(exclude))
+    hasher.flush()
+    return str(hasher.digest.hexdigest())
@@ -0,0 +1,209 @@
+"""Compact, case-insensitive storage of HTTP headers.
+
+Scans see the same few dozen header names over and over, often in the
+same order. ``HeaderMap`` stores the names of a header set in a shared,
+interned layout and keeps only a tuple of values per instance, which
+takes a fraction of the memory of a dict with its own key strings.
+"""
+
+import sys
+from collections.abc import ItemsView, Iterator, Mapping, ValuesView
+from typing import Any, Iterable, MutableMapping, NamedTuple, Optional, Union
+
+# Number of distinct name layouts shared between instances. Header sets
+# beyond that get a private layout, so hostile input cannot grow the
+# cache without bound.
+_MAX_LAYOUTS = 4096
+
+
+class _Layout(NamedTuple):
+    """Header names in order, and their positions by name and by
+    lower-cased name."""
+
+    names: tuple[str, ...]
+    positions: dict[str, int]
+    folded: dict[str, int]
+
+
+_LAYOUTS: dict[tuple[str, ...], _Layout] = {}
+_EMPTY = _Layout((), {}, {})
+
+
+def _build_layout(names: tuple[str, ...]) -> _Layout:
+    positions = {name: i for i, name in enumerate(names)}
+    folded: dict[str, int] = {}
+    for i, name in enumerate(names):
+        folded.setdefault(name.lower(), i)
+    return _Layout(names, positions, folded)
+
+
+def _layout(names: tuple[str, ...]) -> _Layout:
+    layout = _LAYOUTS.get(names)
+    if layout is not None:
+        return layout
+    if not names:
+        return _EMPTY
+    if len(_LAYOUTS) >= _MAX_LAYOUTS:
+        return _build_layout(names)
+    layout = _build_layout(tuple(sys.intern(name) for name in names))
+    return _LAYOUTS.setdefault(layout.names, layout)
+
+
+class _ItemsView(ItemsView[str, Any]):
+    _mapping: "HeaderMap"
+
+    def __iter__(self) -> Iterator[tuple[str, Any]]:
+        headers = self._mapping
+        headers._materialize()
+        return zip(headers._layout.names, headers._values)
+
+
+class _ValuesView(ValuesView[Any]):
+    _mapping: "HeaderMap"
+
+    def __iter__(self) -> Iterator[Any]:
+        headers = self._mapping
+        headers._materialize()
+        return iter(headers._values)
+
+
+class HeaderMap(MutableMapping[str, Any]):
+    """A mapping of HTTP header names to values.
+
+    Lookups ignore case; an exact match wins over a case-insensitive one.
+    Iteration keeps the names as given, in order, so ``to_dict()`` gives
+    back the mapping the instance was built from. Assigning to an existing
+    header, in any case, replaces its value and keeps its name.
+
+    ``HeaderMap.lazy(d)`` wraps a dict without copying it and builds the
+    compact form on first access.
+    """
+
+    __slots__ = ("_layout", "_values", "_raw")
+
+    _layout: _Layout
+    _values: tuple[Any, ...]
+    _raw: Optional[dict[str, Any]]
+
+    def __init__(
+        self,
+        headers: Union[Mapping[str, Any], Iterable[tuple[str, Any]]] = (),
+    ) -> None:
+        self._raw = None
+        if isinstance(headers, HeaderMap):
+            headers._materialize()
+            self._layout = headers._layout
+            self._values = headers._values
+            return
+        if not isinstance(headers, Mapping):
+            headers = dict(headers)
+        self._layout = _layout(tuple(headers))
+        self._values = tuple(headers.values())
+
+    @classmethod
+    def lazy(cls, raw: dict[str, Any]) -> "HeaderMap":
+        """Return a map reading ``raw`` until it is first accessed.
+
+        ``raw`` must not be modified afterwards.
+        """
+        headers = cls.__new__(cls)
+        headers._raw = raw
+        return headers
+
+    def _materialize(self) -> None:
+        raw = self._raw
+        if raw is not None:
+            self._layout = _layout(tuple(raw))
+            self._values = tuple(raw.values())
+            self._raw = None
+
+    def _position(self, key: str) -> Optional[int]:
+        self._materialize()
+        layout = self._layout
+        i = layout.positions.get(key)
+        if i is None and isinstance(key, str):
+            i = layout.folded.get(key.lower())
+        return i
+
+    def __getitem__(self, key: str) -> Any:
+        i = self._position(key)
+        if i is None:
+            raise KeyError(key)
+        return self._values[i]
+
+    def __contains__(self, key: object) -> bool:
+        return isinstance(key, str) and self._position(key) is not None
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        i = self._position(key)
+        if i is None:
+            self._layout = _layout(self._layout.names + (key,))
+            self._values += (value,)
+        else:
+            values = self._values
+            self._values = values[:i] + (value,) + values[i + 1 :]
+
+    def __delitem__(self, key: str) -> None:
+        i = self._position(key)
+        if i is None:
+            raise KeyError(key)
+        names = self._layout.names
+        self._layout = _layout(names[:i] + names[i + 1 :])
+        self._values = self._values[:i] + self._values[i + 1 :]
+
+    def __iter__(self) -> Iterator[str]:
+        if self._raw is not None:
+            return iter(self._raw)
+        return iter(self._layout.names)
+
+    def __len__(self) -> int:
+        if self._raw is not None:
+            return len(self._raw)
+        return len(self._values)
+
+    def items(self) -> ItemsView[str, Any]:
+        return _ItemsView(self)
+
+    def values(self) -> ValuesView[Any]:
+        return _ValuesView(self)
+
+    def to_dict(self) -> dict[str, Any]:
+        """Return the headers as a new dict."""
+        if self._raw is not None:
+            return dict(self._raw)
+        return dict(zip(self._layout.names, self._values))
+
+    def copy(self) -> "HeaderMap":
+        return type(self)(self)
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, HeaderMap):
+            other = other._raw if other._raw is not None else other.to_dict()
+        elif not isinstance(other, Mapping):
+            return NotImplemented
+        elif not isinstance(other, dict):
+            other = dict(other.items())
+        if self._raw is not None:
+            return self._raw == other
+        return self.to_dict() == other
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        # Instances sharing a layout share its names tuple, which pickle
+        # then writes once.
+        self._materialize()
+        return _unpickle_headers, (type(self), self._layout.names, self._values)
+
+
+def _unpickle_headers(
+    cls: type[HeaderMap], names: tuple[str, ...], values: tuple[Any, ...]
+) -> HeaderMap:
+    headers = cls.__new__(cls)
+    headers._raw = None
+    headers._layout = _layout(names)
+    headers._values = values
+    return headers
@@ -0,0 +1,292 @@
+"""Incremental reading of the elements of a JSON array inside a document.
+
+``json.loads`` needs the whole document in memory and builds every object
+before the first model can be decoded. ``iter_items()`` reads the input in
+chunks instead, walks to the array at a dotted ``path`` (the document
+itself when empty, ``"events"`` for an ``L9Aggregation`` export) and
+parses its elements one at a time, so memory stays bounded by the largest
+element::
+
+    with open("aggregation.json", "rb") as f:
+        for event in iter_models(f, path="events"):
+            ...
+
+Only the elements are validated: the rest of the document is skipped
+without being parsed, and reading stops at the end of the array.
+"""
+
+import codecs
+import json
+import os
+import re
+from typing import (
+    IO,
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Iterable,
+    Iterator,
+    Optional,
+    Union,
+)
+
+from l9format.fields import split_path
+from l9format.l9format import L9Event, Model
+
+if TYPE_CHECKING:
+    from l9format.filter import Filter
+
+DEFAULT_CHUNK_SIZE = 1 << 16
+
+Source = Union[
+    str,
+    bytes,
+    bytearray,
+    "os.PathLike[str]",
+    IO[str],
+    IO[bytes],
+    Iterable[Union[str, bytes]],
+]
+
+_BLANK = re.compile(r"[ \t\n\r]*")
+# Characters that matter when skipping over a container, and inside a
+# string.
+_STRUCTURE = re.compile(r'[][{}"]')
+_STRING = re.compile(r'["\\]')
+_SCALAR_END = re.compile(r"[ \t\n\r,\]}]")
+
+
+def _chunks(source: Source, chunk_size: int) -> Iterator[Union[str, bytes]]:
+    if isinstance(source, (str, bytes, bytearray)):
+        yield bytes(source) if isinstance(source, bytearray) else source
+    elif isinstance(source, os.PathLike):
+        from l9format.ndjson import detect_codec
+
+        with detect_codec(source).open_read(os.fspath(source)) as f:
+            yield from iter(lambda: f.read(chunk_size), b"")
+    elif hasattr(source, "read"):
+        read = source.read
+        while True:
+            chunk = read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+    else:
+        yield from source  # type: ignore[misc]
+
+
+def _text(chunks: Iterator[Union[str, bytes]]) -> Iterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    for chunk in chunks:
+        text = chunk if isinstance(chunk, str) else decoder.decode(chunk)
+        if text:
+            yield text
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+class _Reader:
+    """A buffer over text chunks with a cursor.
+
+    The consumed prefix of the buffer is dropped when more input is read,
+    except from ``mark`` on while a value is being read. At least as much
+    input as is left pending is read at once, so a value spanning many
+    chunks is copied a few times rather than once per chunk.
+    """
+
+    def __init__(self, chunks: Iterator[str]) -> None:
+        self.chunks = chunks
+        self.buf = ""
+        self.pos = 0
+        self.mark: Optional[int] = None
+        self.consumed = 0
+
+    def fill(self) -> bool:
+        chunk = next(self.chunks, None)
+        if chunk is None:
+            return False
+        cut = self.pos if self.mark is None else self.mark
+        if cut:
+            self.buf = self.buf[cut:]
+            self.consumed += cut
+            self.pos -= cut
+            if self.mark is not None:
+                self.mark -= cut
+        parts = [self.buf, chunk]
+        size = len(chunk)
+        while size < len(self.buf):
+            chunk = next(self.chunks, None)
+            if chunk is None:
+                break
+            parts.append(chunk)
+            size += len(chunk)
+        self.buf = "".join(parts)
+        return True
+
+    def error(self, message: str) -> ValueError:
+        return ValueError(f"{message} at offset {self.consumed + self.pos}")
+
+    def peek(self) -> str:
+        """Skip blanks and return the next character, ``""`` at the end."""
+        match = _BLANK.match
+        while True:
+            blanks = match(self.buf, self.pos)
+            self.pos = blanks.end()  # type: ignore[union-attr]
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                return ""
+
+    def expect(self, char: str) -> None:
+        found = self.peek()
+        if found != char:
+            raise self.error(f"expected {char!r}, found {found or 'end'!r}")
+        self.pos += 1
+
+    def skip_string(self) -> None:
+        """Move past a string whose opening quote was consumed."""
+        while True:
+            m = _STRING.search(self.buf, self.pos)
+            if m is None:
+                self.pos = len(self.buf)
+                if not self.fill():
+                    raise self.error("unterminated string")
+                continue
+            self.pos = m.end()
+            if m.group() == '"':
+                return
+            # Skip the escaped character, which may not be read yet.
+            while self.pos >= len(self.buf):
+                if not self.fill():
+                    raise self.error("unterminated string")
+            self.pos += 1
+
+    def skip_value(self) -> None:
+        """Move past the next value without parsing it."""
+        first = self.peek()
+        if not first:
+            raise self.error("unexpected end of input")
+        if first == '"':
+            self.pos += 1
+            self.skip_string()
+            return
+        if first in "[{":
+            depth = 0
+            while True:
+                m = _STRUCTURE.search(self.buf, self.pos)
+                if m is None:
+                    self.pos = len(self.buf)
+                    if not self.fill():
+                        raise self.error("unexpected end of input")
+                    continue
+                self.pos = m.end()
+                char = m.group()
+                if char == '"':
+                    self.skip_string()
+                elif char in "[{":
+                    depth += 1
+                else:
+                    depth -= 1
+                    if depth == 0:
+                        return
+        while True:
+            m = _SCALAR_END.search(self.buf, self.pos)
+            if m is not None:
+                self.pos = m.start()
+                return
+            self.pos = len(self.buf)
+            if not self.fill():
+                return
+
+    def read_value(self) -> Any:
+        """Parse the next value."""
+        self.peek()
+        self.mark = self.pos
+        try:
+            self.skip_value()
+            text = self.buf[self.mark : self.pos]
+        finally:
+            self.mark = None
+        try:
+            return json.loads(text)
+        except json.JSONDecodeError as e:
+            raise self.error(f"invalid JSON value: {e.msg}") from None
+
+    def find_key(self, key: str) -> bool:
+        """Move to the value of ``key`` in the object starting here."""
+        self.expect("{")
+        if self.peek() == "}":
+            return False
+        while True:
+            name = self.read_value()
+            if not isinstance(name, str):
+                raise self.error("expected an object key")
+            self.expect(":")
+            if name == key:
+                return True
+            self.skip_value()
+            if self.peek() != ",":
+                self.expect("}")
+                return False
+            self.pos += 1
+
+    def items(self, path: tuple[str, ...]) -> Iterator[Any]:
+        for key in path:
+            if not self.find_key(key):
+                return
+        first = self.peek()
+        if first == "n":
+            # A null array.
+            self.read_value()
+            return
+        self.expect("[")
+        if self.peek() == "]":
+            return
+        while True:
+            yield self.read_value()
+            if self.peek() != ",":
+                self.expect("]")
+                return
+            self.pos += 1
+
+
+def iter_items(
+    source: Source, path: str = "", chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Iterator[Any]:
+    """Yield the parsed elements of the JSON array at ``path``.
+
+    ``source`` is JSON text (a ``str``) or bytes, a ``pathlib.Path`` or
+    other path-like object naming a file, possibly compressed, a text or
+    binary file object, or an iterable of text or byte chunks. A file name
+    must be given as a path-like object: a ``str`` is parsed as JSON.
+    ``path`` is a dotted path of object keys leading to the array; nothing
+    is yielded when a key is missing or the array is null. Raises
+    ``ValueError`` on malformed input.
+    """
+    parts = split_path(path) if path else ()
+    reader = _Reader(_text(_chunks(source, chunk_size)))
+    yield from reader.items(parts)
+
+
+def iter_models(
+    source: Source,
+    cls: type[Model] = L9Event,
+    path: str = "",
+    where: Optional["Filter"] = None,
+    retain_raw: bool = False,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Iterator[Model]:
+    """Yield the elements of the JSON array at ``path`` decoded as ``cls``.
+
+    When ``where`` is given, it is evaluated on the raw elements and only
+    matching ones are decoded. See ``iter_items()`` for ``source`` and
+    ``path``.
+    """
+    from_dict: Callable[..., Model] = cls.from_dict
+    items = iter_items(source, path, chunk_size)
+    if where is not None:
+        matches = where.matches_raw
+        items = (d for d in items if matches(d))
+    for d in items:
+        yield from_dict(d, retain_raw)
@@ -1,17 +1,45 @@
 import dataclasses
 import decimal
+import functools
+import operator
+import threading
 from collections import OrderedDict
 from datetime import datetime
-from typing import Any, Optional
+from typing import (
+    IO,
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Iterable,
+    Mapping,
+    NamedTuple,
+    Optional,
+    TypeVar,
+    get_origin,
+)
+
+from l9format import metrics as _metrics
+from l9format.headers import HeaderMap
+from l9format.lazy import LazyList
+
+if TYPE_CHECKING:
+    from l9format.cidr import Prefix
 
 
 class ValidationError(Exception):
-    """Raised when a required field is missing or a type check fails."""
+    """Raised when a required field is missing or a type check fails.
 
-    def __init__(self, message: str, value: object = None) -> None:
+    ``field`` is the dotted path of the offending field, relative to the
+    model ``from_dict()`` was called on, when the error is about a field.
+    """
+
+    def __init__(
+        self, message: str, value: object = None, field: Optional[str] = None
+    ) -> None:
         super().__init__(message)
         self.message = message
         self.value = value
+        self.field = field
 
 
 def round_decimal(
@@ -42,7 +70,21 @@ def _unwrap_optional(tp: Any) -> Any:
     return tp
 
 
-def _deserialize_value(value: object, tp: Any) -> object:
+class _DecodeOptions(NamedTuple):
+    """Keyword arguments of ``from_dict()``, passed down to nested models."""
+
+    retain_raw: bool = False
+    float_coordinates: bool = False
+    compact_headers: bool = False
+    lazy_events: bool = False
+
+
+_DEFAULT_OPTIONS = _DecodeOptions()
+
+
+def _deserialize_value(
+    value: object, tp: Any, options: _DecodeOptions = _DEFAULT_OPTIONS
+) -> object:
     """Deserialize a value into the expected type."""
     if value is None:
         return None
@@ -61,7 +103,7 @@ def _deserialize_value(value: object, tp: Any) -> object:
                 f"expected list, got {type(value).__name__}",
                 value,
             )
-        return [_deserialize_value(item, elem_type) for item in value]
+        return [_deserialize_value(item, elem_type, options) for item in value]
 
     if origin is dict:
         args = get_args(tp)
@@ -84,7 +126,7 @@ def _deserialize_value(value: object, tp: Any) -> object:
                 f"got {type(value).__name__}",
                 value,
             )
-        return tp.from_dict(value)
+        return tp.from_dict(value, *options)
 
     if isinstance(tp, type) and issubclass(tp, datetime):
         if not isinstance(value, str):
@@ -108,6 +150,79 @@ def _deserialize_value(value: object, tp: Any) -> object:
     return value
 
 
+class _FieldSpec(NamedTuple):
+    """Resolved description of a single dataclass field."""
+
+    name: str
+    tp: Any
+    optional: bool
+
+
+# Per-class caches are filled lazily, possibly from several threads at
+# once. Lookups are plain dict reads; a miss builds the entry under
+# _CACHE_LOCK so that each entry is computed once and never changes
+# afterwards, which keeps them safe on free-threaded builds too.
+_CACHE_LOCK = threading.RLock()
+
+_T = TypeVar("_T")
+
+
+def _class_cache(
+    cache: dict[type, _T], cls: type, build: Callable[[], _T]
+) -> _T:
+    """Return ``cache[cls]``, building it with ``build()`` on first use."""
+    value = cache.get(cls)
+    if value is None:
+        with _CACHE_LOCK:
+            value = cache.get(cls)
+            if value is None:
+                value = build()
+                cache[cls] = value
+    return value
+
+
+def _numpy(feature: Optional[str] = None) -> Any:
+    """Return the numpy module, imported on first use. When numpy is not
+    installed, return None, or raise ``ImportError`` naming ``feature``
+    when given."""
+    try:
+        import numpy  # type: ignore[import-not-found]
+    except ImportError as e:
+        if feature is None:
+            return None
+        raise ImportError(f"{feature} requires numpy") from e
+    return numpy
+
+
+_SCHEMAS: dict[type, tuple[_FieldSpec, ...]] = {}
+
+# Instance attribute holding the state kept by from_dict(retain_raw=True).
+_RETAINED = "_l9_retained"
+# Marks a field missing from the input of _retain().
+_MISSING = object()
+
+
+class _Retained(NamedTuple):
+    """Encoded form of a model kept from decoding, and the field values it
+    corresponds to."""
+
+    encoded: OrderedDict
+    snapshot: tuple[Any, ...]
+
+
+class _RetainPlan(NamedTuple):
+    """Per-class helpers used to compare a model with its snapshot."""
+
+    # Returns the tuple of all field values of an instance.
+    values: Callable[[Any], tuple[Any, ...]]
+    # Indices of the fields holding nested models, lists or dicts.
+    nested: tuple[int, ...]
+
+
+_RETAIN_PLANS: dict[type, _RetainPlan] = {}
+_FIELD_NAMES: dict[type, tuple[str, ...]] = {}
+
+
 class Model:
     """Base model providing from_dict/to_dict with serde-compatible
     behavior."""
@@ -115,21 +230,73 @@ class Model:
     __dataclass_fields__: dict[str, dataclasses.Field[Any]]
 
     @classmethod
-    def from_dict(cls, d: dict) -> "Model":
+    def _schema(cls) -> tuple[_FieldSpec, ...]:
+        """Return the resolved fields of the model, in declaration order.
+
+        Type hints are resolved once per class and cached.
+        """
+
+        def build() -> tuple[_FieldSpec, ...]:
+            hints = cls._get_type_hints()
+            specs = []
+            for f in dataclasses.fields(cls):  # type: ignore[arg-type]
+                tp = hints.get(f.name, f.type)
+                specs.append(_FieldSpec(f.name, tp, _is_optional(tp)))
+            return tuple(specs)
+
+        return _class_cache(_SCHEMAS, cls, build)
+
+    @classmethod
+    def from_dict(
+        cls,
+        d: dict,
+        retain_raw: bool = False,
+        float_coordinates: bool = False,
+        compact_headers: bool = False,
+        lazy_events: bool = False,
+    ) -> "Model":
+        """Build a model from a JSON-compatible dict.
+
+        With ``retain_raw``, every model keeps its encoded form: the parts
+        of ``d`` already in the canonical ``to_dict()`` form are reused as
+        they are, and the others, such as times with a ``Z`` offset, are
+        serialized once while decoding. ``to_dict()`` and ``to_json()``
+        then reuse it for subtrees that have not been modified since
+        decoding, so re-encoding costs scale with the size of the change.
+        The retained encoding shares the subtrees of ``d``, which must not
+        be modified afterwards, and the dicts returned by ``to_dict()``
+        share it too: they must not be modified either. Retaining roughly
+        doubles the memory held per model.
+
+        With ``float_coordinates``, ``GeoPoint`` coordinates are decoded as
+        floats instead of ``Decimal``, see ``GeoPoint``. With
+        ``compact_headers``, HTTP headers are decoded as a ``HeaderMap``
+        instead of a dict, see ``L9HttpEvent``. With ``lazy_events``, the
+        events of an ``L9Aggregation`` are decoded on access, see
+        ``L9Aggregation``.
+        """
+        options = _DecodeOptions(
+            retain_raw, float_coordinates, compact_headers, lazy_events
+        )
+        registry = _metrics.active
+        if registry is None:
+            return cls._from_dict(d, options)
+        return registry.observe("decode", cls, cls._from_dict, d, options)
+
+    @classmethod
+    def _from_dict(cls, d: dict, options: _DecodeOptions) -> "Model":
+        """Decode ``d``; subclasses customising decoding override this."""
         if not isinstance(d, dict):
             raise ValidationError(f"expected dict, got {type(d).__name__}", d)
         kwargs: dict[str, Any] = {}
-        hints = cls._get_type_hints()
-        for f in cls.__dataclass_fields__.values():
-            name = f.name
-            tp = hints.get(name, f.type)
-            optional = _is_optional(tp)
-
+        for name, tp, optional in cls._schema():
             if name not in d:
                 if optional:
                     kwargs[name] = None
                     continue
-                raise ValidationError(f"missing required field: {name}")
+                raise ValidationError(
+                    f"missing required field: {name}", field=name
+                )
 
             value = d[name]
 
@@ -144,23 +311,147 @@ class Model:
                     inner, (str, int, bool)
                 ):
                     raise ValidationError(
-                        f"field '{name}' is required but got None"
+                        f"field '{name}' is required but got None", field=name
                     )
 
-            kwargs[name] = _deserialize_value(value, tp)
+            try:
+                kwargs[name] = _deserialize_value(value, tp, options)
+            except ValidationError as e:
+                e.field = name if e.field is None else f"{name}.{e.field}"
+                raise
+
+        obj = cls(**kwargs)
+        if options.retain_raw:
+            obj._retain(d)
+        return obj
+
+    def _retain(self, d: dict) -> None:
+        """Keep the encoded form of the model, reusing the parts of ``d``
+        already in their serialized form.
+
+        Lists, dicts and leaves of ``d`` that ``to_dict()`` would emit
+        unchanged are kept as they are; the others, such as a time with a
+        ``Z`` offset or a coordinate given as a number, are serialized once
+        here. Nested models hold their own retained encoding. Keys that are
+        not fields are dropped. The encoding shares the subtrees of ``d``,
+        which must not be modified afterwards.
+        """
+        encoded: OrderedDict = OrderedDict()
+        snapshot = self._retain_plan().values(self)
+        for (name, tp, optional), value in zip(self._schema(), snapshot):
+            if optional and value is None:
+                continue
+            raw: Any = d.get(name, _MISSING)
+            if isinstance(value, Model):
+                retained = value.__dict__.get(_RETAINED)
+                raw = value.to_dict() if retained is None else retained.encoded
+            elif (
+                isinstance(value, list)
+                and value
+                and isinstance(value[0], Model)
+            ):
+                raw = [item.to_dict() for item in value]
+            elif raw is _MISSING or isinstance(
+                value, (datetime, decimal.Decimal, float)
+            ):
+                serialized = self._serialize_field(value, tp)
+                if raw != serialized:
+                    raw = serialized
+            encoded[name] = raw
+        self.__dict__[_RETAINED] = _Retained(encoded, snapshot)
 
-        return cls(**kwargs)
+    @classmethod
+    def _retain_plan(cls) -> _RetainPlan:
+
+        def build() -> _RetainPlan:
+            names = [spec.name for spec in cls._schema()]
+            getter: Callable[[Any], tuple[Any, ...]]
+            if len(names) == 1:
+                # attrgetter returns a bare value for a single name. Asking
+                # for it twice keeps a tuple; zip() ignores the extra item.
+                getter = operator.attrgetter(*names, names[0])
+            else:
+                getter = operator.attrgetter(*names)
+            nested = []
+            for i, spec in enumerate(cls._schema()):
+                inner = _unwrap_optional(spec.tp)
+                if get_origin(inner) in (list, dict) or (
+                    isinstance(inner, type) and issubclass(inner, Model)
+                ):
+                    nested.append(i)
+            return _RetainPlan(getter, tuple(nested))
+
+        return _class_cache(_RETAIN_PLANS, cls, build)
+
+    def _retained_to_dict(self, retained: _Retained) -> OrderedDict:
+        """``to_dict()`` reusing the retained encoding of unchanged fields.
+
+        Returns the retained dict itself when nothing changed. Fields are
+        compared by identity with the values they had after decoding;
+        nested models and containers, which can change in place, are
+        checked further.
+        """
+        schema = self._schema()
+        plan = self._retain_plan()
+        current = plan.values(self)
+        snapshot = retained.snapshot
+        encoded = retained.encoded
+        reassigned = not all(map(operator.is_, current, snapshot))
+        changed: dict[int, Any] = {}
+        for i in plan.nested:
+            value = current[i]
+            if value is None or value is not snapshot[i]:
+                continue
+            raw = encoded[schema[i].name]
+            if isinstance(value, Model):
+                # Nested models return their retained dict when unchanged.
+                out = value.to_dict()
+                if out is not raw:
+                    changed[i] = out
+            elif (
+                value
+                and isinstance(value, list)
+                and isinstance(value[0], Model)
+            ):
+                outs = [item.to_dict() for item in value]
+                if len(outs) != len(raw) or not all(
+                    map(operator.is_, outs, raw)
+                ):
+                    changed[i] = outs
+            elif value != raw:
+                # Lists and dicts of scalars mutated in place.
+                changed[i] = self._serialize_field(value, schema[i].tp)
+        if not reassigned and not changed:
+            return encoded
+        result: OrderedDict = OrderedDict()
+        for i, (name, tp, optional) in enumerate(schema):
+            value = current[i]
+            if optional and value is None:
+                continue
+            if i in changed:
+                result[name] = changed[i]
+            elif value is snapshot[i]:
+                result[name] = encoded[name]
+            else:
+                result[name] = self._serialize_field(value, tp)
+        return result
 
     def to_dict(self) -> OrderedDict:
+        registry = _metrics.active
+        if registry is None:
+            return self._to_dict()
+        return registry.observe("encode", type(self), self._to_dict)
+
+    def _to_dict(self) -> OrderedDict:
+        retained = self.__dict__.get(_RETAINED)
+        if retained is not None:
+            return self._retained_to_dict(retained)
         result: OrderedDict = OrderedDict()
-        hints = self.__class__._get_type_hints()
-        for f in self.__class__.__dataclass_fields__.values():
-            value = getattr(self, f.name)
-            tp = hints.get(f.name, f.type)
-            optional = _is_optional(tp)
+        for name, tp, optional in self.__class__._schema():
+            value = getattr(self, name)
             if optional and value is None:
                 continue
-            result[f.name] = self._serialize_field(value, tp)
+            result[name] = self._serialize_field(value, tp)
         return result
 
     def _serialize_field(self, value: object, tp: Any) -> object:
@@ -178,6 +469,12 @@ class Model:
             return {
                 k: self._serialize_field(v, object) for k, v in value.items()
             }
+        if isinstance(value, HeaderMap):
+            return value.to_dict()
+        if isinstance(value, LazyList):
+            return [
+                self._serialize_field(item, object) for item in value.stream()
+            ]
         return value
 
     @classmethod
@@ -186,27 +483,243 @@ class Model:
 
         return typing.get_type_hints(cls)
 
+    def _parsed(self, name: str, source: Any, parse: Callable[[Any], _T]) -> _T:
+        """Return ``parse(source)``, cached on the instance under ``name``.
+
+        The cache is keyed by the identity of ``source``, so assigning a
+        new value to the field it was computed from invalidates it.
+        """
+        cached = self.__dict__.get(name)
+        if cached is not None and cached[0] is source:
+            return cached[1]  # type: ignore[no-any-return]
+        value = parse(source)
+        self.__dict__[name] = (source, value)
+        return value
+
+    @classmethod
+    def _decode_field(cls, name: str, value: object) -> object:
+        """Decode the JSON value of the field ``name`` as ``from_dict()``
+        does."""
+        for spec in cls._schema():
+            if spec.name == name:
+                return _deserialize_value(value, spec.tp)
+        raise KeyError(name)
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        # Pickle the field values by position. Per-instance caches, such as
+        # the retained encoding, are left out.
+        cls = type(self)
+        plan = _RETAIN_PLANS.get(cls) or cls._retain_plan()
+        return _unpickle_model, (cls, plan.values(self))
+
+    def content_hash(
+        self, exclude: Iterable[str] = (), algorithm: str = "sha256"
+    ) -> str:
+        """Return a canonical hex digest of the model's content.
+
+        See ``l9format.hashing`` for the encoding. ``exclude`` lists dotted
+        paths of fields left out of the hash.
+        """
+        from l9format.hashing import content_hash
+
+        return content_hash(self, exclude, algorithm)
+
+    def evolve(self, **changes: Any) -> "Model":
+        """Return a shallow copy with the given fields replaced.
+
+        Unchanged fields, including nested models and lists, are shared
+        with the original instead of being copied. Shared lists must
+        therefore not be mutated in place: pass a new list instead, for
+        example ``ev.evolve(tags=[*(ev.tags or []), "new"])``.
+        """
+        return self.with_changes(changes)
+
+    def with_changes(self, changes: Mapping[str, Any]) -> "Model":
+        """Return a copy with the fields at the given dotted paths replaced.
+
+        ``ev.with_changes({"ssl.certificate.valid": True})`` copies only
+        the event, its ``ssl`` model and the certificate; every other
+        nested model is shared with ``ev``.
+        """
+        fields = self.__dataclass_fields__
+        direct: dict[str, Any] = {}
+        nested: dict[str, dict[str, Any]] = {}
+        for path, value in changes.items():
+            head, _, rest = path.partition(".")
+            if head not in fields:
+                raise TypeError(f"{type(self).__name__} has no field '{head}'")
+            if rest:
+                nested.setdefault(head, {})[rest] = value
+            else:
+                direct[head] = value
+        for head, sub in nested.items():
+            if head in direct:
+                raise ValueError(f"conflicting changes for field '{head}'")
+            child = getattr(self, head)
+            if not isinstance(child, Model):
+                raise ValueError(
+                    f"cannot change '{head}.{next(iter(sub))}': "
+                    f"'{head}' is {type(child).__name__}, not a model"
+                )
+            direct[head] = child.with_changes(sub)
+        clone = object.__new__(type(self))
+        clone.__dict__.update(self.__dict__)
+        clone.__dict__.update(direct)
+        post_init = getattr(clone, "__post_init__", None)
+        if post_init is not None:
+            post_init()
+        return clone
+
     def to_json(self, **kwargs: Any) -> str:
         import json
 
-        return json.dumps(self.to_dict(), **kwargs)
+        def encode() -> str:
+            return json.dumps(self.to_dict(), **kwargs)
+
+        registry = _metrics.active
+        if registry is None:
+            return encode()
+        s = registry.observe("encode", type(self), encode)
+        registry.add_size("encode", type(self).__name__, len(s))
+        return s
+
+    def write_json(self, fp: IO[Any]) -> None:
+        """Write the JSON encoding of the model to a text or binary sink.
+
+        The output is identical to ``to_json()`` but is produced field by
+        field, without building the intermediate ``to_dict()`` tree.
+        """
+        from l9format.encoder import dump
+
+        dump(self, fp)
 
     @classmethod
-    def from_json(cls, s: str, **kwargs: Any) -> "Model":
+    def from_json(
+        cls,
+        s: str,
+        retain_raw: bool = False,
+        float_coordinates: bool = False,
+        compact_headers: bool = False,
+        lazy_events: bool = False,
+        **kwargs: Any,
+    ) -> "Model":
         import json
 
-        return cls.from_dict(json.loads(s, **kwargs))
+        def decode() -> Model:
+            return cls.from_dict(
+                json.loads(s, **kwargs),
+                retain_raw,
+                float_coordinates,
+                compact_headers,
+                lazy_events,
+            )
+
+        registry = _metrics.active
+        if registry is None:
+            return decode()
+        registry.add_size("decode", cls.__name__, len(s))
+        return registry.observe("decode", cls, decode)
+
+
+def _unpickle_model(cls: type[Model], values: tuple[Any, ...]) -> Model:
+    """Rebuild a model pickled by ``Model.__reduce__``.
+
+    The values were valid when pickled, so ``__init__`` and
+    ``__post_init__`` are skipped.
+    """
+    names = _FIELD_NAMES.get(cls)
+    if names is None:
+        names = _class_cache(
+            _FIELD_NAMES,
+            cls,
+            lambda: tuple(spec.name for spec in cls._schema()),
+        )
+    obj = cls.__new__(cls)
+    obj.__dict__.update(zip(names, values))
+    return obj
 
 
 # --- Base Models ---
 
 
+class _Coordinate(float):
+    """A float coordinate. Those decoded from an integer or a string keep in
+    ``text`` the ``Decimal`` representation they serialize as."""
+
+    __slots__ = ("text",)
+    text: str
+
+
+def _to_coordinate(value: object) -> _Coordinate:
+    if type(value) is _Coordinate:
+        return value
+    if type(value) is float:
+        return _Coordinate(value)
+    try:
+        text = f"{decimal.Decimal(str(value)):f}"
+    except decimal.DecimalException as e:
+        raise ValueError(f"invalid coordinate: {value}") from e
+    coordinate = _Coordinate(text)
+    coordinate.text = text
+    return coordinate
+
+
+def _format_coordinate(value: float) -> str:
+    """Format a float coordinate as its ``Decimal`` counterpart would be."""
+    text: Optional[str] = getattr(value, "text", None)
+    if text is None:
+        text = f"{decimal.Decimal(float.__repr__(value)):f}"
+    return text
+
+
 @dataclasses.dataclass
 class GeoPoint(Model):
+    """A latitude/longitude pair.
+
+    Coordinates are ``Decimal``, unless decoded by ``from_dict()`` or
+    ``from_json()`` with ``float_coordinates=True``: they are then floats,
+    which are much cheaper to decode and to compute with, and copies made
+    with ``evolve()`` keep them as floats. Float coordinates serialize as
+    the decimal ones do: a float as the shortest decimal that reads back
+    as it, an integer or a string as given, so decoding and encoding JSON
+    gives the same output with either representation.
+    """
+
     lat: decimal.Decimal
     lon: decimal.Decimal
 
+    @classmethod
+    def _from_dict(cls, d: dict, options: _DecodeOptions) -> "Model":
+        if not options.float_coordinates:
+            return super()._from_dict(d, options)
+        # Skip the Decimal conversion of the generic path.
+        if not isinstance(d, dict):
+            raise ValidationError(f"expected dict, got {type(d).__name__}", d)
+        for name in ("lat", "lon"):
+            if name not in d:
+                raise ValidationError(
+                    f"missing required field: {name}", field=name
+                )
+        lat = _to_coordinate(d["lat"])
+        lon = _to_coordinate(d["lon"])
+        obj = cls(lat, lon)  # type: ignore[arg-type]
+        if options.retain_raw:
+            obj._retain(d)
+        return obj
+
+    def _serialize_field(self, value: object, tp: Any) -> object:
+        if isinstance(value, float):
+            return _format_coordinate(value)
+        return super()._serialize_field(value, tp)
+
     def __post_init__(self) -> None:
+        if isinstance(self.lat, _Coordinate) or isinstance(
+            self.lon, _Coordinate
+        ):
+            # Float coordinates, possibly one of them just replaced.
+            self.lat = _to_coordinate(self.lat)  # type: ignore[assignment]
+            self.lon = _to_coordinate(self.lon)  # type: ignore[assignment]
+            return
         if not isinstance(self.lat, decimal.Decimal):
             try:
                 self.lat = decimal.Decimal(str(self.lat))
@@ -236,6 +749,14 @@ class Network(Model):
     asn: int = 0
     network: str = ""
 
+    @property
+    def prefix(self) -> "Optional[Prefix]":
+        """``network`` as an integer ``Prefix``, or ``None`` when it is not
+        a CIDR. Cached until ``network`` changes."""
+        from l9format.cidr import parse_cidr
+
+        return self._parsed("_l9_prefix", self.network, parse_cidr)
+
 
 @dataclasses.dataclass
 class Certificate(Model):
@@ -290,6 +811,14 @@ class DatasetSummary(Model):
 
 @dataclasses.dataclass
 class L9HttpEvent(Model):
+    """An HTTP response.
+
+    ``header`` is a dict, unless decoded by ``from_dict()`` or
+    ``from_json()`` with ``compact_headers=True``: it is then a
+    ``HeaderMap``, with case-insensitive lookups and a fraction of the
+    memory of a dict.
+    """
+
     root: str = ""
     url: str = ""
     status: int = 0
@@ -298,6 +827,30 @@ class L9HttpEvent(Model):
     title: str = ""
     favicon_hash: str = ""
 
+    @classmethod
+    def _from_dict(cls, d: dict, options: _DecodeOptions) -> "Model":
+        header = d.get("header") if isinstance(d, dict) else None
+        if not options.compact_headers or header is None:
+            return super()._from_dict(d, options)
+        if not isinstance(header, dict):
+            raise ValidationError(
+                f"expected dict, got {type(header).__name__}",
+                header,
+                field="header",
+            )
+        # Wrap the header as it is rather than decoding it to a new dict.
+        # No nested models: retain once the header has been set.
+        obj = super()._from_dict(
+            {**d, "header": None}, options._replace(retain_raw=False)
+        )
+        # The retained encoding keeps the raw dict alive anyway.
+        obj.header = (  # type: ignore[attr-defined]
+            HeaderMap.lazy(header) if options.retain_raw else HeaderMap(header)
+        )
+        if options.retain_raw:
+            obj._retain(d)
+        return obj
+
 
 @dataclasses.dataclass
 class L9SSLEvent(Model):
@@ -519,12 +1072,46 @@ class L9Event(Model):
     geoip: GeoLocation = None  # type: ignore[assignment]
     network: Network = None  # type: ignore[assignment]
 
+    @property
+    def ip_version(self) -> Optional[int]:
+        """4 or 6, or ``None`` when ``ip`` is not an IP address."""
+        parsed = self._parsed_ip()
+        return None if parsed is None else parsed[0]
+
+    @property
+    def ip_int(self) -> Optional[int]:
+        """``ip`` as an integer, or ``None`` when it is not an IP address.
+        Cached until ``ip`` changes."""
+        parsed = self._parsed_ip()
+        return None if parsed is None else parsed[1]
+
+    def _parsed_ip(self) -> Optional[tuple[int, int]]:
+        from l9format.cidr import parse_ip
+
+        return self._parsed("_l9_ip", self.ip, parse_ip)
+
+    @property
+    def port_int(self) -> Optional[int]:
+        """``port`` as an integer, or ``None`` when it is not a port
+        number. Cached until ``port`` changes."""
+        from l9format.cidr import parse_port
+
+        return self._parsed("_l9_port", self.port, parse_port)
+
 
 # --- Aggregation ---
 
 
 @dataclasses.dataclass
 class L9Aggregation(Model):
+    """The events and summary of a leak on a host.
+
+    ``events`` is a list, unless decoded by ``from_dict()`` or
+    ``from_json()`` with ``lazy_events=True``: it is then a ``LazyList``
+    that decodes each event on first access, so decoding the other fields
+    costs the same whatever the number of events.
+    """
+
     summary: Optional[str] = None
     ip: str = ""
     resource_id: str = ""
@@ -538,3 +1125,15 @@ class L9Aggregation(Model):
     creation_date: datetime = None  # type: ignore[assignment]
     update_date: datetime = None  # type: ignore[assignment]
     fresh: bool = False
+
+    @classmethod
+    def _from_dict(cls, d: dict, options: _DecodeOptions) -> "Model":
+        events = d.get("events") if isinstance(d, dict) else None
+        if not options.lazy_events or not isinstance(events, list):
+            return super()._from_dict(d, options)
+        obj = super()._from_dict({**d, "events": []}, options)
+        decode = functools.partial(
+            _deserialize_value, tp=L9Event, options=options
+        )
+        obj.events = LazyList(events, decode)  # type: ignore[attr-defined]
+        return obj
@@ -0,0 +1,121 @@
+"""Lists of models decoded on first access.
+
+``LazyList`` keeps the raw JSON items of a list field and decodes each one
+the first time it is read, so decoding the model holding the list costs
+the same whatever its length.
+"""
+
+from typing import (
+    Any,
+    Callable,
+    Generic,
+    Iterable,
+    Iterator,
+    MutableSequence,
+    TypeVar,
+    Union,
+    overload,
+)
+
+_T = TypeVar("_T")
+
+
+class LazyList(MutableSequence[_T], Generic[_T]):
+    """A mutable sequence decoding its raw items with ``decode`` on access.
+
+    Indexing and iteration cache the decoded items, so changes made to
+    them are kept. ``stream()`` reads the items without caching the ones
+    not decoded yet, for a single pass over a long list in constant
+    memory. Decoding errors are raised on access.
+    """
+
+    __slots__ = ("_raw", "_items", "_decode")
+
+    def __init__(self, raw: Iterable[Any], decode: Callable[[Any], _T]) -> None:
+        self._raw: list[Any] = list(raw)
+        # None marks an item not decoded yet. Raw nulls decode to None, so
+        # they never need the cache.
+        self._items: list[Any] = [None] * len(self._raw)
+        self._decode = decode
+
+    def _get(self, i: int) -> _T:
+        item = self._items[i]
+        if item is None:
+            raw = self._raw[i]
+            if raw is not None:
+                item = self._items[i] = self._decode(raw)
+        return item  # type: ignore[no-any-return]
+
+    @overload
+    def __getitem__(self, index: int) -> _T: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[_T]: ...
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[_T, list[_T]]:
+        if isinstance(index, slice):
+            return [self._get(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self._items)
+        if not 0 <= index < len(self._items):
+            raise IndexError("list index out of range")
+        return self._get(index)
+
+    @overload
+    def __setitem__(self, index: int, value: _T) -> None: ...
+
+    @overload
+    def __setitem__(self, index: slice, value: Iterable[_T]) -> None: ...
+
+    def __setitem__(self, index: Union[int, slice], value: Any) -> None:
+        if isinstance(index, slice):
+            values = list(value)
+            self._items[index] = values
+            self._raw[index] = [None] * len(values)
+        else:
+            self._items[index] = value
+            self._raw[index] = None
+
+    def __delitem__(self, index: Union[int, slice]) -> None:
+        del self._items[index]
+        del self._raw[index]
+
+    def insert(self, index: int, value: _T) -> None:
+        self._items.insert(index, value)
+        self._raw.insert(index, None)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __iter__(self) -> Iterator[_T]:
+        for i in range(len(self._items)):
+            yield self._get(i)
+
+    def stream(self) -> Iterator[_T]:
+        """Iterate over the items, decoding the ones not accessed yet
+        without keeping them."""
+        decode = self._decode
+        for item, raw in zip(self._items, self._raw):
+            if item is None and raw is not None:
+                item = decode(raw)
+            yield item
+
+    @property
+    def decoded(self) -> int:
+        """The number of items decoded and cached so far."""
+        return sum(
+            item is not None or raw is None
+            for item, raw in zip(self._items, self._raw)
+        )
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, (list, LazyList)):
+            return NotImplemented
+        return len(self) == len(other) and all(
+            a == b for a, b in zip(self, other)
+        )
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.decoded}/{len(self)} decoded)"
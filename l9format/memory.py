@@ -0,0 +1,209 @@
+"""Deep memory accounting of models, for sizing caches.
+
+``sys.getsizeof`` only measures the object it is given. ``memory_footprint()``
+walks everything reachable from a model (nested models, lists, header maps,
+strings, ``Decimal`` and ``datetime`` values) and counts each object once,
+broken down by field::
+
+    fp = memory_footprint(event)
+    fp.total                  # bytes held by the event
+    fp.flat()["http.header"]  # of which the HTTP headers
+
+``batch_footprint()`` measures an iterable of models, optionally from a
+random sample of them.
+
+Objects shared with the rest of the program are not counted: classes,
+modules, functions, ``None`` and the booleans, and ``tzinfo`` instances.
+Other objects are attributed to the first field they are reached from.
+"""
+
+import gc
+import random
+import sys
+import types
+from datetime import tzinfo
+from typing import Any, Iterable, NamedTuple, Optional
+
+from l9format.l9format import Model
+
+_SHARED_TYPES = (
+    type,
+    types.ModuleType,
+    types.FunctionType,
+    types.BuiltinFunctionType,
+    types.MethodType,
+    tzinfo,
+)
+_SINGLETONS = frozenset(map(id, (None, True, False, Ellipsis, NotImplemented)))
+
+
+class Footprint(NamedTuple):
+    """Bytes held by a model.
+
+    ``total`` counts everything reachable from the model; ``own`` the
+    instance and its attribute dict. ``fields`` gives the bytes reached
+    through each attribute, including nested models, and ``models`` the
+    breakdown of nested models, summed over the items of a list of models.
+    """
+
+    total: int
+    own: int
+    fields: dict[str, int]
+    models: dict[str, "Footprint"]
+
+    def flat(self, prefix: str = "") -> dict[str, int]:
+        """Return the bytes per field as a dict keyed by dotted paths,
+        nested fields included."""
+        flat = {}
+        for name, size in self.fields.items():
+            flat[prefix + name] = size
+            nested = self.models.get(name)
+            if nested is not None:
+                flat.update(nested.flat(f"{prefix}{name}."))
+        return flat
+
+
+class BatchFootprint(NamedTuple):
+    """Bytes held by a batch of models.
+
+    ``measured`` models out of ``records`` were walked; ``total`` is the
+    size of the measured ones scaled to the whole batch, and ``per_model``
+    the mean size of a model. ``models`` sums the footprints of the
+    measured models.
+    """
+
+    records: int
+    measured: int
+    total: int
+    per_model: float
+    models: Footprint
+
+
+_EMPTY = Footprint(0, 0, {}, {})
+
+
+def _merge(a: Footprint, b: Footprint) -> Footprint:
+    fields = dict(a.fields)
+    for name, size in b.fields.items():
+        fields[name] = fields.get(name, 0) + size
+    models = dict(a.models)
+    for name, nested in b.models.items():
+        models[name] = _merge(models.get(name, _EMPTY), nested)
+    return Footprint(a.total + b.total, a.own + b.own, fields, models)
+
+
+def _skip(obj: Any, seen: set[int]) -> bool:
+    i = id(obj)
+    if i in seen or i in _SINGLETONS or isinstance(obj, _SHARED_TYPES):
+        return True
+    seen.add(i)
+    return False
+
+
+def _sizeof(obj: Any, seen: set[int]) -> int:
+    """Return the size of ``obj`` and the objects it references that are
+    not in ``seen``, adding them to it."""
+    if _skip(obj, seen):
+        return 0
+    size = 0
+    stack = [obj]
+    getsizeof = sys.getsizeof
+    referents = gc.get_referents
+    while stack:
+        obj = stack.pop()
+        size += getsizeof(obj)
+        for ref in referents(obj):
+            if not _skip(ref, seen):
+                stack.append(ref)
+    return size
+
+
+def _field(value: Any, seen: set[int]) -> tuple[int, Optional[Footprint]]:
+    if isinstance(value, Model):
+        if id(value) in seen:
+            return 0, None
+        nested = _footprint(value, seen)
+        return nested.total, nested
+    if type(value) is list and any(isinstance(v, Model) for v in value):
+        if _skip(value, seen):
+            return 0, None
+        size = sys.getsizeof(value)
+        merged = None
+        for item in value:
+            if isinstance(item, Model):
+                if id(item) in seen:
+                    continue
+                item_fp = _footprint(item, seen)
+                size += item_fp.total
+                merged = item_fp if merged is None else _merge(merged, item_fp)
+            else:
+                size += _sizeof(item, seen)
+        return size, merged
+    return _sizeof(value, seen), None
+
+
+def _footprint(model: Model, seen: set[int]) -> Footprint:
+    attrs = model.__dict__
+    seen.add(id(model))
+    seen.add(id(attrs))
+    # Attribute names are the class's interned field names.
+    own = sys.getsizeof(model) + sys.getsizeof(attrs)
+    fields = {}
+    models = {}
+    for name, value in attrs.items():
+        size, nested = _field(value, seen)
+        fields[name] = size
+        if nested is not None:
+            models[name] = nested
+    return Footprint(own + sum(fields.values()), own, fields, models)
+
+
+def memory_footprint(model: Model) -> Footprint:
+    """Return the bytes held by ``model`` and everything it references."""
+    return _footprint(model, set())
+
+
+def batch_footprint(
+    models: Iterable[Model],
+    sample: Optional[int] = None,
+    seed: Optional[int] = None,
+) -> BatchFootprint:
+    """Return the bytes held by a batch of models.
+
+    Objects shared between models are counted once. When ``sample`` is
+    given, only that many models picked at random are walked and the
+    total is extrapolated from them; ``seed`` makes the pick repeatable.
+    """
+    count = 0
+    if sample is None:
+        # The models are kept alive while they are walked: the ids of
+        # freed objects could be reused by the next ones.
+        picked = list(models)
+    else:
+        if sample < 1:
+            raise ValueError("sample must be at least 1")
+        # Reservoir sampling, in a single pass over the models.
+        rng = random.Random(seed)
+        reservoir: list[Model] = []
+        for model in models:
+            count += 1
+            if len(reservoir) < sample:
+                reservoir.append(model)
+            else:
+                j = rng.randrange(count)
+                if j < sample:
+                    reservoir[j] = model
+        picked = reservoir
+    seen: set[int] = set()
+    merged = _EMPTY
+    measured = 0
+    for model in picked:
+        measured += 1
+        if id(model) not in seen:
+            merged = _merge(merged, _footprint(model, seen))
+    if sample is None:
+        count = measured
+    per_model = merged.total / measured if measured else 0.0
+    return BatchFootprint(
+        count, measured, round(per_model * count), per_model, merged
+    )
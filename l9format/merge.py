@@ -0,0 +1,169 @@
+"""Time-ordered merge of event streams.
+
+Each scanner writes its own NDJSON file in ``time`` order. ``merge_events()``
+merges any number of such files, or iterators, into one stream in ``time``
+order, holding a single pending record per input::
+
+    for event in merge_events(["node1.ndjson.gz", "node2.ndjson.gz"]):
+        ...
+
+Records read from files are parsed as JSON, but only their ``time`` and
+tie-break fields are looked at until they are emitted: the expensive
+``from_dict()`` runs on one record at a time, in output order. Lines are
+parsed whole with ``json.loads`` rather than scanned for those keys: every
+record is emitted, and so parsed, anyway, and a text scan could not tell a
+top-level ``time`` from a nested one.
+"""
+
+import heapq
+import json
+import os
+from datetime import datetime, timezone
+from typing import Any, Callable, Iterable, Iterator, Sequence, Union
+
+from l9format.cidr import parse_ip, parse_port
+from l9format.fields import path_getter, split_path
+from l9format.l9format import L9Event, Model, ValidationError
+from l9format.ndjson import iter_lines
+
+Source = Union[str, "os.PathLike[str]", Iterable[Any]]
+
+_END = object()
+# Records without a time come first.
+_NO_TIME = datetime.min.replace(tzinfo=timezone.utc)
+
+
+def _time(value: Any) -> datetime:
+    """Return a ``time`` value as an aware datetime, UTC when naive."""
+    if value is None:
+        return _NO_TIME
+    if isinstance(value, datetime):
+        time = value
+    elif isinstance(value, str):
+        try:
+            time = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError as e:
+            raise ValidationError(
+                f"invalid datetime: {value}", value, field="time"
+            ) from e
+    else:
+        raise ValidationError(
+            f"expected string for datetime, got {type(value).__name__}",
+            value,
+            field="time",
+        )
+    if time.tzinfo is None:
+        time = time.replace(tzinfo=timezone.utc)
+    return time
+
+
+def _tie(value: Any) -> tuple[int, Any]:
+    """Order the values of a tie-break field, whatever their types."""
+    if value is None:
+        return (0, "")
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return (1, value)
+    return (2, str(value))
+
+
+def _ip_key(value: Any) -> tuple[Any, ...]:
+    """Order IP addresses by family, IPv4 first, then numerically. Other
+    values come after them, in ``_tie()`` order."""
+    if value is None:
+        return (0,)
+    parsed = parse_ip(value)
+    if parsed is None:
+        return (2, *_tie(value))
+    return (1, *parsed)
+
+
+def _port_key(value: Any) -> tuple[Any, ...]:
+    """Order port numbers numerically. Other values come after them, in
+    ``_tie()`` order."""
+    if value is None:
+        return (0,)
+    if isinstance(value, int) and not isinstance(value, bool):
+        return (1, value)
+    port = parse_port(value)
+    if port is None:
+        return (2, *_tie(value))
+    return (1, port)
+
+
+def _sort_key(path: str) -> Callable[[Any], tuple[Any, ...]]:
+    """Return the function ordering the values of a tie-break field:
+    ``_ip_key()`` for fields named ``ip``, ``_port_key()`` for fields named
+    ``port`` and ``_tie()`` for the others."""
+    name = split_path(path)[-1]
+    if name == "ip":
+        return _ip_key
+    if name == "port":
+        return _port_key
+    return _tie
+
+
+def _records(source: Source) -> Iterator[Any]:
+    if isinstance(source, (str, os.PathLike)):
+        loads = json.loads
+        return (loads(line) for line in iter_lines(source))
+    return (json.loads(r) if isinstance(r, str) else r for r in source)
+
+
+def merge_events(
+    sources: Iterable[Source],
+    cls: type[Model] = L9Event,
+    tie_break: Sequence[str] = (),
+    decode: bool = True,
+    strict: bool = True,
+) -> Iterator[Any]:
+    """Merge streams of records, each in ``time`` order, into one.
+
+    A source is the path of an NDJSON file, possibly compressed, or an
+    iterable of models, raw JSON objects or JSON lines. Records with the
+    same time are ordered by the dotted ``tie_break`` fields, then by
+    source, in the order given, and position. Fields named ``ip`` are
+    ordered as addresses, IPv4 before IPv6, and fields named ``port``
+    numerically. Raw records are decoded as
+    ``cls`` when emitted, or yielded as raw JSON objects when ``decode`` is
+    false; models are yielded as they are. Records without a time come
+    first.
+
+    With ``strict``, a source going back in time raises ``ValueError``;
+    otherwise its records are merged as they come. An invalid time raises
+    ``ValidationError``.
+    """
+    parts = [(path_getter(path), _sort_key(path)) for path in tie_break]
+    get_time = path_getter("time")
+
+    def key(record: Any) -> tuple[Any, ...]:
+        return (
+            _time(get_time(record)),
+            *(normalize(get(record)) for get, normalize in parts),
+        )
+
+    inputs: list[Iterator[Any]] = []
+    heap: list[tuple[tuple[Any, ...], int, Any]] = []
+    for source in sources:
+        records = _records(source)
+        first = next(records, _END)
+        if first is not _END:
+            heap.append((key(first), len(inputs), first))
+        inputs.append(records)
+    heapq.heapify(heap)
+    emit: Callable[[Any], Any] = cls.from_dict if decode else lambda d: d
+    while heap:
+        current, i, record = heap[0]
+        record = emit(record) if isinstance(record, dict) else record
+        following = next(inputs[i], _END)
+        if following is _END:
+            heapq.heappop(heap)
+        else:
+            following_key = key(following)
+            if strict and following_key[0] < current[0]:
+                raise ValueError(
+                    f"source {i} is not in time order: "
+                    f"{following_key[0].isoformat()} follows "
+                    f"{current[0].isoformat()}"
+                )
+            heapq.heapreplace(heap, (following_key, i, following))
+        yield record
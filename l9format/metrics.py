@@ -0,0 +1,233 @@
+"""Counters and latency histograms of model decoding and encoding.
+
+Metrics are off by default. ``enable()`` installs a ``MetricsRegistry``
+that ``from_dict()``, ``from_json()``, ``to_dict()``, ``to_json()``, the
+streaming encoder and the NDJSON readers report to, and ``render()``
+returns a snapshot in the Prometheus text exposition format::
+
+    registry = metrics.enable()
+    ...
+    print(registry.render())
+
+Each top-level call is recorded once, under the class it was made on;
+the nested models it decodes or encodes are part of it. A failed call is
+counted as such, and a ``ValidationError`` also by the dotted path of the
+field it was raised for.
+"""
+
+import bisect
+import threading
+import time
+from typing import Any, Callable, Optional, Sequence, TypeVar
+
+# Upper bounds, in seconds, of the latency histogram buckets.
+DEFAULT_BUCKETS = (
+    0.00001,
+    0.000025,
+    0.00005,
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    1.0,
+)
+
+_T = TypeVar("_T")
+
+
+class _Histogram:
+    __slots__ = ("counts", "total")
+
+    def __init__(self, size: int) -> None:
+        # One count per bucket, plus the +Inf one.
+        self.counts = [0] * (size + 1)
+        self.total = 0.0
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels: str) -> str:
+    return ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class MetricsRegistry:
+    """Counts, sizes and latencies of decoding and encoding, by model
+    class.
+
+    ``operation`` is ``"decode"`` or ``"encode"``. Sizes are the lengths of
+    the JSON texts read or written, where they are at hand. All methods
+    are thread-safe.
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._calls: dict[tuple[str, str], int] = {}
+        self._failures: dict[tuple[str, str], int] = {}
+        self._errors: dict[tuple[str, str], int] = {}
+        self._sizes: dict[tuple[str, str], int] = {}
+        self._latencies: dict[tuple[str, str], _Histogram] = {}
+
+    def observe(
+        self, operation: str, cls: type, call: Callable[..., _T], *args: Any
+    ) -> _T:
+        """Return ``call(*args)``, recording it unless it is nested in
+        another recorded call in this thread."""
+        local = self._local
+        if getattr(local, "busy", False):
+            return call(*args)
+        local.busy = True
+        start = time.perf_counter()
+        try:
+            result = call(*args)
+        except Exception as e:
+            self.record_failure(operation, cls.__name__, e)
+            raise
+        else:
+            self.record(operation, cls.__name__, time.perf_counter() - start)
+        finally:
+            local.busy = False
+        return result
+
+    def record(self, operation: str, model: str, seconds: float) -> None:
+        """Record a successful call that took ``seconds``."""
+        key = (operation, model)
+        i = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            self._calls[key] = self._calls.get(key, 0) + 1
+            histogram = self._latencies.get(key)
+            if histogram is None:
+                histogram = self._latencies[key] = _Histogram(len(self.buckets))
+            histogram.counts[i] += 1
+            histogram.total += seconds
+
+    def record_failure(
+        self, operation: str, model: str, error: Exception
+    ) -> None:
+        """Record a call that raised ``error``."""
+        from l9format.l9format import ValidationError
+
+        key = (operation, model)
+        with self._lock:
+            self._failures[key] = self._failures.get(key, 0) + 1
+            if isinstance(error, ValidationError):
+                error_key = (model, error.field or "")
+                self._errors[error_key] = self._errors.get(error_key, 0) + 1
+
+    def add_size(self, operation: str, model: str, size: int) -> None:
+        """Add ``size`` to the length of JSON read or written."""
+        key = (operation, model)
+        with self._lock:
+            self._sizes[key] = self._sizes.get(key, 0) + size
+
+    def reset(self) -> None:
+        """Clear every metric."""
+        with self._lock:
+            self._calls.clear()
+            self._failures.clear()
+            self._errors.clear()
+            self._sizes.clear()
+            self._latencies.clear()
+
+    def render(self) -> str:
+        """Return the metrics in the Prometheus text exposition format."""
+        with self._lock:
+            calls = sorted(self._calls.items())
+            failures = sorted(self._failures.items())
+            errors = sorted(self._errors.items())
+            sizes = sorted(self._sizes.items())
+            latencies = sorted(
+                (key, list(h.counts), h.total)
+                for key, h in self._latencies.items()
+            )
+        lines: list[str] = []
+
+        def family(name: str, kind: str, doc: str) -> None:
+            lines.append(f"# HELP {name} {doc}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        family("l9format_models_total", "counter", "Models decoded or encoded.")
+        for (operation, model), value in calls:
+            labels = _labels(operation=operation, model=model)
+            lines.append(f"l9format_models_total{{{labels}}} {value}")
+        family(
+            "l9format_failures_total",
+            "counter",
+            "Decoding or encoding calls that raised an error.",
+        )
+        for (operation, model), value in failures:
+            labels = _labels(operation=operation, model=model)
+            lines.append(f"l9format_failures_total{{{labels}}} {value}")
+        family(
+            "l9format_validation_errors_total",
+            "counter",
+            "Validation errors by model and field path.",
+        )
+        for (model, field), value in errors:
+            labels = _labels(model=model, field=field)
+            lines.append(
+                f"l9format_validation_errors_total{{{labels}}} {value}"
+            )
+        family(
+            "l9format_json_bytes_total",
+            "counter",
+            "Length of the JSON text decoded or encoded.",
+        )
+        for (operation, model), value in sizes:
+            labels = _labels(operation=operation, model=model)
+            lines.append(f"l9format_json_bytes_total{{{labels}}} {value}")
+        family(
+            "l9format_duration_seconds",
+            "histogram",
+            "Time spent decoding or encoding a model.",
+        )
+        bounds = [_number(b) for b in self.buckets] + ["+Inf"]
+        for (operation, model), counts, total in latencies:
+            labels = _labels(operation=operation, model=model)
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                lines.append(
+                    f"l9format_duration_seconds_bucket"
+                    f'{{{labels},le="{bound}"}} {cumulative}'
+                )
+            lines.append(
+                f"l9format_duration_seconds_sum{{{labels}}} {_number(total)}"
+            )
+            lines.append(
+                f"l9format_duration_seconds_count{{{labels}}} {cumulative}"
+            )
+        return "\n".join(lines) + "\n"
+
+
+# The registry models report to, None while metrics are disabled.
+active: Optional[MetricsRegistry] = None
+
+
+def enable(registry: Optional[MetricsRegistry] = None) -> MetricsRegistry:
+    """Start reporting to ``registry``, or to a new one, and return it."""
+    global active
+    if registry is None:
+        registry = MetricsRegistry()
+    active = registry
+    return registry
+
+
+def disable() -> None:
+    """Stop reporting metrics."""
+    global active
+    active = None
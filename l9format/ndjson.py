@@ -0,0 +1,569 @@
+"""Buffered, compressed NDJSON writing and reading of l9format models.
+
+``EventWriter`` batches serialized models into large buffers, writes them
+through any available stdlib compression codec and rotates output files by
+size, event count or age. ``PartitionedWriter`` shards a stream of models
+into one such file per key. ``read_events`` and friends read the files
+back, detecting the compression from the file content.
+"""
+
+import gzip
+import io
+import json
+import os
+import re
+import signal
+import time
+import zlib
+from collections import OrderedDict
+from types import FrameType, TracebackType
+from typing import (
+    IO,
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Iterable,
+    Iterator,
+    Literal,
+    NamedTuple,
+    Optional,
+    cast,
+)
+
+from l9format import metrics
+from l9format.encoder import dumps
+from l9format.l9format import L9Event, Model
+
+if TYPE_CHECKING:
+    from l9format.filter import Filter
+
+try:
+    import bz2
+except ImportError:  # pragma: no cover - optional in some builds
+    bz2 = None  # type: ignore[assignment]
+
+try:
+    import lzma
+except ImportError:  # pragma: no cover - optional in some builds
+    lzma = None  # type: ignore[assignment]
+
+BinaryFile = io.BufferedIOBase
+WriteMode = Literal["wb", "ab"]
+
+
+class Codec(NamedTuple):
+    """A compression codec usable by ``EventWriter`` and the readers."""
+
+    name: str
+    extension: str
+    magic: bytes
+    default_level: Optional[int]
+    open_write: Callable[[str, WriteMode, Optional[int]], BinaryFile]
+    open_read: Callable[[str], BinaryFile]
+
+
+def _plain_write(
+    path: str, mode: WriteMode, level: Optional[int]
+) -> BinaryFile:
+    return cast(BinaryFile, open(path, mode))
+
+
+def _plain_read(path: str) -> BinaryFile:
+    return open(path, "rb")
+
+
+def _gzip_write(path: str, mode: WriteMode, level: Optional[int]) -> BinaryFile:
+    return gzip.GzipFile(
+        path, mode, compresslevel=6 if level is None else level
+    )
+
+
+def _gzip_read(path: str) -> BinaryFile:
+    return gzip.GzipFile(path, "rb")
+
+
+def _bz2_write(path: str, mode: WriteMode, level: Optional[int]) -> BinaryFile:
+    return bz2.BZ2File(path, mode, compresslevel=9 if level is None else level)
+
+
+def _bz2_read(path: str) -> BinaryFile:
+    return bz2.BZ2File(path, "rb")
+
+
+def _lzma_write(path: str, mode: WriteMode, level: Optional[int]) -> BinaryFile:
+    return lzma.LZMAFile(path, mode, preset=level)
+
+
+def _lzma_read(path: str) -> BinaryFile:
+    return lzma.LZMAFile(path, "rb")
+
+
+CODECS: dict[str, Codec] = {
+    "none": Codec("none", "", b"", None, _plain_write, _plain_read),
+    "gzip": Codec("gzip", ".gz", b"\x1f\x8b", 6, _gzip_write, _gzip_read),
+}
+if bz2 is not None:
+    CODECS["bz2"] = Codec("bz2", ".bz2", b"BZh", 9, _bz2_write, _bz2_read)
+if lzma is not None:
+    CODECS["xz"] = Codec(
+        "xz", ".xz", b"\xfd7zXZ\x00", 6, _lzma_write, _lzma_read
+    )
+
+
+def codec_for_path(path: "str | os.PathLike[str]") -> Codec:
+    """Return the codec matching the file extension of ``path``."""
+    name = os.fspath(path)
+    for codec in CODECS.values():
+        if codec.extension and name.endswith(codec.extension):
+            return codec
+    return CODECS["none"]
+
+
+def detect_codec(path: "str | os.PathLike[str]") -> Codec:
+    """Return the codec matching the first bytes of the file at ``path``."""
+    with open(path, "rb") as f:
+        head = f.read(8)
+    for codec in CODECS.values():
+        if codec.magic and head.startswith(codec.magic):
+            return codec
+    return CODECS["none"]
+
+
+def open_ndjson(path: "str | os.PathLike[str]") -> IO[str]:
+    """Open an NDJSON file for reading, decompressing it transparently.
+
+    The codec is detected from the file content, not from its name.
+    Concatenated compressed members, as produced when a writer appends to
+    an existing file, are read as a single stream.
+    """
+    raw = detect_codec(path).open_read(os.fspath(path))
+    return io.TextIOWrapper(cast(IO[bytes], raw), encoding="utf-8")
+
+
+def iter_lines(path: "str | os.PathLike[str]") -> Iterator[str]:
+    """Yield the non-blank lines of an NDJSON file."""
+    with open_ndjson(path) as f:
+        for line in f:
+            if line.strip():
+                yield line
+
+
+def read_dicts(path: "str | os.PathLike[str]") -> Iterator[dict]:
+    """Yield every record of an NDJSON file as a parsed JSON object."""
+    loads = json.loads
+    for line in iter_lines(path):
+        yield loads(line)
+
+
+def _sized_dicts(
+    path: "str | os.PathLike[str]",
+    registry: metrics.MetricsRegistry,
+    model: str,
+) -> Iterator[dict]:
+    loads = json.loads
+    add_size = registry.add_size
+    for line in iter_lines(path):
+        add_size("decode", model, len(line))
+        yield loads(line)
+
+
+def read_events(
+    path: "str | os.PathLike[str]",
+    cls: type[Model] = L9Event,
+    where: Optional["Filter"] = None,
+) -> Iterator[Model]:
+    """Yield every record of an NDJSON file decoded as ``cls``.
+
+    When ``where`` is given, it is evaluated on the raw JSON objects and
+    only matching records are decoded.
+    """
+    from_dict = cls.from_dict
+    registry = metrics.active
+    if registry is None:
+        records = read_dicts(path)
+    else:
+        records = _sized_dicts(path, registry, cls.__name__)
+    if where is not None:
+        matches = where.matches_raw
+        records = (d for d in records if matches(d))
+    for d in records:
+        yield from_dict(d)
+
+
+class EventWriter:
+    """Write models as NDJSON through large, optionally compressed buffers.
+
+    ``path`` is the output file. When any rotation limit is set it must
+    contain an ``{index}`` placeholder, formatted with the sequence number
+    of each file (for instance ``"events-{index:05d}.ndjson.gz"``).
+
+    Serialized events are encoded as UTF-8 and accumulated until
+    ``buffer_size`` bytes are pending, then written in a single call. A
+    file is rotated before the next event once it holds ``max_events``
+    events, ``max_bytes`` bytes of uncompressed NDJSON, or has been open
+    for ``max_seconds`` seconds. ``events_written`` and ``bytes_written``
+    count the events and uncompressed bytes written so far.
+
+    The codec defaults to the one matching the extension of ``path``.
+    ``level`` is the codec's compression level (``compresslevel`` for gzip
+    and bz2, ``preset`` for xz). Existing files are truncated unless
+    ``append`` is true. A writer closed without any event still creates
+    (or truncates) its first file.
+    """
+
+    def __init__(
+        self,
+        path: "str | os.PathLike[str]",
+        codec: Optional[str] = None,
+        level: Optional[int] = None,
+        buffer_size: int = 1 << 20,
+        max_bytes: Optional[int] = None,
+        max_events: Optional[int] = None,
+        max_seconds: Optional[float] = None,
+        append: bool = False,
+    ) -> None:
+        self.path_template = os.fspath(path)
+        self.codec = (
+            codec_for_path(self.path_template)
+            if codec is None
+            else CODECS[codec]
+        )
+        self.level = self.codec.default_level if level is None else level
+        self.buffer_size = buffer_size
+        self.max_bytes = max_bytes
+        self.max_events = max_events
+        self.max_seconds = max_seconds
+        self.append = append
+        self.rotating = (
+            max_bytes is not None
+            or max_events is not None
+            or max_seconds is not None
+        )
+        if self.rotating and "{index" not in self.path_template:
+            raise ValueError(
+                "path must contain an {index} placeholder when rotating"
+            )
+        self.paths: list[str] = []
+        self.events_written = 0
+        self.bytes_written = 0
+        self._index = 0
+        self._file: Optional[BinaryFile] = None
+        self._buffer: list[bytes] = []
+        self._buffered = 0
+        self._file_events = 0
+        self._file_bytes = 0
+        self._opened_at = 0.0
+        self._closed = False
+        # Nesting depth of the public methods touching the buffer or the
+        # file, the signal received meanwhile and the handlers replaced by
+        # handle_signals().
+        self._depth = 0
+        self._signal: Optional[int] = None
+        self._previous_handlers: dict[int, Any] = {}
+
+    def _open_next(self) -> None:
+        if self.rotating:
+            path = self.path_template.format(index=self._index)
+        else:
+            path = self.path_template
+        self._index += 1
+        mode: WriteMode = "ab" if self.append else "wb"
+        self._file = self.codec.open_write(path, mode, self.level)
+        self.paths.append(path)
+        self._file_events = 0
+        self._file_bytes = 0
+        self._opened_at = time.monotonic()
+
+    def _should_rotate(self) -> bool:
+        return (
+            (
+                self.max_events is not None
+                and self._file_events >= self.max_events
+            )
+            or (
+                self.max_bytes is not None
+                and self._file_bytes >= self.max_bytes
+            )
+            or (
+                self.max_seconds is not None
+                and time.monotonic() - self._opened_at >= self.max_seconds
+            )
+        )
+
+    def _write_buffer(self) -> None:
+        if self._buffer and self._file is not None:
+            self._file.write(b"".join(self._buffer))
+        self._buffer.clear()
+        self._buffered = 0
+
+    def write(self, model: Model) -> None:
+        """Serialize ``model`` and append it to the current file."""
+        self.write_line(dumps(model))
+
+    def write_many(self, models: Iterable[Model]) -> None:
+        """Serialize and append every model of ``models``."""
+        for model in models:
+            self.write_line(dumps(model))
+
+    def write_line(self, line: str) -> None:
+        """Append an already serialized JSON record.
+
+        ``line`` must not contain a newline; one is added by the writer.
+        """
+        if self._closed:
+            raise ValueError("write to closed EventWriter")
+        self._depth += 1
+        try:
+            if self._file is None:
+                self._open_next()
+            elif self.rotating and self._should_rotate():
+                self._close_file()
+                self._open_next()
+            data = line.encode("utf-8") + b"\n"
+            self._buffer.append(data)
+            size = len(data)
+            self._buffered += size
+            self._file_events += 1
+            self._file_bytes += size
+            self.events_written += 1
+            self.bytes_written += size
+            if self._buffered >= self.buffer_size:
+                self._write_buffer()
+        finally:
+            self._leave()
+
+    def flush(self) -> None:
+        """Write pending events and flush the underlying file."""
+        self._depth += 1
+        try:
+            self._write_buffer()
+            if self._file is not None:
+                self._file.flush()
+        finally:
+            self._leave()
+
+    def rotate(self) -> None:
+        """Close the current file and start the next one."""
+        self._depth += 1
+        try:
+            self._close_file()
+            self._open_next()
+        finally:
+            self._leave()
+
+    def _close_file(self) -> None:
+        self._write_buffer()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def close(self) -> None:
+        """Write pending events and close the current file.
+
+        Closing an already closed writer does nothing.
+        """
+        if not self._closed:
+            self._closed = True
+            self._depth += 1
+            try:
+                if not self.paths:
+                    self._open_next()
+                self._close_file()
+            finally:
+                self._leave()
+
+    def _leave(self) -> None:
+        self._depth -= 1
+        signum = self._signal
+        if not self._depth and signum is not None:
+            self._deliver_signal(signum, None)
+
+    def handle_signals(
+        self, signums: Iterable[int] = (signal.SIGTERM, signal.SIGINT)
+    ) -> None:
+        """Close the writer cleanly when one of ``signums`` is received.
+
+        The handler only records the signal when it interrupts a call to
+        the writer: the writer is closed once that call is done, so pending
+        events are never written twice or cut short. The previously
+        installed handlers are then restored and the signal is passed on
+        to them, so the process still terminates as it would have without
+        the writer. Must be called from the main thread.
+        """
+        for signum in signums:
+            self._previous_handlers.setdefault(signum, signal.getsignal(signum))
+            signal.signal(signum, self._handle_signal)
+
+    def _handle_signal(self, signum: int, frame: Optional[FrameType]) -> None:
+        self._signal = signum
+        if not self._depth:
+            self._deliver_signal(signum, frame)
+
+    def _deliver_signal(self, signum: int, frame: Optional[FrameType]) -> None:
+        self._signal = None
+        self.close()
+        previous = self._previous_handlers.get(signum)
+        for num, handler in self._previous_handlers.items():
+            signal.signal(num, handler)
+        self._previous_handlers.clear()
+        if callable(previous):
+            previous(signum, frame)
+        elif previous == signal.SIG_DFL:
+            signal.raise_signal(signum)
+
+    def __enter__(self) -> "EventWriter":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[type[BaseException]],
+        exc: Optional[BaseException],
+        tb: Optional[TracebackType],
+    ) -> None:
+        self.close()
+
+
+_UNSAFE_PATH_CHARS = re.compile(r"[^A-Za-z0-9._=+-]")
+
+
+def _partition_name(value: object) -> str:
+    """Turn a partition key into a string usable in a file name."""
+    if value is None:
+        return "_none"
+    name = _UNSAFE_PATH_CHARS.sub("_", str(value))
+    return name if name.strip(".") else "_" + name
+
+
+def _partition(value: object, buckets: Optional[int]) -> str:
+    if buckets is not None:
+        data = b"" if value is None else str(value).encode("utf-8")
+        return str(zlib.crc32(data) % buckets)
+    return _partition_name(value)
+
+
+class PartitionedWriter:
+    """Write a stream of models to one NDJSON file per partition.
+
+    ``path`` must contain a ``{partition}`` placeholder, for instance
+    ``"out/protocol={partition}.ndjson.gz"``. ``key`` is either a callable
+    returning the partition key of a model or a dotted field path such as
+    ``"geoip.country_iso_code"``. When ``buckets`` is set, keys are hashed
+    into that many partitions numbered from 0, using a hash that is stable
+    across processes. Otherwise the key is turned into a file name, and two
+    keys giving the same name raise ``ValueError``.
+
+    At most ``max_open`` files are kept open. The least recently used one
+    is closed when another partition needs a file, and reopened in append
+    mode if more events for it arrive later. Remaining arguments are passed
+    to the ``EventWriter`` of every partition.
+    """
+
+    def __init__(
+        self,
+        path: "str | os.PathLike[str]",
+        key: "str | Callable[[Model], object]",
+        buckets: Optional[int] = None,
+        max_open: int = 64,
+        codec: Optional[str] = None,
+        level: Optional[int] = None,
+        buffer_size: int = 1 << 16,
+    ) -> None:
+        from l9format.fields import path_getter
+
+        self.path_template = os.fspath(path)
+        if "{partition" not in self.path_template:
+            raise ValueError("path must contain a {partition} placeholder")
+        if max_open < 1:
+            raise ValueError("max_open must be at least 1")
+        if buckets is not None and buckets < 1:
+            raise ValueError("buckets must be at least 1")
+        self.key = path_getter(key) if isinstance(key, str) else key
+        self.buckets = buckets
+        self.max_open = max_open
+        self.codec = codec
+        self.level = level
+        self.buffer_size = buffer_size
+        self.paths: dict[str, str] = {}
+        self.counts: dict[str, int] = {}
+        # The first key given each partition name, to detect collisions.
+        self._keys: dict[str, object] = {}
+        self._writers: OrderedDict[str, EventWriter] = OrderedDict()
+        self._closed = False
+
+    def partition_of(self, model: Model) -> str:
+        """Return the name of the partition ``model`` is written to."""
+        return self.partition_of_key(self.key(model))
+
+    def partition_of_key(self, value: object) -> str:
+        """Return the name of the partition of the key ``value``. Raise
+        ``ValueError`` when a different key was given the same name."""
+        partition = _partition(value, self.buckets)
+        if self.buckets is None:
+            first = self._keys.setdefault(partition, value)
+            if first != value:
+                raise ValueError(
+                    f"partition keys {first!r} and {value!r} both map to "
+                    f"{partition!r}"
+                )
+        return partition
+
+    def _writer(self, partition: str) -> EventWriter:
+        writer = self._writers.get(partition)
+        if writer is not None:
+            self._writers.move_to_end(partition)
+            return writer
+        if len(self._writers) >= self.max_open:
+            _, oldest = self._writers.popitem(last=False)
+            oldest.close()
+        path = self.paths.get(partition)
+        append = path is not None
+        if path is None:
+            path = self.path_template.format(partition=partition)
+            self.paths[partition] = path
+            self.counts[partition] = 0
+        writer = EventWriter(
+            path,
+            codec=self.codec,
+            level=self.level,
+            buffer_size=self.buffer_size,
+            append=append,
+        )
+        self._writers[partition] = writer
+        return writer
+
+    def write(self, model: Model) -> str:
+        """Write ``model`` to its partition and return the partition name."""
+        partition = self.partition_of(model)
+        self.write_line(partition, dumps(model))
+        return partition
+
+    def write_line(self, partition: str, line: str) -> None:
+        """Append an already serialized JSON record to ``partition``, a
+        name returned by ``partition_of()``."""
+        if self._closed:
+            raise ValueError("write to closed PartitionedWriter")
+        self._writer(partition).write_line(line)
+        self.counts[partition] += 1
+
+    def write_many(self, models: Iterable[Model]) -> None:
+        """Write every model of ``models`` to its partition."""
+        for model in models:
+            self.write(model)
+
+    def close(self) -> None:
+        """Flush and close every open partition file."""
+        self._closed = True
+        while self._writers:
+            _, writer = self._writers.popitem(last=False)
+            writer.close()
+
+    def __enter__(self) -> "PartitionedWriter":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[type[BaseException]],
+        exc: Optional[BaseException],
+        tb: Optional[TracebackType],
+    ) -> None:
+        self.close()
@@ -0,0 +1,265 @@
+"""Trigram index of text fields, for substring and prefix search.
+
+``TrigramIndex`` maps every three-character sequence of chosen text fields
+of a collection of events to the ascending list of the rows holding it. A
+query intersects the posting lists of its own trigrams, smallest first, and
+checks the few candidates left against the indexed text::
+
+    index = TrigramIndex()
+    index.extend(events)
+    rows = index.search("openssh_7.4")
+    rows = index.prefix("220 ProFTPD", fields=["ftp.banner"])
+    index.save("banners.l9ngram")
+
+Matching ignores case by default. Queries shorter than a trigram scan the
+indexed text. ``load()`` reads a saved index back without rebuilding it:
+the posting lists are views on a single buffer.
+"""
+
+import array
+import bisect
+import os
+import pickle
+import sys
+from typing import Any, Callable, Iterable, Optional, Sequence, Union
+
+from l9format.fields import field_type, path_getter
+from l9format.l9format import L9Event, Model
+
+DEFAULT_FIELDS = (
+    "ssh.banner",
+    "ftp.banner",
+    "smtp.banner",
+    "telnet.banner",
+    "http.title",
+    "service.software.version",
+    "summary",
+)
+
+# Version of the file layout written by save().
+FORMAT = 1
+
+_MAGIC = b"L9NGRAM\x00"
+# Marks the start of a text, so that prefixes have trigrams of their own.
+_START = "\x02"
+# Unsigned 32-bit row numbers.
+_TYPECODE = "I" if array.array("I").itemsize == 4 else "L"
+
+Posting = Union["array.array[int]", memoryview]
+
+
+def _trigrams(text: str) -> set[str]:
+    return {text[i : i + 3] for i in range(len(text) - 2)}
+
+
+def _intersect(small: Sequence[int], large: Sequence[int]) -> list[int]:
+    """Intersect two ascending lists of row numbers."""
+    if len(small) * 8 < len(large):
+        # Few candidates: look each of them up in the long list.
+        result = []
+        lo = 0
+        end = len(large)
+        for row in small:
+            lo = bisect.bisect_left(large, row, lo)
+            if lo == end:
+                break
+            if large[lo] == row:
+                result.append(row)
+        return result
+    return sorted(set(small).intersection(large))
+
+
+def _little_endian(values: "array.array[int]") -> bytes:
+    if sys.byteorder == "big":
+        values = array.array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _from_little_endian(typecode: str, data: bytes) -> "array.array[int]":
+    values = array.array(typecode, data)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+class TrigramIndex:
+    """A trigram index of the text ``fields`` of events, by row number.
+
+    Rows are numbered in the order events are added, so the index lines up
+    with the list or file it was built from. The folded text of every field
+    is kept, to check candidates. Fields are dotted paths of ``cls``;
+    values that are not strings are not indexed.
+    """
+
+    def __init__(
+        self,
+        fields: Iterable[str] = DEFAULT_FIELDS,
+        case_sensitive: bool = False,
+        cls: type[Model] = L9Event,
+    ) -> None:
+        self.fields = tuple(fields)
+        for path in self.fields:
+            field_type(cls, path)
+        self.case_sensitive = case_sensitive
+        self.documents = 0
+        self._getters = [path_getter(path) for path in self.fields]
+        self._texts: list[list[Optional[str]]] = [[] for _ in self.fields]
+        self._postings: list[dict[str, Posting]] = [{} for _ in self.fields]
+
+    def __len__(self) -> int:
+        return self.documents
+
+    def _fold(self, text: str) -> str:
+        return text if self.case_sensitive else text.casefold()
+
+    def add(self, event: object) -> int:
+        """Index the fields of a model, or a raw JSON object, as a new row
+        and return its number."""
+        row = self.documents
+        for get, texts, postings in zip(
+            self._getters, self._texts, self._postings
+        ):
+            value = get(event)
+            if not isinstance(value, str) or not value:
+                texts.append(None)
+                continue
+            text = self._fold(value)
+            texts.append(text)
+            for trigram in _trigrams(_START + text):
+                posting = postings.get(trigram)
+                if posting is None:
+                    postings[trigram] = array.array(_TYPECODE, (row,))
+                    continue
+                if not isinstance(posting, array.array):
+                    # A view on a loaded index, copied on first write.
+                    posting = postings[trigram] = array.array(
+                        _TYPECODE, posting
+                    )
+                posting.append(row)
+        self.documents += 1
+        return row
+
+    def extend(self, events: Iterable[object]) -> None:
+        """Index every event as a new row."""
+        for event in events:
+            self.add(event)
+
+    def _field_numbers(self, fields: Optional[Iterable[str]]) -> list[int]:
+        if fields is None:
+            return list(range(len(self.fields)))
+        numbers = []
+        for path in fields:
+            if path not in self.fields:
+                raise ValueError(f"field not indexed: {path}")
+            numbers.append(self.fields.index(path))
+        return numbers
+
+    def _candidates(self, number: int, trigrams: set[str]) -> Sequence[int]:
+        if not trigrams:
+            return range(self.documents)
+        postings = self._postings[number]
+        lists: list[Sequence[int]] = []
+        for trigram in trigrams:
+            posting = postings.get(trigram)
+            if posting is None:
+                return []
+            lists.append(posting)
+        lists.sort(key=len)
+        candidates = lists[0]
+        for other in lists[1:]:
+            candidates = _intersect(candidates, other)
+            if not candidates:
+                break
+        return candidates
+
+    def _select(
+        self,
+        trigrams: set[str],
+        matches: Callable[[str], bool],
+        fields: Optional[Iterable[str]],
+    ) -> list[int]:
+        rows: set[int] = set()
+        for number in self._field_numbers(fields):
+            texts = self._texts[number]
+            for row in self._candidates(number, trigrams):
+                value = texts[row]
+                if value is not None and matches(value):
+                    rows.add(row)
+        return sorted(rows)
+
+    def search(
+        self, text: str, fields: Optional[Iterable[str]] = None
+    ) -> list[int]:
+        """Return the rows where one of ``fields``, all the indexed ones by
+        default, contains ``text``."""
+        query = self._fold(text)
+        return self._select(
+            _trigrams(query), lambda value: query in value, fields
+        )
+
+    def prefix(
+        self, text: str, fields: Optional[Iterable[str]] = None
+    ) -> list[int]:
+        """Return the rows where one of ``fields``, all the indexed ones by
+        default, starts with ``text``."""
+        query = self._fold(text)
+        return self._select(
+            _trigrams(_START + query),
+            lambda value: value.startswith(query),
+            fields,
+        )
+
+    def save(self, path: "str | os.PathLike[str]") -> None:
+        """Write the index to ``path``, replacing it atomically."""
+        postings = []
+        for field_postings in self._postings:
+            keys = list(field_postings)
+            offsets = array.array("Q", [0])
+            data = array.array(_TYPECODE)
+            for key in keys:
+                data.extend(field_postings[key])
+                offsets.append(len(data))
+            postings.append(
+                (keys, _little_endian(offsets), _little_endian(data))
+            )
+        payload = {
+            "format": FORMAT,
+            "fields": self.fields,
+            "case_sensitive": self.case_sensitive,
+            "documents": self.documents,
+            "texts": self._texts,
+            "postings": postings,
+        }
+        path = os.fspath(path)
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(_MAGIC)
+            pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(
+        cls, path: "str | os.PathLike[str]", model: type[Model] = L9Event
+    ) -> "TrigramIndex":
+        """Read an index written by ``save()``. The file is unpickled: only
+        load trusted files."""
+        with open(path, "rb") as f:
+            if f.read(len(_MAGIC)) != _MAGIC:
+                raise ValueError(f"not a trigram index: {os.fspath(path)}")
+            payload: dict[str, Any] = pickle.load(f)
+        if payload.get("format") != FORMAT:
+            raise ValueError(
+                f"unsupported trigram index format: {payload.get('format')}"
+            )
+        index = cls(payload["fields"], payload["case_sensitive"], model)
+        index.documents = payload["documents"]
+        index._texts = payload["texts"]
+        for number, (keys, offsets, data) in enumerate(payload["postings"]):
+            bounds = _from_little_endian("Q", offsets)
+            view = memoryview(_from_little_endian(_TYPECODE, data))
+            index._postings[number] = {
+                key: view[bounds[i] : bounds[i + 1]]
+                for i, key in enumerate(keys)
+            }
+        return index
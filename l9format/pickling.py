@@ -0,0 +1,144 @@
+"""Compact pickling of batches of models, for process pools.
+
+A ``Model`` pickles as its class and the tuple of its field values.
+``dumps_batch()`` goes further for a list of models: nested models are
+written as plain tuples laid out by the schema, without a class reference
+or a reduce call each, and ``loads_batch()`` rebuilds them from the
+schema::
+
+    with ProcessPoolExecutor() as pool:
+        payloads = [dumps_batch(chunk) for chunk in chunks]
+        for result in pool.map(work, payloads):  # work() calls loads_batch()
+            ...
+"""
+
+import pickle
+from typing import (
+    IO,
+    Any,
+    Callable,
+    Iterable,
+    Iterator,
+    NamedTuple,
+    get_args,
+    get_origin,
+)
+
+from l9format.l9format import Model, _class_cache, _unwrap_optional
+
+# Version of the payload layout written by dumps_batch().
+FORMAT = 1
+
+
+class _Plan(NamedTuple):
+    """Field names of a class, a getter for their values and the fields
+    holding nested models (``many`` for lists of models)."""
+
+    names: tuple[str, ...]
+    values: Callable[[Any], tuple[Any, ...]]
+    nested: tuple[tuple[int, type[Model], bool], ...]
+
+
+_PLANS: dict[type, _Plan] = {}
+
+
+def _plan(cls: type[Model]) -> _Plan:
+    def build() -> _Plan:
+        nested = []
+        for i, spec in enumerate(cls._schema()):
+            tp = _unwrap_optional(spec.tp)
+            many = get_origin(tp) is list
+            if many:
+                args = get_args(tp)
+                tp = args[0] if args else object
+            if isinstance(tp, type) and issubclass(tp, Model):
+                nested.append((i, tp, many))
+        names = tuple(spec.name for spec in cls._schema())
+        return _Plan(names, cls._retain_plan().values, tuple(nested))
+
+    return _class_cache(_PLANS, cls, build)
+
+
+def _row(model: Model) -> tuple[Any, ...]:
+    cls = type(model)
+    plan = _PLANS.get(cls) or _plan(cls)
+    values = plan.values(model)
+    if not plan.nested:
+        return values
+    row = list(values)
+    for i, tp, many in plan.nested:
+        value = row[i]
+        # Values of another type than declared, including lazy lists and
+        # model subclasses, are pickled as they are.
+        if many:
+            if type(value) is list:
+                row[i] = [
+                    _row(item) if type(item) is tp else item for item in value
+                ]
+        elif type(value) is tp:
+            row[i] = _row(value)
+    return tuple(row)
+
+
+def _build(cls: type[Model], row: tuple[Any, ...]) -> Model:
+    plan = _PLANS.get(cls) or _plan(cls)
+    if plan.nested:
+        values = list(row)
+        for i, tp, many in plan.nested:
+            value = values[i]
+            if many:
+                if type(value) is list:
+                    values[i] = [
+                        _build(tp, item) if type(item) is tuple else item
+                        for item in value
+                    ]
+            elif type(value) is tuple:
+                values[i] = _build(tp, value)
+        row = tuple(values)
+    obj = cls.__new__(cls)
+    obj.__dict__.update(zip(plan.names, row))
+    return obj
+
+
+def dumps_batch(
+    models: Iterable[Model], protocol: int = pickle.HIGHEST_PROTOCOL
+) -> bytes:
+    """Pickle a batch of models.
+
+    The batch is laid out for the class of its first model; models of
+    other classes are pickled individually. Per-instance caches, such as
+    the encoding kept by ``retain_raw``, are not sent, and a nested model
+    shared by several models is loaded back as separate copies.
+    """
+    models = list(models)
+    cls = type(models[0]) if models else Model
+    rows = [_row(m) if type(m) is cls else m for m in models]
+    return pickle.dumps((FORMAT, cls, rows), protocol)
+
+
+def _from_payload(payload: Any) -> list[Model]:
+    if not (
+        isinstance(payload, tuple)
+        and len(payload) == 3
+        and payload[0] == FORMAT
+    ):
+        raise ValueError("not a batch written by dumps_batch()")
+    _, cls, rows = payload
+    return [_build(cls, row) if type(row) is tuple else row for row in rows]
+
+
+def loads_batch(data: bytes) -> list[Model]:
+    """Unpickle a batch written by ``dumps_batch()``."""
+    return _from_payload(pickle.loads(data))
+
+
+def iter_batches(fp: IO[bytes]) -> Iterator[list[Model]]:
+    """Yield the batches of a stream of ``dumps_batch()`` payloads written
+    one after the other, such as a file written by ``python -m l9format
+    convert``."""
+    while True:
+        try:
+            payload = pickle.load(fp)
+        except EOFError:
+            return
+        yield _from_payload(payload)
@@ -0,0 +1,282 @@
+"""Passing batches of models between processes through shared memory.
+
+A ``SegmentRing`` owns a fixed set of ``multiprocessing.shared_memory``
+segments. ``write()`` pickles a batch of models into a free segment and
+returns a small ``BatchHandle`` to send to another process, which opens
+the batch with ``SharedBatch(handle)``. Records are unpickled on access
+straight from ``memoryview`` slices of the segment. ``release()`` hands
+the segment back to the ring for the next batch::
+
+    # Writer
+    with SegmentRing(segments=4) as ring:
+        queue.put(ring.write(events))
+
+    # Reader
+    with SharedBatch(queue.get()) as batch:
+        for event in batch:
+            ...
+        batch.release()
+
+A segment is laid out as a header (magic, state, generation and record
+count), the end offset of every record, then the pickled records. A ring
+must be written to by a single thread, and each batch is released by
+exactly one reader.
+"""
+
+import array
+import multiprocessing
+import pickle
+import struct
+import time
+from multiprocessing import resource_tracker, shared_memory
+from types import TracebackType
+from typing import (
+    Iterable,
+    Iterator,
+    NamedTuple,
+    Optional,
+    Sequence,
+    cast,
+    overload,
+)
+
+from l9format.l9format import Model
+
+DEFAULT_SEGMENT_SIZE = 16 << 20
+
+_MAGIC = b"L9SB"
+_HEADER = struct.Struct("<4sB3xQQ")
+_STATE_OFFSET = 4
+_FREE = 0
+_READY = 1
+
+# Names of the segments created by this process.
+_CREATED: set[str] = set()
+
+
+class BatchHandle(NamedTuple):
+    """What a reader needs to open a batch: the segment name, the
+    generation of the batch in it and the number of records."""
+
+    name: str
+    generation: int
+    records: int
+
+
+def _buf(shm: shared_memory.SharedMemory) -> memoryview:
+    return cast(memoryview, shm.buf)
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    try:
+        return shared_memory.SharedMemory(
+            name, track=False  # type: ignore[call-arg]
+        )
+    except TypeError:
+        pass
+    # Before Python 3.13, attaching registers the segment with the resource
+    # tracker, which destroys it when the processes using the tracker have
+    # exited. The writer and the processes it starts share one tracker,
+    # where the registration is the writer's own: unregistering would drop
+    # it. Only unregister from a tracker of our own.
+    shm = shared_memory.SharedMemory(name)
+    if name not in _CREATED and multiprocessing.parent_process() is None:
+        resource_tracker.unregister(
+            shm._name, "shared_memory"  # type: ignore[attr-defined]
+        )
+    return shm
+
+
+class SegmentRing:
+    """A pool of shared memory segments reused for successive batches.
+
+    ``segment_size`` bounds the encoded size of a batch. ``write()`` waits
+    up to ``timeout`` seconds, or forever when it is ``None``, for a
+    reader to release a segment when all are in use. ``close()`` destroys
+    the segments, so it must only be called once readers are done.
+    """
+
+    def __init__(
+        self, segments: int = 4, segment_size: int = DEFAULT_SEGMENT_SIZE
+    ) -> None:
+        if segments < 1:
+            raise ValueError("segments must be at least 1")
+        self.segment_size = segment_size
+        self._segments: list[shared_memory.SharedMemory] = []
+        try:
+            for _ in range(segments):
+                shm = shared_memory.SharedMemory(create=True, size=segment_size)
+                self._segments.append(shm)
+                _CREATED.add(shm.name)
+                _HEADER.pack_into(_buf(shm), 0, _MAGIC, _FREE, 0, 0)
+        except BaseException:
+            self.close()
+            raise
+        self._next = 0
+        self._generation = 0
+
+    def __len__(self) -> int:
+        return len(self._segments)
+
+    @property
+    def free(self) -> int:
+        """The number of segments not holding an unreleased batch."""
+        return sum(_buf(shm)[_STATE_OFFSET] == _FREE for shm in self._segments)
+
+    def _acquire(self, timeout: Optional[float]) -> shared_memory.SharedMemory:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        count = len(self._segments)
+        while True:
+            for k in range(count):
+                i = (self._next + k) % count
+                shm = self._segments[i]
+                if _buf(shm)[_STATE_OFFSET] == _FREE:
+                    self._next = (i + 1) % count
+                    return shm
+            if deadline is not None and time.monotonic() >= deadline:
+                raise TimeoutError("no shared memory segment was released")
+            time.sleep(0.001)
+
+    def write(
+        self,
+        models: Iterable[Model],
+        timeout: Optional[float] = None,
+        protocol: int = pickle.HIGHEST_PROTOCOL,
+    ) -> BatchHandle:
+        """Write a batch into a free segment and return its handle.
+
+        Raises ``ValueError`` when the encoded batch does not fit in a
+        segment.
+        """
+        if not self._segments:
+            raise ValueError("write to a closed SegmentRing")
+        records = [pickle.dumps(m, protocol) for m in models]
+        count = len(records)
+        offsets = array.array("Q", [0])
+        for record in records:
+            offsets.append(offsets[-1] + len(record))
+        start = _HEADER.size + offsets.itemsize * (count + 1)
+        size = start + offsets[-1]
+        if size > self.segment_size:
+            raise ValueError(
+                f"batch of {size} bytes does not fit in a segment of "
+                f"{self.segment_size} bytes"
+            )
+        shm = self._acquire(timeout)
+        buf = _buf(shm)
+        buf[_HEADER.size : start] = offsets.tobytes()
+        for record, offset in zip(records, offsets):
+            buf[start + offset : start + offset + len(record)] = record
+        self._generation += 1
+        # The state is set last: the segment is complete once it is ready.
+        _HEADER.pack_into(buf, 0, _MAGIC, _FREE, self._generation, count)
+        buf[_STATE_OFFSET] = _READY
+        return BatchHandle(shm.name, self._generation, count)
+
+    def close(self) -> None:
+        """Destroy the segments."""
+        for shm in self._segments:
+            _CREATED.discard(shm.name)
+            shm.close()
+            shm.unlink()
+        self._segments = []
+
+    def __enter__(self) -> "SegmentRing":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[type[BaseException]],
+        exc: Optional[BaseException],
+        tb: Optional[TracebackType],
+    ) -> None:
+        self.close()
+
+
+class SharedBatch(Sequence[Model]):
+    """A batch written by ``SegmentRing.write()``, opened from its handle.
+
+    Records are unpickled each time they are accessed. Views returned by
+    ``raw()`` must be released before the batch is closed.
+    """
+
+    def __init__(self, handle: BatchHandle) -> None:
+        self.handle = handle
+        self._shm = _attach(handle.name)
+        buf = _buf(self._shm)
+        magic, state, generation, count = _HEADER.unpack_from(buf)
+        if (
+            magic != _MAGIC
+            or state != _READY
+            or generation != handle.generation
+            or count != handle.records
+        ):
+            self._shm.close()
+            raise ValueError(f"stale or invalid batch handle: {handle}")
+        start = _HEADER.size + 8 * (count + 1)
+        self._offsets: Optional[memoryview] = buf[_HEADER.size : start].cast(
+            "Q"
+        )
+        self._payload: Optional[memoryview] = buf[start:]
+
+    def __len__(self) -> int:
+        return self.handle.records
+
+    def raw(self, index: int) -> memoryview:
+        """Return the pickled record at ``index``, without copying it."""
+        if self._offsets is None or self._payload is None:
+            raise ValueError("read from a closed SharedBatch")
+        if index < 0:
+            index += self.handle.records
+        if not 0 <= index < self.handle.records:
+            raise IndexError("batch index out of range")
+        return self._payload[self._offsets[index] : self._offsets[index + 1]]
+
+    @overload
+    def __getitem__(self, index: int) -> Model: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[Model]: ...
+
+    def __getitem__(self, index: "int | slice") -> "Model | list[Model]":
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        with self.raw(index) as record:
+            return pickle.loads(record)  # type: ignore[no-any-return]
+
+    def __iter__(self) -> Iterator[Model]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def release(self) -> None:
+        """Hand the segment back to the ring and close the batch."""
+        if self._offsets is not None:
+            buf = _buf(self._shm)
+            if _HEADER.unpack_from(buf)[2] == self.handle.generation:
+                buf[_STATE_OFFSET] = _FREE
+        self.close()
+
+    def close(self) -> None:
+        """Unmap the segment without releasing it."""
+        if self._offsets is not None and self._payload is not None:
+            self._offsets.release()
+            self._payload.release()
+            self._offsets = self._payload = None
+            self._shm.close()
+
+    def __del__(self) -> None:
+        # The views must go before the segment, which refuses to close
+        # while they exist.
+        if hasattr(self, "_payload"):
+            self.close()
+
+    def __enter__(self) -> "SharedBatch":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[type[BaseException]],
+        exc: Optional[BaseException],
+        tb: Optional[TracebackType],
+    ) -> None:
+        self.close()
@@ -0,0 +1,418 @@
+"""Bulk loading of models into SQLite and querying them back.
+
+``EventStore`` derives a table from the model schema. Scalar fields become
+columns named by their dotted path (``"ip"``, ``"http.status"``) and
+required nested models are flattened into their parent's row, with an
+integer column named after the model path flagging whether the model is
+present. Lists, dicts and optional nested models such as the protocol
+sub-events are stored as JSON text, which SQLite's ``json_extract()``
+can query.
+
+Rows are inserted with ``executemany`` in batched transactions, and
+``query()``/``select()`` return models or projected tuples.
+"""
+
+import decimal
+import json
+import os
+import sqlite3
+from datetime import datetime
+from operator import attrgetter
+from types import TracebackType
+from typing import (
+    Any,
+    Callable,
+    Iterable,
+    Iterator,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Union,
+)
+
+from l9format.encoder import dumps
+from l9format.headers import HeaderMap
+from l9format.l9format import (
+    L9Event,
+    Model,
+    _deserialize_value,
+    _unwrap_optional,
+)
+from l9format.lazy import LazyList
+
+DEFAULT_BATCH_SIZE = 10000
+DEFAULT_INDEXES = ("ip", "protocol", "time", "event_type")
+
+_SQL_TYPES = {
+    "int": "INTEGER",
+    "bool": "INTEGER",
+    "float": "REAL",
+    "str": "TEXT",
+    "decimal": "TEXT",
+    "datetime": "TEXT",
+    "json": "TEXT",
+    "model": "INTEGER",
+}
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _kind(tp: Any, optional: bool) -> str:
+    if isinstance(tp, type):
+        if issubclass(tp, Model):
+            return "json" if optional else "model"
+        if issubclass(tp, bool):
+            return "bool"
+        if issubclass(tp, int):
+            return "int"
+        if issubclass(tp, float):
+            return "float"
+        if issubclass(tp, str):
+            return "str"
+        if issubclass(tp, decimal.Decimal):
+            return "decimal"
+        if issubclass(tp, datetime):
+            return "datetime"
+    return "json"
+
+
+class _Column(NamedTuple):
+    """A column of the table. ``children`` holds the columns of a
+    flattened nested model and ``width`` counts them with the column."""
+
+    name: str
+    path: str
+    kind: str
+    tp: Any
+    children: tuple["_Column", ...]
+    width: int
+
+
+def _columns(cls: type[Model], prefix: str = "") -> tuple[_Column, ...]:
+    columns = []
+    for spec in cls._schema():
+        path = prefix + spec.name
+        tp = _unwrap_optional(spec.tp)
+        kind = _kind(tp, spec.optional)
+        children = _columns(tp, path + ".") if kind == "model" else ()
+        width = 1 + sum(child.width for child in children)
+        columns.append(_Column(spec.name, path, kind, tp, children, width))
+    return tuple(columns)
+
+
+def _flat(columns: Iterable[_Column]) -> Iterator[_Column]:
+    for c in columns:
+        yield c
+        yield from _flat(c.children)
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (Model, HeaderMap)):
+        return value.to_dict()
+    if isinstance(value, LazyList):
+        return list(value.stream())
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return f"{value:f}"
+    raise TypeError(f"cannot encode {type(value).__name__}")
+
+
+_JSON_ENCODER = json.JSONEncoder(default=_json_default)
+
+
+def _encode_json(value: Any) -> str:
+    if isinstance(value, Model):
+        return dumps(value)
+    return _JSON_ENCODER.encode(value)
+
+
+def _encode_decimal(value: decimal.Decimal) -> str:
+    return f"{value:f}"
+
+
+def _encode_present(value: Model) -> int:
+    return 1
+
+
+# Conversions of non-null field values to SQLite values, by column kind.
+_ENCODERS: dict[str, Callable[[Any], Any]] = {
+    "datetime": datetime.isoformat,
+    "decimal": _encode_decimal,
+    "json": _encode_json,
+    "model": _encode_present,
+}
+
+
+def _field_values(
+    obj: Optional[Model], columns: tuple[_Column, ...], out: list[Any]
+) -> None:
+    """Append the field value of every column, ``None`` below a missing
+    nested model."""
+    for c in columns:
+        value = None if obj is None else getattr(obj, c.name)
+        out.append(value)
+        if c.children:
+            _field_values(value, c.children, out)
+
+
+def _decode_value(value: Any, c: _Column) -> Any:
+    """Convert a column value back to its JSON form."""
+    if value is None:
+        return None
+    if c.kind == "bool":
+        return bool(value)
+    if c.kind == "json":
+        return json.loads(value)
+    return value
+
+
+def _decode_row(
+    row: Sequence[Any], pos: int, columns: tuple[_Column, ...]
+) -> tuple[dict, int]:
+    d: dict[str, Any] = {}
+    for c in columns:
+        value = row[pos]
+        pos += 1
+        if c.kind == "model":
+            if value is None:
+                d[c.name] = None
+                pos += c.width - 1
+            else:
+                d[c.name], pos = _decode_row(row, pos, c.children)
+        else:
+            d[c.name] = _decode_value(value, c)
+    return d, pos
+
+
+class EventStore:
+    """A SQLite table of models of type ``cls``.
+
+    ``path`` is a database file, ``":memory:"`` or an existing
+    ``sqlite3.Connection``. The table is created if it does not exist and
+    indexes are created on the ``indexes`` paths; when bulk loading into a
+    new table, passing ``indexes=()`` and calling ``create_indexes()``
+    afterwards is faster.
+
+    A store wraps a single connection and must not be shared between
+    threads.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, "os.PathLike[str]", sqlite3.Connection] = ":memory:",
+        cls: type[Model] = L9Event,
+        table: str = "events",
+        indexes: Iterable[str] = DEFAULT_INDEXES,
+    ) -> None:
+        self.cls = cls
+        self.table = table
+        if isinstance(path, sqlite3.Connection):
+            self.connection = path
+            self._own = False
+        else:
+            self.connection = sqlite3.connect(os.fspath(path))
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("PRAGMA synchronous=NORMAL")
+            self._own = True
+        self._tree = _columns(cls)
+        self._columns = {c.path: c for c in _flat(self._tree)}
+        # With several names, attrgetter returns a tuple; the first name
+        # is repeated so that this also holds for single-column tables.
+        paths = list(self._columns)
+        self._values = attrgetter(*paths, paths[0])
+        self._encoders = tuple(
+            (i, _ENCODERS[c.kind])
+            for i, c in enumerate(self._columns.values())
+            if c.kind in _ENCODERS
+        )
+        names = ", ".join(_quote(p) for p in self._columns)
+        placeholders = ", ".join("?" * len(self._columns))
+        self._insert = (
+            f"INSERT INTO {_quote(table)} ({names}) VALUES ({placeholders})"
+        )
+        self._select = f"SELECT {names} FROM {_quote(table)}"
+        definitions = ", ".join(
+            f"{_quote(c.path)} {_SQL_TYPES[c.kind]}"
+            for c in self._columns.values()
+        )
+        with self.connection:
+            self.connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {_quote(table)} "
+                f"(id INTEGER PRIMARY KEY, {definitions})"
+            )
+        self.create_indexes(indexes)
+
+    def column(self, path: str) -> str:
+        """Return the quoted column name of the field at ``path``, for use
+        in SQL expressions passed to ``query()`` and ``select()``."""
+        if path not in self._columns:
+            raise ValueError(f"{path!r} is not a column of {self.table!r}")
+        return _quote(path)
+
+    def create_indexes(self, paths: Iterable[str] = DEFAULT_INDEXES) -> None:
+        """Create an index on each column in ``paths`` if it is missing."""
+        with self.connection:
+            for path in paths:
+                column = self.column(path)
+                name = _quote(f"{self.table}_{path}_idx")
+                self.connection.execute(
+                    f"CREATE INDEX IF NOT EXISTS {name} "
+                    f"ON {_quote(self.table)} ({column})"
+                )
+
+    def _row(self, model: Model) -> list[Any]:
+        try:
+            row = list(self._values(model))[:-1]
+        except AttributeError:
+            # A flattened nested model is missing; attrgetter cannot step
+            # over it.
+            row = []
+            _field_values(model, self._tree, row)
+        for i, encode in self._encoders:
+            value = row[i]
+            if value is not None:
+                row[i] = encode(value)
+        return row
+
+    def insert(self, model: Model) -> None:
+        """Insert a single model in its own transaction."""
+        with self.connection:
+            self.connection.execute(self._insert, self._row(model))
+
+    def insert_many(
+        self, models: Iterable[Model], batch_size: int = DEFAULT_BATCH_SIZE
+    ) -> int:
+        """Insert models with one transaction per ``batch_size`` rows and
+        return the number inserted."""
+        count = 0
+        batch: list[list[Any]] = []
+        row = self._row
+        for model in models:
+            batch.append(row(model))
+            if len(batch) >= batch_size:
+                count += self._insert_batch(batch)
+                batch = []
+        if batch:
+            count += self._insert_batch(batch)
+        return count
+
+    def _insert_batch(self, rows: list[list[Any]]) -> int:
+        with self.connection:
+            self.connection.executemany(self._insert, rows)
+        return len(rows)
+
+    def load_ndjson(
+        self,
+        path: "str | os.PathLike[str]",
+        batch_size: int = DEFAULT_BATCH_SIZE,
+    ) -> int:
+        """Insert the models of an NDJSON file, compressed or not, and
+        return the number inserted."""
+        from l9format.ndjson import read_events
+
+        return self.insert_many(read_events(path, self.cls), batch_size)
+
+    def _where(
+        self,
+        where: Optional[str],
+        order_by: Optional[str],
+        limit: Optional[int],
+    ) -> str:
+        sql = ""
+        if where:
+            sql += f" WHERE {where}"
+        if order_by:
+            sql += f" ORDER BY {order_by}"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        return sql
+
+    def query(
+        self,
+        where: Optional[str] = None,
+        params: Sequence[Any] = (),
+        order_by: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[Model]:
+        """Iterate over the models matching an SQL ``where`` expression.
+
+        Columns are referred to by their quoted dotted path, see
+        ``column()``::
+
+            store.query('"http.status" >= ? AND protocol = ?', (500, "https"))
+        """
+        sql = self._select + self._where(where, order_by, limit)
+        from_dict = self.cls.from_dict
+        tree = self._tree
+        for row in self.connection.execute(sql, params):
+            yield from_dict(_decode_row(row, 0, tree)[0])
+
+    def select(
+        self,
+        paths: Iterable[str],
+        where: Optional[str] = None,
+        params: Sequence[Any] = (),
+        order_by: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[tuple[Any, ...]]:
+        """Iterate over tuples of the values at ``paths``.
+
+        Values are converted to the types ``from_dict()`` produces; for a
+        flattened nested model, the value is whether the model is present.
+        """
+        paths = list(paths)
+        names = ", ".join(self.column(p) for p in paths)
+        columns = [self._columns[p] for p in paths]
+        sql = f"SELECT {names} FROM {_quote(self.table)}"
+        sql += self._where(where, order_by, limit)
+        converters = [_converter(c) for c in columns]
+        for row in self.connection.execute(sql, params):
+            yield tuple(f(v) for f, v in zip(converters, row))
+
+    def count(
+        self, where: Optional[str] = None, params: Sequence[Any] = ()
+    ) -> int:
+        """Return the number of rows matching ``where``."""
+        sql = f"SELECT COUNT(*) FROM {_quote(self.table)}"
+        sql += self._where(where, None, None)
+        return int(self.connection.execute(sql, params).fetchone()[0])
+
+    def __len__(self) -> int:
+        return self.count()
+
+    def __iter__(self) -> Iterator[Model]:
+        return self.query(order_by="id")
+
+    def close(self) -> None:
+        """Close the connection if the store opened it."""
+        if self._own:
+            self.connection.close()
+
+    def __enter__(self) -> "EventStore":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[type[BaseException]],
+        exc: Optional[BaseException],
+        tb: Optional[TracebackType],
+    ) -> None:
+        self.close()
+
+
+def _converter(c: _Column) -> Callable[[Any], Any]:
+    if c.kind == "model":
+        return lambda v: v is not None
+    if c.kind in ("bool", "json", "datetime", "decimal"):
+
+        def convert(value: Any) -> Any:
+            value = _decode_value(value, c)
+            if value is None or c.kind == "bool":
+                return value
+            return _deserialize_value(value, c.tp)
+
+        return convert
+    return lambda v: v
@@ -0,0 +1,437 @@
+"""One-pass statistics over streams of models, in bounded memory.
+
+Three sketches summarise a stream of values:
+
+- ``SpaceSaving`` keeps the most frequent values (heavy hitters) with an
+  upper bound on their counts.
+- ``HyperLogLog`` estimates the number of distinct values.
+- ``CountMinSketch`` estimates the count of any value.
+
+``FieldStats`` feeds them with the values at dotted field paths of models
+or raw JSON objects::
+
+    stats = FieldStats(top=["port", "geoip.country_iso_code"], distinct=["ip"])
+    stats.update(read_events("events.ndjson.gz"))
+    stats.top("port", 10)
+    stats.distinct("ip")
+
+Every sketch can be merged with another one of the same parameters, such
+as the one of another worker, and converts to and from a JSON-compatible
+dict for checkpoints. Values are hashed from their ``str()``, so that
+sketches built in different processes agree.
+"""
+
+import array
+import base64
+import hashlib
+import heapq
+import itertools
+import math
+import sys
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Callable, Hashable, Iterable, NamedTuple, Optional
+
+from l9format.fields import path_getter
+
+
+def _digest(value: object, size: int) -> bytes:
+    data = value if isinstance(value, bytes) else str(value).encode("utf-8")
+    return hashlib.blake2b(data, digest_size=size).digest()
+
+
+def _pack(values: "array.array[int]") -> str:
+    if sys.byteorder == "big":
+        values = array.array(values.typecode, values)
+        values.byteswap()
+    return base64.b64encode(values.tobytes()).decode("ascii")
+
+
+def _unpack(typecode: str, data: str) -> "array.array[int]":
+    values = array.array(typecode, base64.b64decode(data))
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+def _item(value: Any) -> Hashable:
+    # JSON turns tuples into lists; they are keys again once loaded.
+    return tuple(value) if isinstance(value, list) else value
+
+
+class TopItem(NamedTuple):
+    """A heavy hitter: its value, an upper bound on its count, and the
+    most the estimate can exceed the true count by."""
+
+    value: Any
+    estimate: int
+    error: int
+
+
+class SpaceSaving:
+    """The ``capacity`` most frequent values of a stream (Space-Saving).
+
+    Every value occurring more than ``total / capacity`` times is kept.
+    The count of a kept value is at most its true count plus its error.
+    """
+
+    def __init__(self, capacity: int = 1000) -> None:
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self.total = 0
+        self._counts: dict[Hashable, int] = {}
+        self._errors: dict[Hashable, int] = {}
+        # One entry per kept value. Entries are not updated when a count
+        # grows, so they are lower bounds, checked when evicting.
+        self._heap: list[tuple[int, int, Hashable]] = []
+        self._tick = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+    def add(self, value: Hashable, count: int = 1) -> None:
+        """Count ``count`` more occurrences of ``value``."""
+        self.total += count
+        counts = self._counts
+        current = counts.get(value)
+        if current is not None:
+            counts[value] = current + count
+            return
+        error = 0
+        if len(counts) >= self.capacity:
+            error = self._evict()
+        counts[value] = error + count
+        self._errors[value] = error
+        heapq.heappush(self._heap, (error + count, next(self._tick), value))
+
+    def _evict(self) -> int:
+        """Drop the value with the lowest count and return the count."""
+        heap = self._heap
+        counts = self._counts
+        while True:
+            count, _, value = heap[0]
+            current = counts[value]
+            if current == count:
+                heapq.heappop(heap)
+                del counts[value]
+                del self._errors[value]
+                return count
+            heapq.heapreplace(heap, (current, next(self._tick), value))
+
+    def _min_count(self) -> int:
+        if len(self._counts) < self.capacity:
+            return 0
+        return min(self._counts.values())
+
+    def top(self, k: Optional[int] = None) -> list[TopItem]:
+        """Return the ``k`` values with the highest counts, or all of them
+        when ``k`` is ``None``."""
+        items = sorted(
+            self._counts.items(), key=lambda item: item[1], reverse=True
+        )
+        return [
+            TopItem(value, count, self._errors[value])
+            for value, count in items[:k]
+        ]
+
+    def merge(self, other: "SpaceSaving") -> None:
+        """Add the counts of ``other``, keeping ``capacity`` values."""
+        # A value missing from a full summary occurred at most as often as
+        # the least frequent value it kept.
+        own_min = self._min_count()
+        other_min = other._min_count()
+        counts: dict[Hashable, int] = {}
+        errors: dict[Hashable, int] = {}
+        for value in self._counts.keys() | other._counts.keys():
+            count = error = 0
+            for summary, minimum in ((self, own_min), (other, other_min)):
+                c = summary._counts.get(value)
+                if c is None:
+                    count += minimum
+                    error += minimum
+                else:
+                    count += c
+                    error += summary._errors[value]
+            counts[value] = count
+            errors[value] = error
+        kept = heapq.nlargest(
+            self.capacity, counts.items(), key=lambda item: item[1]
+        )
+        self.total += other.total
+        self._set({v: (c, errors[v]) for v, c in kept})
+
+    def _set(self, items: dict[Hashable, tuple[int, int]]) -> None:
+        self._counts = {v: c for v, (c, _) in items.items()}
+        self._errors = {v: e for v, (_, e) in items.items()}
+        self._heap = [(c, next(self._tick), v) for v, c in self._counts.items()]
+        heapq.heapify(self._heap)
+
+    def to_dict(self) -> dict[str, Any]:
+        """Return the summary as a JSON-compatible dict; values must be
+        JSON-compatible."""
+        return {
+            "capacity": self.capacity,
+            "total": self.total,
+            "items": [list(item) for item in self.top()],
+        }
+
+    @classmethod
+    def from_dict(cls, d: dict[str, Any]) -> "SpaceSaving":
+        summary = cls(d["capacity"])
+        summary.total = d["total"]
+        summary._set({_item(v): (c, e) for v, c, e in d["items"]})
+        return summary
+
+
+class HyperLogLog:
+    """An estimate of the number of distinct values of a stream.
+
+    The standard error is about ``1.04 / sqrt(2 ** precision)``, 0.8% with
+    the default precision, for ``2 ** precision`` bytes of memory.
+    """
+
+    def __init__(self, precision: int = 14) -> None:
+        if not 4 <= precision <= 18:
+            raise ValueError("precision must be between 4 and 18")
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    def add(self, value: object) -> None:
+        """Add a value to the set."""
+        h = int.from_bytes(_digest(value, 8), "big")
+        p = self.precision
+        rest = h & ((1 << (64 - p)) - 1)
+        rank = 64 - p - rest.bit_length() + 1
+        i = h >> (64 - p)
+        if rank > self.registers[i]:
+            self.registers[i] = rank
+
+    def count(self) -> int:
+        """Return the estimated number of distinct values added."""
+        registers = self.registers
+        m = len(registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        total = sum(
+            registers.count(rank) * 2.0**-rank for rank in range(65 - 4)
+        )
+        estimate = alpha * m * m / total
+        zeros = registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            # Linear counting is more accurate for small sets.
+            estimate = m * math.log(m / zeros)
+        return round(estimate)
+
+    def merge(self, other: "HyperLogLog") -> None:
+        """Add the values of ``other`` to the set."""
+        if other.precision != self.precision:
+            raise ValueError("cannot merge sketches of different precisions")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def to_dict(self) -> dict[str, Any]:
+        data = base64.b64encode(self.registers).decode("ascii")
+        return {"precision": self.precision, "registers": data}
+
+    @classmethod
+    def from_dict(cls, d: dict[str, Any]) -> "HyperLogLog":
+        sketch = cls(d["precision"])
+        registers = base64.b64decode(d["registers"])
+        if len(registers) != len(sketch.registers):
+            raise ValueError("register count does not match the precision")
+        sketch.registers = bytearray(registers)
+        return sketch
+
+
+class CountMinSketch:
+    """Estimated counts of the values of a stream.
+
+    An estimate is never below the true count, and exceeds it by more than
+    ``e * total / width`` with a probability of at most ``exp(-depth)``.
+    """
+
+    def __init__(self, width: int = 2048, depth: int = 4) -> None:
+        if width < 1 or depth < 1:
+            raise ValueError("width and depth must be at least 1")
+        self.width = width
+        self.depth = depth
+        self.total = 0
+        self.table = array.array("Q", bytes(8 * width * depth))
+
+    def _cells(self, value: object) -> list[int]:
+        digest = _digest(value, 16)
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        width = self.width
+        return [
+            row * width + (h1 + row * h2) % width for row in range(self.depth)
+        ]
+
+    def add(self, value: object, count: int = 1) -> None:
+        """Count ``count`` more occurrences of ``value``."""
+        self.total += count
+        table = self.table
+        for cell in self._cells(value):
+            table[cell] += count
+
+    def estimate(self, value: object) -> int:
+        """Return the estimated count of ``value``."""
+        table = self.table
+        return min(table[cell] for cell in self._cells(value))
+
+    def merge(self, other: "CountMinSketch") -> None:
+        """Add the counts of ``other``."""
+        if (other.width, other.depth) != (self.width, self.depth):
+            raise ValueError("cannot merge sketches of different sizes")
+        self.total += other.total
+        self.table = array.array("Q", map(sum, zip(self.table, other.table)))
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "width": self.width,
+            "depth": self.depth,
+            "total": self.total,
+            "table": _pack(self.table),
+        }
+
+    @classmethod
+    def from_dict(cls, d: dict[str, Any]) -> "CountMinSketch":
+        sketch = cls(d["width"], d["depth"])
+        table = _unpack("Q", d["table"])
+        if len(table) != len(sketch.table):
+            raise ValueError("table size does not match width and depth")
+        sketch.total = d["total"]
+        sketch.table = table
+        return sketch
+
+
+def _value_getter(path: str) -> Callable[[object], Any]:
+    """Resolve ``path``, or a comma-separated list of paths to a tuple."""
+    if "," not in path:
+        return path_getter(path)
+    getters = [path_getter(p.strip()) for p in path.split(",")]
+    return lambda obj: tuple(get(obj) for get in getters)
+
+
+_SCALARS = frozenset((str, int, float, bool, tuple))
+
+
+def _values(value: Any) -> Iterable[Hashable]:
+    """The values counted for a field: nothing for a null, each item of a
+    list, and text for values JSON cannot represent."""
+    if value is None:
+        return ()
+    if type(value) in _SCALARS:
+        return (value,)
+    if isinstance(value, list):
+        return [v for item in value for v in _values(item)]
+    if isinstance(value, (Decimal, datetime)):
+        return (str(value),)
+    if isinstance(value, (str, int, float, bool, tuple)):
+        return (value,)
+    return (str(value),)
+
+
+class FieldStats:
+    """Sketches of the values at dotted field paths of models.
+
+    ``top`` paths get a ``SpaceSaving`` summary of ``capacity`` values,
+    ``distinct`` paths a ``HyperLogLog`` of ``precision`` and ``counts``
+    paths a ``CountMinSketch`` of ``width`` by ``depth``. A path may list
+    several comma-separated fields, which are counted as a tuple:
+    ``"service.software.name,service.software.version"``. Null values are
+    skipped and the items of lists counted one by one.
+    """
+
+    def __init__(
+        self,
+        top: Iterable[str] = (),
+        distinct: Iterable[str] = (),
+        counts: Iterable[str] = (),
+        capacity: int = 1000,
+        precision: int = 14,
+        width: int = 2048,
+        depth: int = 4,
+    ) -> None:
+        self.records = 0
+        self.tops = {path: SpaceSaving(capacity) for path in top}
+        self.distincts = {path: HyperLogLog(precision) for path in distinct}
+        self.counts = {path: CountMinSketch(width, depth) for path in counts}
+        self._build_plan()
+
+    def _build_plan(self) -> None:
+        plan: list[tuple[Callable[[object], Any], Callable[[Any], None]]] = []
+        for sketches in (self.tops, self.distincts, self.counts):
+            for path, sketch in sketches.items():
+                plan.append((_value_getter(path), sketch.add))
+        self._plan = plan
+
+    def add(self, obj: object) -> None:
+        """Add a model, or a raw JSON object, to the statistics."""
+        self.records += 1
+        for get, add in self._plan:
+            for value in _values(get(obj)):
+                add(value)
+
+    def update(self, objs: Iterable[object]) -> None:
+        """Add every model or raw JSON object of ``objs``."""
+        for obj in objs:
+            self.add(obj)
+
+    def top(self, path: str, k: Optional[int] = 10) -> list[TopItem]:
+        """Return the ``k`` most frequent values at ``path``."""
+        return self.tops[path].top(k)
+
+    def distinct(self, path: str) -> int:
+        """Return the estimated number of distinct values at ``path``."""
+        return self.distincts[path].count()
+
+    def estimate(self, path: str, value: object) -> int:
+        """Return the estimated count of ``value`` at ``path``."""
+        return self.counts[path].estimate(value)
+
+    def merge(self, other: "FieldStats") -> None:
+        """Add the statistics of ``other``, which must cover the same
+        paths with the same parameters."""
+        for mine, theirs in (
+            (self.tops, other.tops),
+            (self.distincts, other.distincts),
+            (self.counts, other.counts),
+        ):
+            if mine.keys() != theirs.keys():
+                raise ValueError("cannot merge statistics of other fields")
+            for path, sketch in mine.items():
+                sketch.merge(theirs[path])  # type: ignore[arg-type]
+        self.records += other.records
+
+    def to_dict(self) -> dict[str, Any]:
+        """Return the statistics as a JSON-compatible dict."""
+        return {
+            "records": self.records,
+            "top": {p: s.to_dict() for p, s in self.tops.items()},
+            "distinct": {p: s.to_dict() for p, s in self.distincts.items()},
+            "counts": {p: s.to_dict() for p, s in self.counts.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, d: dict[str, Any]) -> "FieldStats":
+        stats = cls()
+        stats.records = d["records"]
+        stats.tops = {p: SpaceSaving.from_dict(s) for p, s in d["top"].items()}
+        stats.distincts = {
+            p: HyperLogLog.from_dict(s) for p, s in d["distinct"].items()
+        }
+        stats.counts = {
+            p: CountMinSketch.from_dict(s) for p, s in d["counts"].items()
+        }
+        stats._build_plan()
+        return stats
+
+    def __getstate__(self) -> dict[str, Any]:
+        # The plan holds closures, which do not pickle.
+        state = dict(self.__dict__)
+        del state["_plan"]
+        return state
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._build_plan()
@@ -0,0 +1,288 @@
+"""Tag sets as bitmaps, for fast tag-membership queries.
+
+A ``TagDictionary`` gives each tag a bit, in order of first sight, and
+encodes the tags of an event as an integer bitmap. Tags added later get
+higher bits, so bitmaps encoded before stay valid. A ``TagQuery`` then
+tests all, any and none of a set of tags with a few integer operations::
+
+    index = TagIndex()
+    index.extend(events)
+    rows = index.select(all_of=["honeypot", "cve-2021-44228"], none_of=["tor"])
+
+``tag_filter()`` is the streaming counterpart: a ``Filter`` on models or
+raw JSON objects, combinable with the other filters.
+"""
+
+from typing import Any, Iterable, Iterator, Optional, Sequence
+
+from l9format.fields import field_type, path_getter
+from l9format.filter import Filter
+from l9format.l9format import L9Event, Model, _numpy
+
+
+class TagQuery:
+    """A test of a bitmap: every tag of ``all_of``, at least one of
+    ``any_of`` when given, and none of ``none_of``."""
+
+    __slots__ = ("all_of", "any_of", "none_of", "impossible")
+
+    def __init__(
+        self,
+        all_of: int = 0,
+        any_of: int = 0,
+        none_of: int = 0,
+        impossible: bool = False,
+    ) -> None:
+        self.all_of = all_of
+        self.any_of = any_of
+        self.none_of = none_of
+        # Set when a required tag has no bit: no bitmap can match.
+        self.impossible = impossible
+
+    def matches(self, bits: int) -> bool:
+        """Whether the tags encoded in ``bits`` satisfy the query."""
+        if self.impossible:
+            return False
+        return (
+            bits & self.all_of == self.all_of
+            and (not self.any_of or bool(bits & self.any_of))
+            and not bits & self.none_of
+        )
+
+    def matches_array(self, bits: Any) -> Any:
+        """Return the boolean mask of the rows of a NumPy ``uint64`` array
+        of bitmaps (see ``TagIndex.to_numpy()``) satisfying the query."""
+        np = _numpy("matches_array()")
+        masks = [self.all_of, self.any_of, self.none_of]
+        if max(masks).bit_length() > 64:
+            raise ValueError("query uses more than 64 tags")
+        if self.impossible:
+            return np.zeros(len(bits), dtype=bool)
+        all_of, any_of, none_of = (np.uint64(m) for m in masks)
+        result = (bits & none_of) == 0
+        if self.all_of:
+            result &= (bits & all_of) == all_of
+        if self.any_of:
+            result &= (bits & any_of) != 0
+        return result
+
+    def __repr__(self) -> str:
+        return (
+            f"TagQuery(all_of={self.all_of:#x}, any_of={self.any_of:#x}, "
+            f"none_of={self.none_of:#x}, impossible={self.impossible})"
+        )
+
+
+class TagDictionary:
+    """Bit positions of tags, assigned in order of first sight."""
+
+    def __init__(self, tags: Iterable[str] = ()) -> None:
+        self.tags: list[str] = []
+        self._bits: dict[str, int] = {}
+        for tag in tags:
+            self.bit(tag)
+
+    def __len__(self) -> int:
+        return len(self.tags)
+
+    def __contains__(self, tag: object) -> bool:
+        return tag in self._bits
+
+    def bit(self, tag: str) -> int:
+        """Return the bit of ``tag``, assigning the next free one to a new
+        tag."""
+        bit = self._bits.get(tag)
+        if bit is None:
+            bit = self._bits[tag] = 1 << len(self.tags)
+            self.tags.append(tag)
+        return bit
+
+    def encode(self, tags: Optional[Iterable[str]], grow: bool = True) -> int:
+        """Return the bitmap of ``tags``. Unknown tags get a bit, or are
+        left out when ``grow`` is false."""
+        bits = 0
+        if tags is None:
+            return bits
+        if grow:
+            bit = self.bit
+            for tag in tags:
+                bits |= bit(tag)
+        else:
+            get = self._bits.get
+            for tag in tags:
+                bits |= get(tag, 0)
+        return bits
+
+    def decode(self, bits: int) -> list[str]:
+        """Return the tags of a bitmap, in bit order."""
+        tags = self.tags
+        result = []
+        while bits:
+            low = bits & -bits
+            result.append(tags[low.bit_length() - 1])
+            bits ^= low
+        return result
+
+    def query(
+        self,
+        all_of: Iterable[str] = (),
+        any_of: Iterable[str] = (),
+        none_of: Iterable[str] = (),
+    ) -> TagQuery:
+        """Build a query from tag names. Tags without a bit are absent from
+        every bitmap encoded so far."""
+        get = self._bits.get
+        impossible = False
+        all_bits = 0
+        for tag in all_of:
+            bit = get(tag)
+            if bit is None:
+                impossible = True
+            else:
+                all_bits |= bit
+        any_tags = list(any_of)
+        any_bits = self.encode(any_tags, grow=False)
+        if any_tags and not any_bits:
+            impossible = True
+        return TagQuery(
+            all_bits, any_bits, self.encode(none_of, grow=False), impossible
+        )
+
+
+class TagIndex:
+    """Tag bitmaps of a sequence of events, one per row.
+
+    Rows are numbered in the order events are added, so an index built
+    from a batch or a list lines up with it. The dictionary is shared with
+    other indexes when given.
+    """
+
+    def __init__(
+        self, dictionary: Optional[TagDictionary] = None, path: str = "tags"
+    ) -> None:
+        self.dictionary = TagDictionary() if dictionary is None else dictionary
+        self.path = path
+        self.rows: list[int] = []
+        self._get = path_getter(path)
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def add(self, event: object) -> int:
+        """Add the tags of a model, or a raw JSON object, as a new row and
+        return its number."""
+        return self.add_tags(self._get(event))
+
+    def add_tags(self, tags: Optional[Iterable[str]]) -> int:
+        """Add a list of tags as a new row and return its number."""
+        self.rows.append(self.dictionary.encode(tags))
+        return len(self.rows) - 1
+
+    def extend(self, events: Iterable[object]) -> None:
+        """Add the tags of every event as new rows."""
+        get = self._get
+        encode = self.dictionary.encode
+        self.rows.extend(encode(get(event)) for event in events)
+
+    def tags(self, row: int) -> list[str]:
+        """Return the tags of a row."""
+        return self.dictionary.decode(self.rows[row])
+
+    def iter_select(
+        self,
+        all_of: Iterable[str] = (),
+        any_of: Iterable[str] = (),
+        none_of: Iterable[str] = (),
+        query: Optional[TagQuery] = None,
+    ) -> Iterator[int]:
+        """Yield the numbers of the rows with all the tags of ``all_of``,
+        any of ``any_of`` when given, and none of ``none_of``, or matching
+        ``query``."""
+        if query is None:
+            query = self.dictionary.query(all_of, any_of, none_of)
+        if query.impossible:
+            return
+        required, wanted, excluded = query.all_of, query.any_of, query.none_of
+        rows = self.rows
+        if wanted:
+            yield from (
+                i
+                for i, bits in enumerate(rows)
+                if bits & required == required
+                and bits & wanted
+                and not bits & excluded
+            )
+        else:
+            yield from (
+                i
+                for i, bits in enumerate(rows)
+                if bits & required == required and not bits & excluded
+            )
+
+    def select(
+        self,
+        all_of: Iterable[str] = (),
+        any_of: Iterable[str] = (),
+        none_of: Iterable[str] = (),
+        query: Optional[TagQuery] = None,
+    ) -> list[int]:
+        """Return the numbers of the matching rows, see ``iter_select()``."""
+        return list(self.iter_select(all_of, any_of, none_of, query))
+
+    def count(
+        self,
+        all_of: Iterable[str] = (),
+        any_of: Iterable[str] = (),
+        none_of: Iterable[str] = (),
+        query: Optional[TagQuery] = None,
+    ) -> int:
+        """Return the number of matching rows, see ``iter_select()``."""
+        return sum(1 for _ in self.iter_select(all_of, any_of, none_of, query))
+
+    def to_numpy(self) -> Any:
+        """Return the rows as a NumPy ``uint64`` array, for dictionaries of
+        up to 64 tags."""
+        np = _numpy("to_numpy()")
+        if len(self.dictionary) > 64:
+            raise ValueError("more than 64 tags do not fit in uint64 rows")
+        return np.fromiter(self.rows, dtype=np.uint64, count=len(self.rows))
+
+
+class _TagFilter(Filter):
+    def __init__(
+        self,
+        path: str,
+        all_of: Sequence[str],
+        any_of: Sequence[str],
+        none_of: Sequence[str],
+    ) -> None:
+        # Only the tags of the query need a bit: others are left out when
+        # encoding events.
+        self.dictionary = TagDictionary([*all_of, *any_of, *none_of])
+        self.query = self.dictionary.query(all_of, any_of, none_of)
+        self._get = path_getter(path)
+
+    def _test(self, tags: Any) -> bool:
+        if not isinstance(tags, list):
+            tags = None
+        return self.query.matches(self.dictionary.encode(tags, grow=False))
+
+    def matches(self, model: Model) -> bool:
+        return self._test(self._get(model))
+
+    def matches_raw(self, d: dict) -> bool:
+        return self._test(self._get(d))
+
+
+def tag_filter(
+    all_of: Sequence[str] = (),
+    any_of: Sequence[str] = (),
+    none_of: Sequence[str] = (),
+    path: str = "tags",
+    cls: type[Model] = L9Event,
+) -> Filter:
+    """Return a filter matching events with all the tags of ``all_of``,
+    any of ``any_of`` when given, and none of ``none_of``, in the list
+    field at ``path`` of ``cls``."""
+    field_type(cls, path)
+    return _TagFilter(path, all_of, any_of, none_of)
@@ -0,0 +1,49 @@
+"""
+Fixtures shared by the tests: the sample events stored next to them.
+"""
+
+import copy
+import functools
+import json
+from pathlib import Path
+
+import pytest
+
+from l9format import L9Event
+
+TESTS_DIR = Path(__file__).parent
+EVENT_FILE = TESTS_DIR / "l9event.json"
+EVENT_FILES = sorted(TESTS_DIR.glob("l9event*.json"))
+
+
+@functools.cache
+def _parse(path: Path) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+@pytest.fixture
+def raw() -> dict:
+    """The event of ``l9event.json`` as a raw JSON object, which the test
+    may modify."""
+    return copy.deepcopy(_parse(EVENT_FILE))
+
+
+@pytest.fixture
+def event() -> L9Event:
+    """The event of ``l9event.json``, decoded."""
+    return L9Event.from_dict(copy.deepcopy(_parse(EVENT_FILE)))
+
+
+@pytest.fixture
+def raws() -> list[dict]:
+    """Every sample event as a raw JSON object, in file name order."""
+    return [copy.deepcopy(_parse(path)) for path in EVENT_FILES]
+
+
+@pytest.fixture
+def events() -> list[L9Event]:
+    """Every sample event, decoded, in file name order."""
+    return [
+        L9Event.from_dict(copy.deepcopy(_parse(path))) for path in EVENT_FILES
+    ]
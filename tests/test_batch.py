@@ -0,0 +1,77 @@
+"""
+Tests for thread-safe decoding and parallel batch decoding.
+"""
+
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from l9format import L9Event
+from l9format.batch import (
+    decode_batch,
+    decode_batch_parallel,
+    iter_decode_parallel,
+)
+from l9format.filter import field
+from l9format.l9format import _RETAIN_PLANS, _SCHEMAS
+
+
+def test_concurrent_decoding_with_cold_caches(raws: list[dict]) -> None:
+    expected = [L9Event.from_dict(r) for r in raws]
+    encoded = [e.to_dict() for e in expected]
+    _SCHEMAS.clear()
+    _RETAIN_PLANS.clear()
+    barrier = threading.Barrier(8)
+    results: list[list[L9Event]] = []
+    errors: list[BaseException] = []
+
+    def decode() -> None:
+        barrier.wait()
+        try:
+            for _ in range(20):
+                decoded = [L9Event.from_dict(r, retain_raw=True) for r in raws]
+                assert [e.to_dict() for e in decoded] == encoded
+            results.append(decoded)
+        except BaseException as e:  # pragma: no cover - reported below
+            errors.append(e)
+
+    threads = [threading.Thread(target=decode) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not errors
+    assert results == [expected] * 8
+
+
+def test_parallel_decoding_preserves_order(raws: list[dict]) -> None:
+    raws = raws * 50
+    lines = [json.dumps(r) for r in raws]
+    expected = decode_batch(raws)
+    assert decode_batch_parallel(lines, workers=4, chunk_size=7) == expected
+    assert decode_batch_parallel(iter(raws), workers=1) == expected
+    assert decode_batch_parallel([], workers=2) == []
+
+
+def test_parallel_decoding_where(raws: list[dict]) -> None:
+    raws = raws * 10
+    where = field("protocol") == "https"
+    decoded = decode_batch_parallel(raws, where=where, chunk_size=3)
+    assert decoded == decode_batch(raws, where=where)
+    assert decoded and all(e.protocol == "https" for e in decoded)
+
+
+def test_external_executor_is_not_shut_down(raws: list[dict]) -> None:
+    raws = raws * 5
+    with ThreadPoolExecutor(2) as pool:
+        first = list(iter_decode_parallel(raws, executor=pool, chunk_size=4))
+        second = decode_batch_parallel(raws, executor=pool)
+        assert first == second == decode_batch(raws)
+        assert pool.submit(len, raws).result() == len(raws)
+
+
+def test_abandoned_iteration_releases_pool(raws: list[dict]) -> None:
+    raws = raws * 100
+    it = iter_decode_parallel(raws, workers=2, chunk_size=5)
+    assert next(it) == L9Event.from_dict(raws[0])
+    it.close()
@@ -0,0 +1,151 @@
+"""
+Tests for integer IP/port accessors and CIDR longest-prefix matching.
+"""
+
+import io
+import ipaddress
+import random
+from pathlib import Path
+from typing import Any, Optional
+
+import pytest
+
+from l9format import L9Event, Network
+from l9format.cidr import CidrTrie, Prefix, parse_cidr, parse_ip, parse_port
+
+
+def test_parse() -> None:
+    assert parse_ip("10.0.0.1") == (4, 0x0A000001)
+    assert parse_ip("::1") == (6, 1)
+    assert parse_ip("10.0.0.256") is None
+    assert parse_ip("") is None
+    assert parse_port("443") == 443
+    assert parse_port("65536") is None
+    assert parse_port("http") is None
+    assert parse_port("²") is None
+    for text in ("+80", "-0", " 80 ", "8_0", "", "9" * 5000):
+        assert parse_port(text) is None
+    assert parse_cidr("10.1.2.3/8") == Prefix(4, 0x0A000000, 8)
+    assert parse_cidr("2001:db8::/32") == Prefix(6, 0x20010DB8 << 96, 32)
+    assert parse_cidr("nope") is None
+    assert str(Prefix(4, 0x0A000000, 8)) == "10.0.0.0/8"
+    assert "10.9.9.9" in Prefix(4, 0x0A000000, 8)
+    assert "11.0.0.0" not in Prefix(4, 0x0A000000, 8)
+
+
+def test_event_accessors_are_cached(event: L9Event) -> None:
+    event = event.evolve(ip="192.168.1.2", port="8080")
+    assert event.ip_version == 4
+    assert event.ip_int == int(ipaddress.ip_address("192.168.1.2"))
+    assert event.port_int == 8080
+    cached = event.__dict__["_l9_ip"]
+    assert event.ip_int == cached[1][1]
+    assert event.__dict__["_l9_ip"] is cached
+    event.ip = "2001:db8::1"
+    assert event.ip_version == 6
+    assert event.ip_int == int(ipaddress.ip_address("2001:db8::1"))
+    assert event.evolve(ip="x").ip_int is None
+    assert event.evolve(port="").port_int is None
+    assert event == event.evolve()
+    assert "_l9_ip" not in event.to_dict()
+
+
+def test_network_prefix() -> None:
+    network = Network(network="192.0.2.0/24", asn=64496)
+    assert network.prefix == Prefix(4, 0xC0000200, 24)
+    network.network = "198.51.100.0/24"
+    assert network.prefix == Prefix(4, 0xC6336400, 24)
+    assert Network().prefix is None
+
+
+def brute_force(prefixes: dict[Any, Any], ip: str) -> Optional[Any]:
+    address = ipaddress.ip_address(ip)
+    best = None
+    for network, value in prefixes.items():
+        if address in network and (
+            best is None or network.prefixlen > best.prefixlen
+        ):
+            best = network
+    return None if best is None else prefixes[best]
+
+
+def random_trie(seed: int) -> tuple[CidrTrie, dict, list[str]]:
+    rng = random.Random(seed)
+    trie = CidrTrie()
+    prefixes: dict = {}
+    for i in range(400):
+        if rng.random() < 0.8:
+            address = rng.getrandbits(8) << 24 | rng.getrandbits(24)
+            network = ipaddress.ip_network(
+                (address, rng.randint(0, 32)), strict=False
+            )
+        else:
+            address = 0x2001 << 112 | rng.getrandbits(112)
+            network = ipaddress.ip_network(
+                (address, rng.randint(0, 128)), strict=False
+            )
+        prefixes[network] = i
+        trie.insert(str(network), i)
+    ips = [str(n.network_address + rng.randint(0, 3)) for n in prefixes]
+    ips += [str(ipaddress.ip_address(rng.getrandbits(32))) for _ in range(300)]
+    ips += ["2001::1", "::", "0.0.0.0", "255.255.255.255", "bogus"]
+    return trie, prefixes, ips
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_longest_prefix_match(seed: int) -> None:
+    trie, prefixes, ips = random_trie(seed)
+    assert len(trie) == len(prefixes)
+    for ip in ips:
+        if parse_ip(ip) is None:
+            assert trie.lookup(ip) is None
+            continue
+        assert trie.lookup(ip) == brute_force(prefixes, ip), ip
+
+
+def test_match_and_replace() -> None:
+    trie = CidrTrie()
+    trie.insert("10.0.0.0/8", "a")
+    trie.insert("10.1.0.0/16", "b")
+    trie.insert("10.1.0.0/16", "c")
+    assert len(trie) == 2
+    assert trie.match("10.1.2.3") == (Prefix(4, 0x0A010000, 16), "c")
+    assert trie.match("10.2.0.0") == (Prefix(4, 0x0A000000, 8), "a")
+    assert trie.match("11.0.0.0") is None
+    trie.insert("0.0.0.0/0", "default")
+    assert trie.lookup("11.0.0.0") == "default"
+    assert trie.lookup("::1") is None
+    with pytest.raises(ValueError):
+        trie.insert("10.0.0.0/33", "x")
+
+
+def test_networks_save_and_load(tmp_path: Path, event: L9Event) -> None:
+    networks = [
+        Network("Example", 64496, "192.0.2.0/24"),
+        Network("Example more specific", 64497, "192.0.2.128/25"),
+        Network("Documentation v6", 64498, "2001:db8::/32"),
+        Network("No prefix", 0, ""),
+    ]
+    trie = CidrTrie.from_networks(networks)
+    assert len(trie) == 3
+    path = tmp_path / "networks.trie"
+    trie.save(path)
+    loaded = CidrTrie.load(path)
+    assert len(loaded) == 3
+    for ip in ("192.0.2.1", "192.0.2.200", "2001:db8::5", "8.8.8.8"):
+        assert loaded.lookup(ip) == trie.lookup(ip)
+    event = event.evolve(ip="192.0.2.130")
+    assert loaded.lookup_event(event) == networks[1]
+    assert loaded.lookup_event(event.evolve(ip="")) is None
+    loaded.insert("198.51.100.0/24", Network("Added", 64499, ""))
+    assert loaded.lookup("192.0.2.1") == networks[0]
+
+    buffer = io.BytesIO()
+    random_trie(7)[0].save(buffer)
+    buffer.seek(0)
+    plain = CidrTrie.load(buffer, model=None)
+    trie, prefixes, ips = random_trie(7)
+    for ip in ips[:100]:
+        assert plain.lookup(ip) == trie.lookup(ip)
+    with pytest.raises(ValueError):
+        CidrTrie.load(io.BytesIO(b"garbage"))
@@ -0,0 +1,210 @@
+"""
+Tests for the python -m l9format command-line tool.
+"""
+
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from l9format import L9Event
+from l9format.cli import file_format, main
+from l9format.ndjson import read_events
+from l9format.sqlite import EventStore
+
+TESTS_DIR = Path(__file__).parent
+
+
+def write_input(path: Path, raw: dict) -> list[dict]:
+    """Write ten events made from ``raw`` with alternating protocols, a
+    line with a missing field and a malformed line."""
+    records = []
+    for i in range(10):
+        record = dict(raw)
+        record["protocol"] = "redis" if i % 2 else "http"
+        record["port"] = str(i)
+        records.append(record)
+    lines = [json.dumps(r) for r in records]
+    missing = dict(raw)
+    del missing["ip"]
+    lines[3:3] = [json.dumps(missing), "{broken"]
+    path.write_text("\n".join(lines) + "\n")
+    return records
+
+
+def test_file_format() -> None:
+    assert file_format("a.ndjson.gz") == "ndjson"
+    assert file_format("-") == "ndjson"
+    assert file_format("a.json.xz") == "json"
+    assert file_format("a.pickle.bz2") == "pickle"
+    assert file_format("a.db") == "sqlite"
+
+
+def test_validate(
+    tmp_path: Path, capsys: pytest.CaptureFixture[str], raw: dict
+) -> None:
+    path = tmp_path / "events.ndjson"
+    write_input(path, raw)
+    assert main(["validate", "-j1", str(path)]) == 1
+    err = capsys.readouterr().err
+    assert "12 records, 10 kept, 2 failed" in err
+    assert "field ip" in err
+    assert "record 4: field ip: missing required field: ip" in err
+    assert "record 5: JSONDecodeError" in err
+    assert main(["validate", "-j1", str(TESTS_DIR / "l9event.json")]) == 0
+
+
+@pytest.mark.parametrize("workers", ["1", "2"])
+@pytest.mark.parametrize(
+    "name", ["out.ndjson.gz", "out.pickle.xz", "out.sqlite"]
+)
+def test_convert_round_trip(
+    tmp_path: Path, name: str, workers: str, raw: dict
+) -> None:
+    source = tmp_path / "events.ndjson"
+    records = write_input(source, raw)
+    converted = tmp_path / name
+    back = tmp_path / "back.ndjson"
+    assert main(["convert", "-q", "-j", workers, str(source), str(converted)])
+    assert not main(["convert", "-q", "-j", workers, str(converted), str(back)])
+    expected = [L9Event.from_dict(r) for r in records]
+    assert list(read_events(back)) == expected
+    if name.endswith(".sqlite"):
+        with EventStore(converted, indexes=()) as store:
+            assert len(store) == len(records)
+
+
+def test_filter(
+    tmp_path: Path, capsys: pytest.CaptureFixture[str], raw: dict
+) -> None:
+    source = tmp_path / "events.ndjson"
+    write_input(source, raw)
+    assert main(["filter", "-j1", "-q", str(source), "port == '4'"]) == 1
+    out = capsys.readouterr().out.splitlines()
+    assert [json.loads(line)["port"] for line in out] == ["4"]
+    output = tmp_path / "redis.ndjson"
+    main(
+        [
+            "filter",
+            "-j1",
+            "-q",
+            str(source),
+            "protocol == 'redis'",
+            "-o",
+            str(output),
+        ]
+    )
+    assert len(list(read_events(output))) == 5
+
+
+@pytest.mark.parametrize("command", ["filter", "convert", "sort"])
+def test_empty_input_truncates_output(
+    tmp_path: Path, command: str, raw: dict
+) -> None:
+    source = tmp_path / "empty.ndjson"
+    source.write_text("")
+    output = tmp_path / "out.ndjson"
+    output.write_text(json.dumps(raw) + "\n")
+    args = {
+        "filter": [str(source), "protocol == 'x'", "-o", str(output)],
+        "convert": [str(source), str(output)],
+        "sort": [str(source), str(output)],
+    }[command]
+    assert main([command, "-j1", "-q", *args]) == 0
+    assert output.read_text() == ""
+
+
+def test_stats(
+    tmp_path: Path, capsys: pytest.CaptureFixture[str], raw: dict
+) -> None:
+    source = tmp_path / "events.ndjson"
+    write_input(source, raw)
+    main(
+        [
+            "stats",
+            "-j1",
+            "-q",
+            str(source),
+            "--by",
+            "protocol",
+            "-w",
+            "port != '0'",
+        ]
+    )
+    out = capsys.readouterr().out
+    assert "records: 9" in out
+    assert "protocol: 2 distinct" in out
+    assert "         5  redis" in out
+    assert "         4  http" in out
+    main(["stats", "-j1", "-q", str(source), "--distinct", "port"])
+    out = capsys.readouterr().out
+    assert "port: 10 distinct" in out
+    assert "event_type: 1 distinct" in out
+
+
+def test_split(
+    tmp_path: Path, capsys: pytest.CaptureFixture[str], raw: dict
+) -> None:
+    source = tmp_path / "events.ndjson"
+    write_input(source, raw)
+    template = str(tmp_path / "out" / "{partition}.ndjson")
+    main(["split", "-j1", str(source), template, "--by", "protocol"])
+    assert "2 partitions" in capsys.readouterr().err
+    redis = list(read_events(tmp_path / "out" / "redis.ndjson"))
+    assert [e.port for e in redis] == ["1", "3", "5", "7", "9"]
+    hosts = [json.dumps(dict(raw, host=host)) for host in ("a/b", "a_b")]
+    source.write_text("\n".join(hosts) + "\n")
+    assert main(["split", "-j1", str(source), template, "--by", "host"]) == 1
+    assert "both map to 'a_b'" in capsys.readouterr().err
+
+
+def test_sort(
+    tmp_path: Path, capsys: pytest.CaptureFixture[str], raw: dict
+) -> None:
+    source = tmp_path / "events.ndjson"
+    write_input(source, raw)
+    lines = source.read_text().splitlines()
+    del lines[3:5]
+    lines.append(lines[0])
+    source.write_text("\n".join(lines) + "\n")
+    output = tmp_path / "sorted.ndjson.gz"
+    args = ["sort", "-j1", str(source), str(output), "--key", "port"]
+    assert main([*args, "--dedup", "port"]) == 0
+    assert [e.port for e in read_events(output)] == [str(i) for i in range(10)]
+    err = capsys.readouterr().err
+    assert "sort: runs: 11 read, 0 written, 1 runs" in err
+    assert "11 records, 10 kept" in err
+    assert "1 duplicates" in err
+    bad = dict(raw, time="yesterday")
+    source.write_text("\n".join([*lines, json.dumps(bad), "{broken"]) + "\n")
+    assert main(["sort", "-j1", str(source), str(output)]) == 1
+    assert len(list(read_events(output))) == 11
+    err = capsys.readouterr().err
+    assert "13 records, 11 kept, 2 failed" in err
+    assert "2  invalid record" in err
+
+
+def test_usage_errors(capsys: pytest.CaptureFixture[str]) -> None:
+    with pytest.raises(SystemExit) as info:
+        main(["stats", "x.ndjson", "--by", "nope"])
+    assert info.value.code == 2
+    assert "has no field 'nope'" in capsys.readouterr().err
+    with pytest.raises(SystemExit):
+        main(["filter", "x.ndjson", "port =="])
+    assert main(["validate", "-j1", "missing.ndjson"]) == 1
+    assert "No such file" in capsys.readouterr().err
+
+
+def test_module_entry_point(tmp_path: Path, raw: dict) -> None:
+    source = tmp_path / "events.ndjson"
+    write_input(source, raw)
+    result = subprocess.run(
+        [sys.executable, "-m", "l9format", "stats", "-j1", str(source)],
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode == 1
+    assert "records: 10" in result.stdout
+    assert "2 failed" in result.stderr
@@ -0,0 +1,109 @@
+"""
+Tests for the columnar export of event batches.
+"""
+
+import csv
+import io
+import json
+import math
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+from l9format import L9Event
+from l9format.columnar import iter_columns, to_columns, to_numpy, write_csv
+from l9format.fields import get_path
+
+PATHS = [
+    "ip",
+    "port",
+    "time",
+    "http.status",
+    "ssl.enabled",
+    "geoip.location.lat",
+    "network.asn",
+    "tags",
+]
+
+
+def expected(events: list[L9Event], path: str) -> list[object]:
+    values = [get_path(e, path) for e in events]
+    if path == "geoip.location.lat":
+        return [None if v is None else float(v) for v in values]
+    return values
+
+
+def test_columns_match_models(events: list[L9Event]) -> None:
+    events[1] = events[1].evolve(geoip=None, http=None)
+    batch = to_columns(events, PATHS, chunk_size=2)
+    assert len(batch) == len(events)
+    for path in PATHS:
+        assert batch[path].to_list() == expected(events, path), path
+    assert batch["http.status"].values.typecode == "q"
+    assert batch["http.status"].mask == bytearray([0, 1, 0, 0, 0, 0])
+    assert math.isnan(batch["geoip.location.lat"].values[1])
+    assert list(batch.rows())[0][:2] == (events[0].ip, events[0].port)
+
+
+def test_iter_columns_is_chunked(events: list[L9Event]) -> None:
+    events = events * 5
+    batches = list(iter_columns(iter(events), ["ip", "time"], chunk_size=4))
+    assert [len(b) for b in batches] == [4] * 7 + [2]
+    times = [t for b in batches for t in b["time"].to_list()]
+    assert times == [e.time for e in events]
+    assert all(isinstance(t, datetime) for t in times)
+
+
+def test_invalid_paths(events: list[L9Event]) -> None:
+    with pytest.raises(ValueError):
+        to_columns(events, ["http.nope"])
+    with pytest.raises(ValueError):
+        to_columns(events, ["ip", "ip"])
+    with pytest.raises(ValueError):
+        to_columns(events, [])
+
+
+@pytest.mark.parametrize("delimiter", [",", "\t"])
+def test_write_csv(
+    tmp_path: Path, delimiter: str, events: list[L9Event]
+) -> None:
+    path = tmp_path / "events.csv"
+    assert write_csv(events, path, PATHS, delimiter=delimiter) == len(events)
+    with open(path, newline="") as f:
+        rows = list(csv.reader(f, delimiter=delimiter))
+    assert rows[0] == PATHS
+    assert len(rows) == len(events) + 1
+    first = events[0]
+    row = dict(zip(PATHS, rows[1]))
+    assert row["ip"] == first.ip
+    assert row["time"] == first.time.isoformat()
+    assert row["ssl.enabled"] in ("true", "false")
+    assert json.loads(row["tags"] or "null") == first.tags
+    lat = first.geoip.location.lat if first.geoip.location else None
+    assert row["geoip.location.lat"] == ("" if lat is None else f"{lat:f}")
+
+
+def test_write_csv_to_file_object(events: list[L9Event]) -> None:
+    out = io.StringIO()
+    count = write_csv(events, out, ["ip", "ssl"], header=False)
+    lines = out.getvalue().splitlines()
+    assert count == len(lines)
+    assert all(line.split(",", 1)[0] for line in lines)
+    row = next(csv.reader(io.StringIO(lines[0])))
+    assert row[1] == json.dumps(events[0].ssl.to_dict(), separators=(",", ":"))
+
+
+def test_to_numpy(events: list[L9Event]) -> None:
+    np = pytest.importorskip("numpy")
+    events[1] = events[1].evolve(http=None)
+    arr = to_numpy(events, PATHS)
+    assert arr.dtype.names == tuple(PATHS)
+    assert list(arr["port"]) == [e.port for e in events]
+    assert arr["http.status"][1] == 0
+    assert arr["time"][0] == np.datetime64(
+        events[0].time.replace(tzinfo=None), "us"
+    )
+    masked = to_numpy(events, PATHS, masked=True)
+    assert masked.mask["http.status"].tolist()[:2] == [False, True]
+    assert masked.mask["tags"].tolist() == [e.tags is None for e in events]
@@ -0,0 +1,81 @@
+"""
+Tests for the streaming JSON encoder: output must be byte-identical to
+Model.to_json().
+"""
+
+import io
+
+import pytest
+
+from l9format import GeoPoint, L9Aggregation, L9Event, L9HttpEvent
+from l9format.encoder import dump, dumps
+
+
+def make_aggregation(event: dict, count: int) -> L9Aggregation:
+    return L9Aggregation.from_dict(
+        {
+            "summary": "summary",
+            "ip": "127.0.0.1",
+            "resource_id": "res",
+            "open_ports": ["80", "443"],
+            "leak_count": 1,
+            "leak_event_count": count,
+            "events": [event] * count,
+            "plugins": ["DotEnvConfigPlugin"],
+            "geoip": event["geoip"],
+            "network": event["network"],
+            "creation_date": "2024-01-01T00:00:00Z",
+            "update_date": "2024-01-02T00:00:00Z",
+            "fresh": True,
+        }
+    )
+
+
+def test_dumps_matches_to_json(events: list[L9Event]) -> None:
+    for event in events:
+        assert dumps(event) == event.to_json(), event.ip
+
+
+def test_dump_text_sink(event: L9Event) -> None:
+    buf = io.StringIO()
+    event.write_json(buf)
+    assert buf.getvalue() == event.to_json()
+
+
+def test_dump_binary_sink(event: L9Event) -> None:
+    buf = io.BytesIO()
+    dump(event, buf)
+    assert buf.getvalue() == event.to_json().encode("ascii")
+
+
+def test_aggregation_is_flushed_in_chunks(raw: dict) -> None:
+    agg = make_aggregation(raw, 50)
+    writes: list[str] = []
+
+    class Sink(io.StringIO):
+        def write(self, s: str) -> int:
+            writes.append(s)
+            return len(s)
+
+    dump(agg, Sink(), chunk_size=64)
+    assert len(writes) > 1
+    assert "".join(writes) == agg.to_json()
+
+
+def test_non_ascii_and_escapes() -> None:
+    http = L9HttpEvent(
+        title='café "quoted" \\ \n \U0001f600',
+        header={"X-é": "\t", "Server": "nginx"},
+    )
+    assert dumps(http) == http.to_json()
+
+
+def test_geopoint_decimal_formatting() -> None:
+    gp = GeoPoint.from_dict({"lat": "1.5e2", "lon": "-0.000001"})
+    assert dumps(gp) == gp.to_json()
+
+
+def test_unserializable_value_raises() -> None:
+    http = L9HttpEvent(header={"a": object()})  # type: ignore[dict-item]
+    with pytest.raises(TypeError):
+        dumps(http)
@@ -0,0 +1,73 @@
+"""
+Tests for copy-on-write cloning with Model.evolve() and
+Model.with_changes().
+"""
+
+import decimal
+
+import pytest
+
+from l9format import GeoPoint, L9Event
+
+
+def test_evolve_replaces_top_level_field(event: L9Event) -> None:
+    clone = event.evolve(tags=[*event.tags, "honeypot"])
+    assert isinstance(clone, L9Event)
+    assert clone.tags == ["plc", "honeypot"]
+    assert event.tags == ["plc"]
+
+
+def test_evolve_shares_unchanged_nested_models(event: L9Event) -> None:
+    clone = event.evolve(summary="changed")
+    assert clone.http is event.http
+    assert clone.ssl is event.ssl
+    assert clone.geoip is event.geoip
+    assert event.summary == "GET /... qwerqwer"
+
+
+def test_with_changes_copies_along_path_only(event: L9Event) -> None:
+    assert event.ssl.certificate.valid is False
+    clone = event.with_changes(
+        {"ssl.certificate.valid": True, "ssl.version": "TLSv1.2"}
+    )
+    assert clone.ssl.certificate.valid is True
+    assert clone.ssl.version == "TLSv1.2"
+    assert event.ssl.certificate.valid is False
+    assert event.ssl.version == "TLSv1.3"
+    assert clone.ssl is not event.ssl
+    assert clone.ssl.certificate is not event.ssl.certificate
+    assert clone.ssl.certificate.domain is event.ssl.certificate.domain
+    assert clone.http is event.http
+
+
+def test_with_changes_matches_full_rebuild(event: L9Event) -> None:
+    expected = L9Event.from_dict(event.to_dict())
+    expected.geoip.country_iso_code = "BE"
+    clone = event.with_changes({"geoip.country_iso_code": "BE"})
+    assert clone == expected
+    assert clone.to_json() == expected.to_json()
+
+
+def test_unknown_field_raises(event: L9Event) -> None:
+    with pytest.raises(TypeError, match="no field"):
+        event.evolve(nope=1)
+    with pytest.raises(TypeError, match="no field"):
+        event.with_changes({"ssl.nope": 1})
+
+
+def test_path_through_none_raises(event: L9Event) -> None:
+    event = event.evolve(leak=None)
+    with pytest.raises(ValueError, match="not a model"):
+        event.with_changes({"leak.stage": "open"})
+
+
+def test_conflicting_changes_raise(event: L9Event) -> None:
+    with pytest.raises(ValueError, match="conflicting"):
+        event.with_changes({"ssl": None, "ssl.version": "x"})
+
+
+def test_post_init_runs_on_clone() -> None:
+    gp = GeoPoint.from_dict({"lat": "1.5", "lon": "2.5"})
+    clone = gp.evolve(lat="3.25")
+    assert clone.lat == decimal.Decimal("3.25")
+    assert gp.lat == decimal.Decimal("1.5")
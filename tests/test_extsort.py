@@ -0,0 +1,179 @@
+"""
+Tests for the external sort of NDJSON event files.
+"""
+
+import ipaddress
+import json
+import random
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+
+from l9format import ValidationError
+from l9format.extsort import SortProgress, sort_events
+from l9format.ndjson import EventWriter, iter_lines
+
+START = datetime(2021, 12, 19, tzinfo=timezone.utc)
+
+
+def write_input(path: Path, raw: dict, count: int) -> list[dict]:
+    """Write shuffled records made from ``raw``, every fifth one a copy of
+    the previous record observed again a minute later."""
+    rng = random.Random(0)
+    records = []
+    for i in range(count):
+        record = dict(raw)
+        if i % 5 == 4:
+            record = dict(records[-1])
+            record["time"] = (
+                datetime.fromisoformat(record["time"]) + timedelta(minutes=1)
+            ).isoformat()
+        else:
+            record["ip"] = f"10.0.0.{rng.randrange(8)}"
+            record["port"] = str(rng.choice([22, 80, 443]))
+            record["time"] = (
+                START + timedelta(seconds=rng.randrange(100000))
+            ).isoformat()
+            record["event_fingerprint"] = f"fp{i}"
+        records.append(record)
+    rng.shuffle(records)
+    with EventWriter(str(path)) as writer:
+        for record in records:
+            writer.write_line(json.dumps(record))
+    return records
+
+
+def read(path: Path) -> list[dict]:
+    return [json.loads(line) for line in iter_lines(path)]
+
+
+def key(record: dict) -> tuple:
+    ip = ipaddress.ip_address(record["ip"])
+    return ip.version, int(ip), int(record["port"]), record["time"]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_sort_in_runs(tmp_path: Path, workers: int, raw: dict) -> None:
+    source = tmp_path / "in.ndjson.gz"
+    records = write_input(source, raw, 500)
+    output = tmp_path / "out.ndjson.gz"
+    reports: list[SortProgress] = []
+    done = sort_events(
+        source,
+        output,
+        memory=40000,
+        fan_in=2,
+        workers=workers,
+        tmpdir=str(tmp_path),
+        progress=reports.append,
+    )
+    assert read(output) == sorted(records, key=key)
+    assert done.phase == "done"
+    assert done.records == done.written == 500
+    assert done.runs > 2
+    assert [r.phase for r in reports].count("runs") == done.runs
+    assert done.rate > 0
+    # The spilled runs are gone.
+    assert not any(
+        p.name.startswith("l9format-sort-") for p in tmp_path.iterdir()
+    )
+
+
+def test_dedup(tmp_path: Path, raw: dict) -> None:
+    source = tmp_path / "in.ndjson"
+    records = write_input(source, raw, 500)
+    output = tmp_path / "out.ndjson"
+    # A copy observed later has a different time: only a scope covering
+    # ip and port finds it.
+    done = sort_events(
+        source, output, dedup="event_fingerprint", memory=40000, workers=1
+    )
+    assert done.duplicates == 0
+    done = sort_events(
+        source,
+        output,
+        dedup="event_fingerprint",
+        dedup_scope=2,
+        memory=40000,
+        fan_in=3,
+        workers=1,
+    )
+    assert done.duplicates == 100
+    kept = read(output)
+    assert len(kept) == done.written == 400
+    assert len({r["event_fingerprint"] for r in kept}) == 400
+    # The first observation is kept.
+    first = {}
+    for record in sorted(records, key=key):
+        first.setdefault(record["event_fingerprint"], record)
+    assert kept == list(first.values())
+
+
+def test_dedup_function_and_lines(tmp_path: Path) -> None:
+    lines = [
+        json.dumps({"ip": ip, "port": "80", "time": "2021-12-19T00:00:00Z"})
+        for ip in ["b", "a", "b", None]
+    ]
+    output = tmp_path / "out.ndjson"
+    done = sort_events(
+        lines, output, dedup=lambda d: d["ip"], dedup_scope=0, workers=1
+    )
+    assert [r["ip"] for r in read(output)] == [None, "a", "b"]
+    assert done.duplicates == 1
+
+
+def test_ip_and_port_order(tmp_path: Path) -> None:
+    addresses = ["10.0.0.10", "9.0.0.1", "::1", "10.0.0.9", "2001:db8::"]
+    records = [
+        {"ip": ip, "port": port, "time": "2021-12-19T00:00:00Z"}
+        for ip in addresses
+        for port in ["8080", "443", "22", "80"]
+    ]
+    random.Random(0).shuffle(records)
+    output = tmp_path / "out.ndjson"
+    sort_events([json.dumps(r) for r in records], output, workers=1)
+    assert read(output) == sorted(records, key=key)
+    assert [r["ip"] for r in read(output)][::4] == [
+        "9.0.0.1",
+        "10.0.0.9",
+        "10.0.0.10",
+        "::1",
+        "2001:db8::",
+    ]
+    assert [r["port"] for r in read(output)][:4] == ["22", "80", "443", "8080"]
+    # Values that are not addresses or ports sort after those that are.
+    lines = [
+        json.dumps({"ip": ip, "port": port, "time": "2021-12-19T00:00:00Z"})
+        for ip, port in [("host", "80"), ("::1", "x"), ("::1", "7"), (None, 1)]
+    ]
+    sort_events(lines, output, workers=1)
+    assert [(r["ip"], r["port"]) for r in read(output)] == [
+        (None, 1),
+        ("::1", "7"),
+        ("::1", "x"),
+        ("host", "80"),
+    ]
+
+
+def test_errors(tmp_path: Path) -> None:
+    with pytest.raises(ValueError, match="has no field"):
+        sort_events([], tmp_path / "out.ndjson", key=["nope"])
+    with pytest.raises(ValueError, match="dedup_scope"):
+        sort_events([], tmp_path / "out.ndjson", dedup_scope=4)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_skip_invalid(tmp_path: Path, workers: int) -> None:
+    output = tmp_path / "out.ndjson"
+    lines = [
+        json.dumps({"ip": "10.0.0.2", "port": "80", "time": START.isoformat()}),
+        json.dumps({"ip": "10.0.0.1", "port": "80", "time": "yesterday"}),
+        "{broken",
+        json.dumps({"ip": "10.0.0.1", "port": "80", "time": None}),
+    ]
+    with pytest.raises(ValidationError, match="invalid datetime"):
+        sort_events(lines[:2], output, workers=workers)
+    done = sort_events(lines, output, workers=workers, skip_invalid=True)
+    assert (done.records, done.written, done.failed) == (4, 2, 2)
+    assert [r["ip"] for r in read(output)] == ["10.0.0.1", "10.0.0.2"]
@@ -0,0 +1,33 @@
+"""
+Tests for dotted field path helpers.
+"""
+
+from datetime import datetime
+
+import pytest
+
+from l9format import L9Event
+from l9format.fields import field_type, get_path, path_getter
+
+
+def test_get_path_on_model_and_dict(raw: dict) -> None:
+    event = L9Event.from_dict(raw)
+    for path in ("protocol", "ssl.certificate.cn", "geoip.country_iso_code"):
+        assert get_path(event, path) == get_path(raw, path)
+        assert path_getter(path)(event) == get_path(raw, path)
+
+
+def test_get_path_missing_is_none(event: L9Event) -> None:
+    assert get_path(event, "redis.auth_required") is None
+    assert get_path({}, "a.b.c") is None
+
+
+def test_field_type() -> None:
+    assert field_type(L9Event, "time") is datetime
+    assert field_type(L9Event, "redis.auth_required") is bool
+    with pytest.raises(ValueError):
+        field_type(L9Event, "nope")
+    with pytest.raises(ValueError):
+        field_type(L9Event, "ip.nope")
+    with pytest.raises(ValueError):
+        field_type(L9Event, "ssl..cn")
@@ -0,0 +1,118 @@
+"""
+Tests for predicate push-down filters: evaluation on raw dicts must agree
+with evaluation on decoded models.
+"""
+
+import copy
+import json
+from pathlib import Path
+
+import pytest
+
+from l9format import L9Event
+from l9format.batch import decode_batch
+from l9format.filter import Filter, all_of, any_of, field, parse_filter
+from l9format.l9format import Model
+from l9format.ndjson import EventWriter, read_events
+
+
+@pytest.fixture
+def samples(raws: list[dict]) -> list[dict]:
+    """The sample events, then an open and a locked Redis event."""
+    redis = copy.deepcopy(raws[0])
+    redis["protocol"] = "redis"
+    redis["redis"] = {"version": "7.2.0", "auth_required": False}
+    redis["tags"] = ["honeypot", "cve-2022-0543"]
+    locked = copy.deepcopy(redis)
+    locked["redis"]["auth_required"] = True
+    locked["time"] = "2030-01-01T00:00:00Z"
+    return raws + [redis, locked]
+
+
+# Field comparisons build filters, so "== False" is intended here.
+FILTERS: list[Filter] = [
+    field("protocol") == "redis",
+    (field("protocol") == "redis")
+    & (field("redis.auth_required") == False),  # noqa: E712
+    field("redis.auth_required") != True,  # noqa: E712
+    field("port").isin(["8080", "6379"]),
+    field("redis").exists(),
+    ~field("ssh").exists(),
+    field("tags").contains("honeypot"),
+    field("summary").contains("GET"),
+    field("time") >= "2025-01-01T00:00:00Z",
+    field("time").between("2020-01-01T00:00:00Z", "2025-01-01T00:00:00Z"),
+    field("http.status") > 100,
+    field("geoip.location.lat") > 0,
+    field("network.asn") <= 0,
+    any_of(field("protocol") == "https", field("tags").contains("plc")),
+    all_of(field("ip").exists(), ~(field("event_type") == "synack")),
+    parse_filter(
+        "protocol in ['redis', 'https'] and not tags contains 'honeypot'"
+    ),
+    parse_filter("(redis.auth_required == false or ssl exists) and port != 1"),
+    parse_filter('time < "2025-01-01T00:00:00+00:00"'),
+    parse_filter("ssl.certificate.key_size >= 2048"),
+]
+
+
+@pytest.mark.parametrize("where", FILTERS)
+def test_raw_and_model_evaluation_agree(
+    where: Filter, samples: list[dict]
+) -> None:
+    for raw in samples:
+        model = L9Event.from_dict(raw)
+        assert where.matches_raw(raw) == where.matches(model)
+
+
+def test_expected_matches(samples: list[dict]) -> None:
+    redis_open = FILTERS[1]
+    assert [redis_open.matches_raw(r) for r in samples[-2:]] == [True, False]
+    assert sum(map(redis_open.matches_raw, samples)) == 1
+    recent = field("time") >= "2025-01-01T00:00:00Z"
+    assert sum(map(recent.matches_raw, samples)) == 1
+
+
+def test_invalid_paths_and_syntax() -> None:
+    with pytest.raises(ValueError):
+        field("nope")
+    with pytest.raises(ValueError):
+        parse_filter("protocol ===")
+    with pytest.raises(ValueError):
+        parse_filter("protocol == 'redis' and")
+    with pytest.raises(ValueError):
+        parse_filter("protocol like 'x'")
+    with pytest.raises(ValueError):
+        parse_filter("protocol == 'a' )")
+
+
+def test_filters_are_abstract() -> None:
+    with pytest.raises(TypeError):
+        Filter()  # type: ignore[abstract]
+
+    class Partial(Filter):
+        def matches(self, model: Model) -> bool:
+            return True
+
+    with pytest.raises(TypeError):
+        Partial()  # type: ignore[abstract]
+
+
+def test_read_events_where(tmp_path: Path, samples: list[dict]) -> None:
+    events = [L9Event.from_dict(r) for r in samples]
+    path = tmp_path / "events.ndjson.gz"
+    with EventWriter(path) as writer:
+        writer.write_many(events)
+    where = field("protocol") == "redis"
+    decoded = list(read_events(path, where=where))
+    assert decoded == [e for e in events if where.matches(e)]
+    assert len(decoded) == 2
+
+
+def test_decode_batch_where(samples: list[dict]) -> None:
+    where = parse_filter("redis.auth_required == true")
+    lines = [json.dumps(r) for r in samples]
+    decoded = decode_batch(lines, where=where)
+    assert len(decoded) == 1
+    assert decoded[0].redis.auth_required is True
+    assert len(decode_batch(samples)) == len(samples)
@@ -0,0 +1,171 @@
+"""
+Tests for the float GeoPoint representation and bulk geo filters.
+"""
+
+import decimal
+import math
+import pickle
+import random
+import threading
+
+import pytest
+
+from l9format import GeoPoint, L9Event
+from l9format.encoder import dumps
+from l9format.filter import parse_filter
+from l9format.geo import GeoBatch, haversine_km
+
+
+def test_decimal_by_default() -> None:
+    assert GeoPoint(1, 2).lat == decimal.Decimal("1")
+    assert GeoPoint(1.5, 2.0).lon == decimal.Decimal("2.0")
+    point = GeoPoint.from_dict({"lat": 1.5, "lon": 2})
+    assert isinstance(point.lat, decimal.Decimal)
+
+
+def test_float_coordinates_round_trip() -> None:
+    point = GeoPoint.from_dict(
+        {"lat": "48.856613", "lon": 2.352222}, float_coordinates=True
+    )
+    assert point.lat == 48.856613 and isinstance(point.lat, float)
+    assert point.to_dict() == {"lat": "48.856613", "lon": "2.352222"}
+    assert GeoPoint.from_dict(point.to_dict(), float_coordinates=True) == point
+    assert pickle.loads(pickle.dumps(point)).to_dict() == point.to_dict()
+    moved = point.evolve(lat=-0.0000001)
+    assert isinstance(moved.lat, float) and isinstance(moved.lon, float)
+    assert moved.to_dict() == {"lat": "-0.0000001", "lon": "2.352222"}
+    with pytest.raises(ValueError):
+        GeoPoint.from_dict({"lat": "north", "lon": 0}, float_coordinates=True)
+
+
+COORDINATES: list[object] = [
+    52.0,
+    0.0,
+    -0.0,
+    0,
+    -7,
+    "1.50",
+    "52",
+    1e-7,
+    -3.5e-9,
+    "1e-7",
+    48.856613,
+    "-179.999999",
+    180,
+]
+
+
+def test_float_coordinates_output_matches_decimal(raws: list[dict]) -> None:
+    rng = random.Random(0)
+    values = COORDINATES + [rng.uniform(-180, 180) for _ in range(200)]
+    raw = [{"lat": v, "lon": v} for v in values]
+    assert [
+        GeoPoint.from_dict(d, float_coordinates=True).to_dict() for d in raw
+    ] == [GeoPoint.from_dict(d).to_dict() for d in raw]
+    for sample in raws:
+        expected = L9Event.from_dict(sample)
+        event = L9Event.from_dict(sample, float_coordinates=True)
+        assert isinstance(event.geoip.location.lat, float)
+        assert dumps(event) == dumps(expected)
+        assert event.to_json() == expected.to_json()
+        assert event.content_hash() == expected.content_hash()
+
+
+def test_float_coordinates_are_per_call(raw: dict) -> None:
+    errors: list[BaseException] = []
+
+    def decode(float_coordinates: bool) -> None:
+        try:
+            for _ in range(200):
+                event = L9Event.from_dict(
+                    raw, float_coordinates=float_coordinates
+                )
+                lat = event.geoip.location.lat
+                assert isinstance(lat, float) == float_coordinates
+        except BaseException as e:
+            errors.append(e)
+
+    threads = [
+        threading.Thread(target=decode, args=(i % 2 == 0,)) for i in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+
+
+def test_filter_on_float_coordinates(raw: dict) -> None:
+    raw["geoip"]["location"] = {"lat": 48.856613, "lon": "2.3522"}
+    event = L9Event.from_dict(raw, float_coordinates=True)
+    lat = event.geoip.location.lat
+    for expression in (
+        f"geoip.location.lat == {lat}",
+        f"geoip.location.lat > {lat - 1}",
+        "geoip.location.lon < 2.3522",
+        "geoip.location.lon <= 2.3522",
+        "geoip.location.lon in [2.3522, 0]",
+    ):
+        f = parse_filter(expression)
+        assert f.matches(event) == f.matches_raw(raw)
+        assert f.matches(L9Event.from_dict(raw)) == f.matches_raw(raw)
+    assert parse_filter(f"geoip.location.lat == {lat}").matches(event)
+
+
+def random_events(base: L9Event, n: int, seed: int = 0) -> list[L9Event]:
+    rng = random.Random(seed)
+    events = []
+    for i in range(n):
+        if i % 10 == 0:
+            geoip = base.geoip.evolve(location=None)
+        else:
+            location = GeoPoint(rng.uniform(-90, 90), rng.uniform(-180, 180))
+            geoip = base.geoip.evolve(location=location)
+        events.append(base.evolve(geoip=geoip))
+    return events
+
+
+def brute_bbox(
+    events: list[L9Event], south: float, west: float, north: float, east: float
+) -> list[int]:
+    result = []
+    for i, event in enumerate(events):
+        point = event.geoip.location
+        if point is None:
+            continue
+        lat, lon = float(point.lat), float(point.lon)
+        if not south <= lat <= north:
+            continue
+        if west <= east and west <= lon <= east:
+            result.append(i)
+        elif west > east and (lon >= west or lon <= east):
+            result.append(i)
+    return result
+
+
+@pytest.mark.parametrize("vectorize", [False, True])
+def test_geo_batch(vectorize: bool, event: L9Event) -> None:
+    if vectorize:
+        pytest.importorskip("numpy")
+    events = random_events(event, 500)
+    batch = GeoBatch(events, vectorize=vectorize)
+    assert len(batch) == 500
+    for box in [(-10, -20, 40, 60), (20, 170, 70, -170), (-90, -180, 90, 180)]:
+        assert batch.in_bbox(*box) == brute_bbox(events, *box)
+    distances = batch.distances_km(48.8566, 2.3522)
+    assert math.isnan(distances[0])
+    for radius in (0, 1000, 5000, 30000):
+        expected = [i for i, d in enumerate(distances) if d <= radius]
+        assert batch.within(48.8566, 2.3522, radius) == expected
+    within = batch.select(batch.within(0, 0, 3000))
+    assert all(
+        haversine_km(0, 0, e.geoip.location.lat, e.geoip.location.lon) <= 3000
+        for e in within
+    )
+
+
+def test_geo_batch_helpers() -> None:
+    assert haversine_km(0, 0, 0, 0) == 0
+    assert haversine_km(0, 0, 0, 180) == pytest.approx(math.pi * 6371.0088)
+    with pytest.raises(ValueError):
+        GeoBatch([], path="geoip.country_name")
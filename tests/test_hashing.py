@@ -0,0 +1,67 @@
+"""
+Tests for canonical content hashing.
+"""
+
+import json
+
+from l9format import GeoPoint, L9Event, L9HttpEvent
+from l9format.hashing import DEFAULT_EVENT_EXCLUDE, content_hash
+
+
+def test_hash_is_stable_across_versions(event: L9Event) -> None:
+    """The canonical encoding is a public contract: do not update this
+    digest without a major version bump."""
+    assert content_hash(event) == (
+        "1f0d4b5a1180cc519afd2d9befa86581edacef394ee12f61a33e01088e2ab738"
+    )
+
+
+def test_hash_survives_round_trip(event: L9Event) -> None:
+    again = L9Event.from_dict(json.loads(event.to_json()))
+    assert event.content_hash() == again.content_hash()
+
+
+def test_hash_ignores_input_formatting(raw: dict) -> None:
+    a = GeoPoint.from_dict({"lat": "1.50", "lon": 2})
+    b = GeoPoint.from_dict({"lat": 1.5, "lon": "2.000"})
+    assert a.content_hash() == b.content_hash()
+
+    utc = L9Event.from_dict(dict(raw, time="2024-01-01T12:00:00Z"))
+    paris = L9Event.from_dict(dict(raw, time="2024-01-01T13:00:00+01:00"))
+    assert utc.content_hash() == paris.content_hash()
+
+
+def test_header_order_does_not_matter() -> None:
+    a = L9HttpEvent(header={"A": "1", "B": "2"})
+    b = L9HttpEvent(header={"B": "2", "A": "1"})
+    assert a.content_hash() == b.content_hash()
+
+
+def test_content_changes_the_hash(event: L9Event) -> None:
+    assert (
+        event.content_hash()
+        != event.evolve(port="8081").content_hash()
+        != event.with_changes({"ssl.certificate.cn": "x"}).content_hash()
+    )
+
+
+def test_exclude_fields(raw: dict) -> None:
+    a = L9Event.from_dict(raw)
+    b = a.evolve(
+        time=L9Event.from_dict(dict(raw, time="2030-01-01T00:00:00Z")).time,
+        event_pipeline=["other"],
+    )
+    assert a.content_hash() != b.content_hash()
+    assert a.content_hash(DEFAULT_EVENT_EXCLUDE) == b.content_hash(
+        DEFAULT_EVENT_EXCLUDE
+    )
+    c = a.with_changes({"ssl.certificate.valid": True})
+    assert a.content_hash(["ssl.certificate.valid"]) == c.content_hash(
+        ["ssl.certificate.valid"]
+    )
+    assert a.content_hash(["ssl"]) == c.content_hash(["ssl"])
+
+
+def test_algorithm(event: L9Event) -> None:
+    assert len(event.content_hash(algorithm="md5")) == 32
+    assert len(event.content_hash(algorithm="blake2b")) == 128
@@ -0,0 +1,140 @@
+"""
+Tests for the compact HTTP header container.
+"""
+
+import copy
+import json
+import pickle
+
+import pytest
+
+from l9format import HeaderMap, L9Event, L9HttpEvent, ValidationError
+from l9format.encoder import dumps
+from l9format.fields import get_path
+from l9format.filter import parse_filter
+
+
+def test_case_insensitive_lookup() -> None:
+    headers = HeaderMap({"Content-Type": "text/html", "content-type": "x"})
+    assert headers["CONTENT-TYPE"] == "text/html"
+    assert headers["content-type"] == "x"
+    assert "Content-type" in headers
+    assert 1 not in headers  # type: ignore[comparison-overlap]
+    assert headers.get("Server") is None
+    with pytest.raises(KeyError):
+        headers["Server"]
+    assert list(headers) == ["Content-Type", "content-type"]
+    assert len(headers) == 2
+
+
+def test_mutation() -> None:
+    headers = HeaderMap([("Server", "nginx"), ("Date", "today")])
+    headers["server"] = "apache"
+    headers["X-New"] = "1"
+    assert headers.to_dict() == {
+        "Server": "apache",
+        "Date": "today",
+        "X-New": "1",
+    }
+    del headers["DATE"]
+    assert list(headers.items()) == [("Server", "apache"), ("X-New", "1")]
+    assert list(headers.values()) == ["apache", "1"]
+    with pytest.raises(KeyError):
+        del headers["Date"]
+    assert headers.pop("x-new") == "1"
+    assert headers == {"Server": "apache"}
+    assert {"Server": "apache"} == headers
+    assert headers != {"server": "apache"}
+    assert headers == HeaderMap.lazy({"Server": "apache"})
+
+
+def test_layouts_are_shared() -> None:
+    a = HeaderMap({"Server": "nginx", "Content-Length": "1"})
+    b = HeaderMap(json.loads('{"Server": "apache", "Content-Length": "2"}'))
+    assert a._layout is b._layout
+    assert a.copy()._layout is a._layout
+    assert HeaderMap()._layout is HeaderMap({})._layout
+
+
+def test_model_header_is_a_dict(raw: dict) -> None:
+    event = L9Event.from_dict(raw)
+    header = event.http.header
+    assert type(header) is dict
+    assert header == raw["http"]["header"]
+    assert json.loads(json.dumps(header)) == header
+    assert json.loads(json.dumps(event.to_dict())) == json.loads(dumps(event))
+    assert header | {"X-New": "1"} == {**raw["http"]["header"], "X-New": "1"}
+    assert L9HttpEvent(header={"A": "1"}).header == {"A": "1"}
+    assert type(L9HttpEvent(header={"A": "1"}).header) is dict
+
+
+def test_compact_round_trip(raw: dict) -> None:
+    raw["http"]["header"] = {"X-é": "\t", "server": "nginx", "SERVER": "x"}
+    event = L9Event.from_dict(raw, compact_headers=True)
+    assert isinstance(event.http.header, HeaderMap)
+    assert event.http.header["Server"] == "nginx"
+    assert event.to_dict()["http"]["header"] == raw["http"]["header"]
+    assert list(event.to_dict()["http"]["header"]) == [
+        "X-é",
+        "server",
+        "SERVER",
+    ]
+    assert json.loads(json.dumps(event.to_dict())) == json.loads(dumps(event))
+    assert dumps(event) == event.to_json()
+    assert L9Event.from_json(event.to_json()) == event
+    assert L9Event.from_json(event.to_json(), compact_headers=True) == event
+    assert event.content_hash() == L9Event.from_dict(raw).content_hash()
+
+
+def test_compact_header_errors(raw: dict) -> None:
+    raw["http"]["header"] = ["Server: nginx"]
+    with pytest.raises(ValidationError) as info:
+        L9Event.from_dict(raw, compact_headers=True)
+    assert info.value.field == "http.header"
+    raw["http"]["header"] = None
+    assert L9Event.from_dict(raw, compact_headers=True).http.header is None
+
+
+def test_lazy_when_retained(raw: dict) -> None:
+    event = L9Event.from_dict(raw, retain_raw=True, compact_headers=True)
+    header = event.http.header
+    assert isinstance(header, HeaderMap)
+    assert header._raw is raw["http"]["header"]
+    assert event.to_dict()["http"]["header"] is raw["http"]["header"]
+    assert event.http.to_dict() is event.http.to_dict()
+    assert header["server"] == "Apache"
+    assert header._raw is None
+    header["X-New"] = "1"
+    assert event.to_dict()["http"]["header"] == {
+        **raw["http"]["header"],
+        "X-New": "1",
+    }
+
+
+def test_copy_and_pickle(raw: dict) -> None:
+    event = L9Event.from_dict(raw, retain_raw=True, compact_headers=True)
+    for other in (
+        pickle.loads(pickle.dumps(event.http.header)),
+        copy.copy(event.http.header),
+        copy.deepcopy(event.http.header),
+    ):
+        assert isinstance(other, HeaderMap)
+        assert other == event.http.header
+    assert pickle.loads(pickle.dumps(event)) == event
+
+
+def test_paths_and_filters(raw: dict) -> None:
+    event = L9Event.from_dict(raw)
+    compact = L9Event.from_dict(raw, compact_headers=True)
+    assert get_path(event, "http.header.Server") == "Apache"
+    assert get_path(compact, "http.header.server") == "Apache"
+    assert get_path(raw, "http.header.Server") == "Apache"
+    for expression, expected in (
+        ("http.header contains 'server'", True),
+        ("http.header contains 'X-Powered-By'", False),
+        ("http.header exists", True),
+    ):
+        f = parse_filter(expression)
+        assert f.matches(event) is expected
+        assert f.matches(compact) is expected
+        assert f.matches_raw(raw) is expected
@@ -0,0 +1,106 @@
+"""
+Tests for incremental parsing of JSON arrays.
+"""
+
+import gzip
+import io
+import json
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from l9format import L9Aggregation, L9Event
+from l9format.filter import field
+from l9format.jsonstream import iter_items, iter_models
+
+DOCUMENT: dict[str, Any] = {
+    "skipped": [{"s": 'q\\"]}'}, [[], {}], -1.5e3, None],
+    "nested": {"x": {"y": [1, "two", {"three": [3]}]}},
+    "items": [{"k": 'é\t\\u00e9 "]'}, [1, 2], "s", 3.5, None, True, {}],
+    "after": "ignored",
+}
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 64, 1 << 16])
+def test_chunk_boundaries(chunk_size: int) -> None:
+    text = json.dumps(DOCUMENT, ensure_ascii=False, indent=1)
+    for source in (io.BytesIO(text.encode()), io.StringIO(text)):
+        items = list(iter_items(source, "items", chunk_size))
+        assert items == DOCUMENT["items"]
+    assert list(iter_items(text, "nested.x.y", chunk_size)) == [
+        1,
+        "two",
+        {"three": [3]},
+    ]
+
+
+def test_large_element_in_small_chunks() -> None:
+    element = {"data": ["x" * 10] * 20000}
+    text = json.dumps({"items": [element, 1]})
+    chunks = (text[i : i + 16] for i in range(0, len(text), 16))
+    assert list(iter_items(chunks, "items")) == [element, 1]
+
+
+def test_sources_and_missing_arrays() -> None:
+    text = json.dumps(DOCUMENT["items"])
+    expected = DOCUMENT["items"]
+    assert list(iter_items(text)) == expected
+    assert list(iter_items(text.encode())) == expected
+    assert list(iter_items(b"\xef\xbb\xbf" + text.encode())) == expected
+    encoded = text.encode()
+    chunks = [encoded[i : i + 5] for i in range(0, len(encoded), 5)]
+    assert list(iter_items(iter(chunks))) == expected
+    assert list(iter_items(" [ ] ")) == []
+    assert list(iter_items('{"items": null}', "items")) == []
+    assert list(iter_items("{}", "items")) == []
+    assert list(iter_items('{"a": 1}', "items")) == []
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "",
+        "{",
+        '{"items": [1, 2',
+        '{"items": [1 2]}',
+        '["unterminated]',
+        "[tru]",
+    ],
+)
+def test_malformed_input(text: str) -> None:
+    with pytest.raises(ValueError):
+        list(iter_items(text, "items" if text.startswith("{") else ""))
+
+
+def test_aggregation_events(tmp_path: Path, raw: dict) -> None:
+    events = []
+    for i in range(20):
+        item = dict(raw, port=str(i), protocol="https" if i % 2 else "http")
+        events.append(item)
+    aggregation = {
+        "ip": "127.0.0.1",
+        "resource_id": "r",
+        "open_ports": ["80"],
+        "leak_count": 0,
+        "leak_event_count": 20,
+        "events": events,
+        "plugins": [],
+        "geoip": raw["geoip"],
+        "network": raw["network"],
+        "creation_date": raw["time"],
+        "update_date": raw["time"],
+        "fresh": False,
+    }
+    expected = L9Aggregation.from_dict(aggregation).events
+    path = tmp_path / "aggregation.json.gz"
+    with gzip.open(path, "wt") as f:
+        json.dump(aggregation, f)
+    assert list(iter_models(path, path="events", chunk_size=100)) == expected
+    https = list(
+        iter_models(path, path="events", where=field("protocol") == "https")
+    )
+    assert https == [e for e in expected if e.protocol == "https"]
+    retained = next(iter_models(json.dumps(events), retain_raw=True))
+    assert isinstance(retained, L9Event)
+    assert retained.to_json() == expected[0].to_json()
@@ -0,0 +1,153 @@
+"""
+Tests for lazily decoded aggregation events.
+"""
+
+import copy
+import json
+import pickle
+import threading
+from typing import Any, Callable
+
+import pytest
+
+from l9format import L9Aggregation, L9Event, LazyList, ValidationError
+from l9format.encoder import dumps
+
+# Builds a raw aggregation of a number of events.
+AggregationRaw = Callable[[int], dict[str, Any]]
+
+
+@pytest.fixture
+def aggregation_raw(raw: dict) -> AggregationRaw:
+    """Return a function building a raw aggregation of ``count`` copies of
+    the sample event, each on its own port."""
+
+    def build(count: int) -> dict[str, Any]:
+        events = []
+        for i in range(count):
+            item = copy.deepcopy(raw)
+            item["port"] = str(i)
+            events.append(item)
+        return {
+            "ip": "127.0.0.1",
+            "resource_id": "r",
+            "open_ports": ["80"],
+            "leak_count": 1,
+            "leak_event_count": count,
+            "events": events,
+            "plugins": [],
+            "geoip": raw["geoip"],
+            "network": raw["network"],
+            "creation_date": raw["time"],
+            "update_date": raw["time"],
+            "fresh": False,
+        }
+
+    return build
+
+
+def lazy(raw: dict[str, Any], retain_raw: bool = False) -> L9Aggregation:
+    return L9Aggregation.from_dict(  # type: ignore[return-value]
+        raw, retain_raw=retain_raw, lazy_events=True
+    )
+
+
+def eager(raw: dict[str, Any]) -> L9Aggregation:
+    return L9Aggregation.from_dict(raw)  # type: ignore[return-value]
+
+
+def test_access_decodes_and_caches(
+    aggregation_raw: AggregationRaw,
+) -> None:
+    agg = lazy(aggregation_raw(50))
+    events = agg.events
+    assert isinstance(events, LazyList)
+    assert len(events) == 50 and events.decoded == 0
+    assert agg.leak_event_count == 50
+    assert events[3].port == "3"
+    assert events[3] is events[3]
+    assert events[-1].port == "49"
+    assert [e.port for e in events[10:13]] == ["10", "11", "12"]
+    assert events.decoded == 5
+    with pytest.raises(IndexError):
+        events[50]
+    assert [e.port for e in events][:2] == ["0", "1"]
+    assert events.decoded == 50
+
+
+@pytest.mark.parametrize("retain_raw", [False, True])
+def test_output_matches_eager(
+    retain_raw: bool, aggregation_raw: AggregationRaw
+) -> None:
+    raw = aggregation_raw(20)
+    expected = eager(copy.deepcopy(raw))
+    agg = lazy(raw, retain_raw)
+    assert agg.to_json() == expected.to_json()
+    assert dumps(agg) == expected.to_json()
+    assert agg.content_hash() == expected.content_hash()
+    assert agg.events.decoded == 0  # type: ignore[attr-defined]
+    assert agg == expected
+    assert pickle.loads(pickle.dumps(agg)) == expected
+
+
+def test_mutation(aggregation_raw: AggregationRaw) -> None:
+    raw = aggregation_raw(5)
+    expected = eager(copy.deepcopy(raw))
+    agg = lazy(raw, retain_raw=True)
+    for a in (agg, expected):
+        a.events[1].port = "x"
+        a.events.append(a.events[0])
+        del a.events[2]
+        a.events[0:1] = [a.events[3]]
+    assert agg.to_json() == expected.to_json()
+    assert [e.port for e in agg.events] == ["4", "x", "3", "4", "0"]
+
+
+def test_errors_are_raised_on_access(
+    aggregation_raw: AggregationRaw,
+) -> None:
+    raw = aggregation_raw(3)
+    raw["events"][1] = {"ip": "no other fields"}
+    agg = lazy(raw)
+    assert agg.events[0].port == "0"
+    with pytest.raises(ValidationError):
+        agg.events[1]
+    raw["events"] = "not a list"
+    with pytest.raises(ValidationError):
+        lazy(raw)
+
+
+def test_eager_by_default(
+    aggregation_raw: AggregationRaw,
+) -> None:
+    agg = L9Aggregation.from_dict(aggregation_raw(2))
+    assert type(agg.events) is list
+    assert isinstance(agg.events[0], L9Event)
+    text = json.dumps(aggregation_raw(2))
+    assert type(L9Aggregation.from_json(text).events) is list
+    events = L9Aggregation.from_json(text, lazy_events=True).events
+    assert isinstance(events, LazyList)
+
+
+def test_lazy_events_are_per_call(
+    aggregation_raw: AggregationRaw,
+) -> None:
+    raw = aggregation_raw(3)
+    errors: list[BaseException] = []
+
+    def decode(lazy_events: bool) -> None:
+        try:
+            for _ in range(100):
+                agg = L9Aggregation.from_dict(raw, lazy_events=lazy_events)
+                assert isinstance(agg.events, LazyList) == lazy_events
+        except BaseException as e:
+            errors.append(e)
+
+    threads = [
+        threading.Thread(target=decode, args=(i % 2 == 0,)) for i in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
@@ -0,0 +1,89 @@
+"""
+Tests for the deep memory accounting of models.
+"""
+
+import sys
+from decimal import Decimal
+
+import pytest
+
+from l9format import GeoPoint, HeaderMap, L9Aggregation, L9Event
+from l9format.memory import batch_footprint, memory_footprint
+
+
+def test_breakdown_adds_up(event: L9Event) -> None:
+    fp = memory_footprint(event)
+    assert fp.total == fp.own + sum(fp.fields.values())
+    assert fp.own == sys.getsizeof(event) + sys.getsizeof(event.__dict__)
+    assert fp.total > 4 * sys.getsizeof(event)
+    geoip = fp.models["geoip"]
+    assert fp.fields["geoip"] == geoip.total
+    assert geoip.total == geoip.own + sum(geoip.fields.values())
+    flat = fp.flat()
+    assert flat["geoip.location"] == geoip.fields["location"]
+    assert flat["geoip.location.lat"] > 0
+    assert "ip" in flat and "http.header" in flat
+
+
+def test_leaf_values_are_counted(event: L9Event) -> None:
+    point = GeoPoint(lat=Decimal("48.856613"), lon=Decimal("2.3522"))
+    fp = memory_footprint(point)
+    assert fp.fields["lat"] == sys.getsizeof(point.lat)
+    assert memory_footprint(event).fields["time"] == sys.getsizeof(event.time)
+
+
+def test_header_map_is_counted(event: L9Event) -> None:
+    assert event.http is not None
+    event.http.header = HeaderMap({"Server": "x" * 1000})
+    size = memory_footprint(event).flat()["http.header"]
+    assert size > 1000 + sys.getsizeof(event.http.header)
+
+
+def test_shared_objects_are_counted_once(event: L9Event) -> None:
+    text = "x" * 10000
+    event.summary = text
+    event.host = text
+    fp = memory_footprint(event)
+    # The string is attributed to the first of the two fields.
+    sizes = sorted([fp.fields["summary"], fp.fields["host"]])
+    assert sizes == [0, sys.getsizeof(text)]
+
+
+def test_list_of_models_is_merged(raw: dict) -> None:
+    event = L9Event.from_dict(raw)
+    aggregation = L9Aggregation.from_dict(
+        {
+            "ip": "127.0.0.1",
+            "resource_id": "r",
+            "open_ports": ["80"],
+            "leak_count": 1,
+            "leak_event_count": 2,
+            "events": [raw, raw],
+            "plugins": [],
+            "geoip": raw["geoip"],
+            "network": raw["network"],
+            "creation_date": raw["time"],
+            "update_date": raw["time"],
+            "fresh": False,
+        }
+    )
+    fp = memory_footprint(aggregation)
+    events = fp.models["events"]
+    assert fp.fields["events"] > events.total
+    assert events.own == 2 * memory_footprint(event).own
+
+
+def test_batch_footprint(raw: dict) -> None:
+    events = [L9Event.from_dict(raw) for _ in range(20)]
+    full = batch_footprint(events)
+    assert full.records == full.measured == 20
+    assert full.total == full.models.total
+    # Objects shared between events are counted once.
+    assert full.total < sum(memory_footprint(e).total for e in events)
+    sampled = batch_footprint(iter(events), sample=5, seed=0)
+    assert sampled.records == 20
+    assert sampled.measured == 5
+    assert sampled.total == round(sampled.per_model * 20)
+    assert batch_footprint([], sample=5).total == 0
+    with pytest.raises(ValueError):
+        batch_footprint(events, sample=0)
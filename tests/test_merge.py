@@ -0,0 +1,110 @@
+"""
+Tests for the time-ordered merge of event streams.
+"""
+
+import json
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable
+
+import pytest
+
+from l9format import L9Event, ValidationError
+from l9format.merge import merge_events
+from l9format.ndjson import EventWriter
+
+START = datetime(2021, 12, 19, tzinfo=timezone.utc)
+
+# Builds raw records from their minutes after START and their ip.
+Records = Callable[[list[int], str], list[dict]]
+
+
+@pytest.fixture
+def records(raw: dict) -> Records:
+    """Return a function building copies of the sample event from ``ip``,
+    observed the given ``minutes`` after ``START``."""
+
+    def build(minutes: list[int], ip: str) -> list[dict]:
+        result = []
+        for minute in minutes:
+            record = dict(raw)
+            record["time"] = (START + timedelta(minutes=minute)).isoformat()
+            record["ip"] = ip
+            result.append(record)
+        return result
+
+    return build
+
+
+def test_merge_files_and_iterators(tmp_path: Path, records: Records) -> None:
+    first = records([0, 2, 4, 6], "10.0.0.1")
+    second = records([1, 2, 3], "10.0.0.2")
+    third = [L9Event.from_dict(r) for r in records([5], "10.0.0.3")]
+    path = tmp_path / "first.ndjson.gz"
+    with EventWriter(str(path)) as writer:
+        writer.write_many(L9Event.from_dict(r) for r in first)
+    lines = [json.dumps(r) for r in second]
+    merged = list(merge_events([path, lines, third]))
+    assert all(isinstance(e, L9Event) for e in merged)
+    assert [(e.time - START).seconds // 60 for e in merged] == [
+        0,
+        1,
+        2,
+        2,
+        3,
+        4,
+        5,
+        6,
+    ]
+    # Ties follow the order of the sources.
+    assert [e.ip for e in merged[2:4]] == ["10.0.0.1", "10.0.0.2"]
+    assert merged[6] is third[0]
+
+
+def test_tie_break_and_raw_output(
+    records: Records,
+) -> None:
+    first = records([0, 1], "10.0.0.9")
+    second = records([0, 1], "10.0.0.1")
+    second[1]["ip"] = None
+    merged = list(merge_events([first, second], tie_break=["ip"], decode=False))
+    assert [r["ip"] for r in merged] == [
+        "10.0.0.1",
+        "10.0.0.9",
+        None,
+        "10.0.0.9",
+    ]
+    assert merged[0] is second[0]
+    first = records([0], "10.0.0.10")
+    second = records([0], "10.0.0.9")
+    merged = list(merge_events([first, second], tie_break=["ip"], decode=False))
+    assert [r["ip"] for r in merged] == ["10.0.0.9", "10.0.0.10"]
+
+
+def test_mixed_time_zones(raw: dict) -> None:
+    paris = dict(raw, time="2021-12-19T01:30:00+01:00")
+    naive = dict(raw, time="2021-12-19T00:45:00")
+    zulu = dict(raw, time="2021-12-19T00:40:00Z")
+    merged = list(merge_events([[paris], [naive], [zulu]]))
+    assert [e.time.isoformat() for e in merged] == [
+        "2021-12-19T01:30:00+01:00",
+        "2021-12-19T00:40:00+00:00",
+        "2021-12-19T00:45:00",
+    ]
+    # Records without a time come first.
+    untimed = dict(raw)
+    del untimed["time"]
+    merged = list(merge_events([[zulu], [untimed]], decode=False))
+    assert merged == [untimed, zulu]
+
+
+def test_errors(records: Records) -> None:
+    backwards = records([3, 1], "10.0.0.1")
+    with pytest.raises(ValueError, match="source 1 is not in time order"):
+        list(merge_events([records([0], "a"), backwards]))
+    invalid = records([0], "10.0.0.1")
+    invalid[0]["time"] = "yesterday"
+    with pytest.raises(ValidationError) as info:
+        list(merge_events([invalid]))
+    assert info.value.field == "time"
+    assert list(merge_events([[], []])) == []
@@ -0,0 +1,125 @@
+"""
+Tests for the decoding and encoding metrics.
+"""
+
+import io
+import re
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+
+from l9format import L9Event, ValidationError, metrics
+from l9format.encoder import dump, dumps
+from l9format.ndjson import EventWriter, read_events
+
+
+@pytest.fixture
+def registry() -> Iterator[metrics.MetricsRegistry]:
+    yield metrics.enable()
+    metrics.disable()
+
+
+def samples(text: str) -> dict[str, float]:
+    """Parse the samples of a text exposition, keyed by name and labels."""
+    values = {}
+    for line in text.splitlines():
+        if line and not line.startswith("#"):
+            key, _, value = line.rpartition(" ")
+            values[key] = float(value)
+    return values
+
+
+def test_disabled_by_default(raw: dict) -> None:
+    assert metrics.active is None
+    L9Event.from_dict(raw)
+
+
+def test_decode_and_encode_counts(
+    registry: metrics.MetricsRegistry, raw: dict
+) -> None:
+    event = L9Event.from_dict(raw)
+    text = event.to_json()
+    L9Event.from_json(text)
+    event.to_dict()
+    values = samples(registry.render())
+    decode = 'operation="decode",model="L9Event"'
+    encode = 'operation="encode",model="L9Event"'
+    # Nested models are part of the top-level call.
+    assert values[f"l9format_models_total{{{decode}}}"] == 2
+    assert values[f"l9format_models_total{{{encode}}}"] == 2
+    assert not any("GeoPoint" in key for key in values)
+    assert values[f"l9format_json_bytes_total{{{decode}}}"] == len(text)
+    assert values[f"l9format_json_bytes_total{{{encode}}}"] == len(text)
+    assert (
+        values[f'l9format_duration_seconds_bucket{{{decode},le="+Inf"}}'] == 2
+    )
+    assert values[f"l9format_duration_seconds_count{{{decode}}}"] == 2
+    assert values[f"l9format_duration_seconds_sum{{{decode}}}"] > 0
+
+
+def test_histogram_is_cumulative(registry: metrics.MetricsRegistry) -> None:
+    registry.record("decode", "L9Event", 0.00002)
+    registry.record("decode", "L9Event", 0.3)
+    text = registry.render()
+    assert "# TYPE l9format_duration_seconds histogram" in text
+    counts = [
+        int(m)
+        for m in re.findall(
+            r"l9format_duration_seconds_bucket\{.*\} (\d+)", text
+        )
+    ]
+    assert counts == sorted(counts)
+    assert counts[0] == 0 and counts[1] == 1 and counts[-2:] == [2, 2]
+    registry.reset()
+    assert "l9format_duration_seconds_bucket" not in registry.render()
+
+
+def test_validation_errors_by_field(
+    registry: metrics.MetricsRegistry, raw: dict
+) -> None:
+    missing = dict(raw)
+    del missing["ip"]
+    with pytest.raises(ValidationError) as info:
+        L9Event.from_dict(missing)
+    assert info.value.field == "ip"
+    raw["geoip"]["location"] = "paris"
+    with pytest.raises(ValidationError) as info:
+        L9Event.from_dict(raw)
+    assert info.value.field == "geoip.location"
+    values = samples(registry.render())
+    failures = 'l9format_failures_total{operation="decode",model="L9Event"}'
+    assert values[failures] == 2
+    errors = "l9format_validation_errors_total"
+    assert values[f'{errors}{{model="L9Event",field="ip"}}'] == 1
+    assert values[f'{errors}{{model="L9Event",field="geoip.location"}}'] == 1
+    decode = 'operation="decode",model="L9Event"'
+    assert f"l9format_models_total{{{decode}}}" not in values
+
+
+def test_streaming(
+    registry: metrics.MetricsRegistry, tmp_path: Path, event: L9Event
+) -> None:
+    buffer = io.StringIO()
+    dump(event, buffer)
+    path = tmp_path / "events.ndjson"
+    with EventWriter(str(path)) as writer:
+        writer.write_many([event, event])
+    assert len(list(read_events(path))) == 2
+    values = samples(registry.render())
+    encode = 'operation="encode",model="L9Event"'
+    decode = 'operation="decode",model="L9Event"'
+    assert values[f"l9format_models_total{{{encode}}}"] == 3
+    assert values[f"l9format_json_bytes_total{{{encode}}}"] == 2 * len(
+        dumps(event)
+    )
+    # The event decoded above, and the two read back.
+    assert values[f"l9format_models_total{{{decode}}}"] == 3
+    assert values[f"l9format_json_bytes_total{{{decode}}}"] == 2 * (
+        len(dumps(event)) + 1
+    )
+
+
+def test_label_escaping(registry: metrics.MetricsRegistry) -> None:
+    registry.record("decode", 'a"b\\c\nd', 0.001)
+    assert 'model="a\\"b\\\\c\\nd"' in registry.render()
@@ -0,0 +1,250 @@
+"""
+Tests for the buffered, compressed NDJSON writer and the transparent
+reader.
+"""
+
+import json
+import os
+import signal
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+
+from l9format import L9Event
+from l9format.ndjson import (
+    CODECS,
+    EventWriter,
+    PartitionedWriter,
+    detect_codec,
+    iter_lines,
+    read_events,
+)
+
+
+@pytest.mark.parametrize("codec", sorted(CODECS))
+def test_round_trip(tmp_path: Path, codec: str, events: list[L9Event]) -> None:
+    path = tmp_path / ("events.ndjson" + CODECS[codec].extension)
+    with EventWriter(path, buffer_size=128) as writer:
+        writer.write_many(events)
+    assert detect_codec(path).name == codec
+    assert list(read_events(path)) == events
+    lines = list(iter_lines(path))
+    assert lines == [e.to_json() + "\n" for e in events]
+
+
+def test_compression_level(tmp_path: Path, events: list[L9Event]) -> None:
+    events = events * 20
+    fast = tmp_path / "fast.ndjson.gz"
+    best = tmp_path / "best.ndjson.gz"
+    with EventWriter(fast, level=1) as writer:
+        writer.write_many(events)
+    with EventWriter(best, level=9) as writer:
+        writer.write_many(events)
+    assert best.stat().st_size <= fast.stat().st_size
+    assert list(read_events(best)) == events
+
+
+def test_rotation_by_event_count(tmp_path: Path, events: list[L9Event]) -> None:
+    template = str(tmp_path / "events-{index:03d}.ndjson.gz")
+    with EventWriter(template, max_events=2) as writer:
+        writer.write_many(events)
+    assert len(writer.paths) == 3
+    assert writer.paths[0].endswith("events-000.ndjson.gz")
+    decoded = [e for p in writer.paths for e in read_events(p)]
+    assert decoded == events
+    assert [len(list(read_events(p))) for p in writer.paths] == [2, 2, 2]
+
+
+def test_rotation_by_size(tmp_path: Path, events: list[L9Event]) -> None:
+    template = str(tmp_path / "events-{index}.ndjson")
+    with EventWriter(template, max_bytes=1) as writer:
+        writer.write_many(events)
+    assert len(writer.paths) == len(events)
+
+
+def test_sizes_count_encoded_bytes(tmp_path: Path, raw: dict) -> None:
+    raw["summary"] = "\u00e9t\u00e9 \u2603"
+    line = json.dumps(raw, ensure_ascii=False)
+    template = str(tmp_path / "events-{index}.ndjson")
+    size = len(line.encode("utf-8")) + 1
+    with EventWriter(template, max_bytes=2 * size) as writer:
+        for _ in range(4):
+            writer.write_line(line)
+    assert writer.bytes_written == 4 * size
+    assert [os.path.getsize(path) for path in writer.paths] == [2 * size] * 2
+
+
+def test_rotation_requires_placeholder(tmp_path: Path) -> None:
+    with pytest.raises(ValueError, match="placeholder"):
+        EventWriter(tmp_path / "events.ndjson", max_events=10)
+
+
+def test_append_concatenates_gzip_members(
+    tmp_path: Path, events: list[L9Event]
+) -> None:
+    path = tmp_path / "events.ndjson.gz"
+    with EventWriter(path) as writer:
+        writer.write_many(events[:2])
+    with EventWriter(path, append=True) as writer:
+        writer.write_many(events[2:])
+    assert list(read_events(path)) == events
+
+
+def test_close_is_idempotent_and_final(tmp_path: Path, event: L9Event) -> None:
+    writer = EventWriter(tmp_path / "events.ndjson")
+    writer.write(event)
+    writer.close()
+    writer.close()
+    with pytest.raises(ValueError):
+        writer.write(event)
+    assert writer.events_written == 1
+
+
+@pytest.mark.parametrize("name", ["events.ndjson", "events.ndjson.gz"])
+def test_empty_stream_truncates_output(
+    tmp_path: Path, name: str, event: L9Event
+) -> None:
+    path = tmp_path / name
+    with EventWriter(path) as writer:
+        writer.write(event)
+    with EventWriter(path):
+        pass
+    assert list(read_events(path)) == []
+    with EventWriter(tmp_path / "{index}.ndjson", max_events=1) as writer:
+        pass
+    assert writer.paths == [str(tmp_path / "0.ndjson")]
+    assert (tmp_path / "0.ndjson").read_bytes() == b""
+
+
+needs_sigusr1 = pytest.mark.skipif(
+    not hasattr(signal, "SIGUSR1"), reason="needs SIGUSR1"
+)
+
+
+@pytest.fixture
+def sigusr1() -> Iterator[list[int]]:
+    received: list[int] = []
+    previous = signal.signal(
+        signal.SIGUSR1, lambda num, frame: received.append(num)
+    )
+    try:
+        yield received
+    finally:
+        signal.signal(signal.SIGUSR1, previous)
+
+
+@needs_sigusr1
+def test_signal_while_idle_closes(tmp_path: Path, sigusr1: list[int]) -> None:
+    chained = signal.getsignal(signal.SIGUSR1)
+    path = tmp_path / "events.ndjson"
+    writer = EventWriter(path)
+    writer.handle_signals([signal.SIGUSR1])
+    writer.write_line('{"a": 1}')
+    signal.raise_signal(signal.SIGUSR1)
+    assert sigusr1 == [signal.SIGUSR1]
+    assert signal.getsignal(signal.SIGUSR1) is chained
+    with pytest.raises(ValueError):
+        writer.write_line('{"a": 2}')
+    assert path.read_text() == '{"a": 1}\n'
+
+
+@needs_sigusr1
+def test_signal_during_write_is_deferred(
+    tmp_path: Path, sigusr1: list[int], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    path = tmp_path / "events.ndjson"
+    writer = EventWriter(path, buffer_size=1)
+    writer.handle_signals([signal.SIGUSR1])
+    write_buffer = writer._write_buffer
+    states = []
+
+    def interrupted() -> None:
+        if not states:
+            signal.raise_signal(signal.SIGUSR1)
+            # The handler ran, but the writer is still mid-call.
+            states.append((writer._closed, list(sigusr1)))
+        write_buffer()
+
+    monkeypatch.setattr(writer, "_write_buffer", interrupted)
+    writer.write_line('{"a": 1}')
+    assert states[0] == (False, [])
+    assert writer._closed and sigusr1 == [signal.SIGUSR1]
+    assert path.read_text() == '{"a": 1}\n'
+
+
+def test_partition_by_field(tmp_path: Path, events: list[L9Event]) -> None:
+    template = str(tmp_path / "protocol={partition}.ndjson.gz")
+    with PartitionedWriter(template, "protocol") as writer:
+        writer.write_many(events)
+    assert set(writer.paths) == {"https", "_"}
+    for partition, path in writer.paths.items():
+        decoded = list(read_events(path))
+        assert decoded == [
+            e for e in events if writer.partition_of(e) == partition
+        ]
+        assert writer.counts[partition] == len(decoded)
+
+
+def test_partition_nested_field_and_callable(
+    tmp_path: Path, events: list[L9Event]
+) -> None:
+    template = str(tmp_path / "{partition}.ndjson")
+    with PartitionedWriter(template, "geoip.country_iso_code") as writer:
+        writer.write_many(events)
+    assert sum(writer.counts.values()) == len(events)
+
+    with PartitionedWriter(template, lambda e: e.port) as writer:
+        writer.write_many(events)
+    assert set(writer.paths) == {e.port for e in events}
+
+
+def test_partition_lru_reopens_in_append_mode(
+    tmp_path: Path, events: list[L9Event]
+) -> None:
+    events = events * 3
+    template = str(tmp_path / "port-{partition}.ndjson.gz")
+    with PartitionedWriter(template, "port", max_open=1) as writer:
+        writer.write_many(events)
+        assert len(writer._writers) == 1
+    for port, path in writer.paths.items():
+        decoded = list(read_events(path))
+        assert decoded == [e for e in events if e.port == port]
+
+
+def test_partition_hash_buckets(tmp_path: Path, events: list[L9Event]) -> None:
+    template = str(tmp_path / "bucket-{partition}.ndjson")
+    with PartitionedWriter(template, "ip", buckets=4) as writer:
+        writer.write_many(events)
+    assert set(writer.paths) <= {"0", "1", "2", "3"}
+    again = PartitionedWriter(template, "ip", buckets=4)
+    assert [again.partition_of(e) for e in events] == [
+        writer.partition_of(e) for e in events
+    ]
+
+
+def test_partition_names_are_sanitized(tmp_path: Path, event: L9Event) -> None:
+    template = str(tmp_path / "{partition}.ndjson")
+    writer = PartitionedWriter(template, lambda e: "../etc/passwd")
+    assert "/" not in writer.partition_of(event)
+    writer = PartitionedWriter(template, lambda e: None)
+    assert writer.partition_of(event) == "_none"
+
+
+def test_partition_name_collisions_raise(
+    tmp_path: Path, event: L9Event
+) -> None:
+    template = str(tmp_path / "{partition}.ndjson")
+    with PartitionedWriter(template, "host") as writer:
+        assert writer.write(event.evolve(host="a/b")) == "a_b"
+        assert writer.write(event.evolve(host="a/b")) == "a_b"
+        with pytest.raises(ValueError, match="both map to 'a_b'"):
+            writer.write(event.evolve(host="a_b"))
+        writer.write(event.evolve(host=None))
+        with pytest.raises(ValueError, match="'_none'"):
+            writer.partition_of_key("_none")
+    assert writer.counts == {"a_b": 2, "_none": 1}
+    with PartitionedWriter(template, "host", buckets=1) as writer:
+        writer.write(event.evolve(host="a/b"))
+        writer.write(event.evolve(host="a_b"))
+    assert writer.counts == {"0": 2}
@@ -0,0 +1,112 @@
+"""
+Tests for the trigram index of text fields.
+"""
+
+import random
+from pathlib import Path
+
+import pytest
+
+from l9format import L9Event
+from l9format.ngram import TrigramIndex
+
+BANNERS = [
+    "SSH-2.0-OpenSSH_7.4",
+    "SSH-2.0-OpenSSH_8.9p1 Ubuntu-3ubuntu0.1",
+    "SSH-2.0-dropbear_2019.78",
+    "220 ProFTPD 1.3.5 Server",
+    "220 (vsFTPd 3.0.3)",
+    "Straße",
+    "",
+]
+
+
+def records(count: int) -> list[dict]:
+    rng = random.Random(0)
+    result = []
+    for i in range(count):
+        record: dict = {"ssh": {}, "http": {}}
+        if i % 3:
+            record["ssh"]["banner"] = rng.choice(BANNERS)
+        if i % 4 == 0:
+            record["http"]["title"] = rng.choice(["Index of /", "Login", None])
+        result.append(record)
+    return result
+
+
+def scan(items: list[dict], query: str, prefix: bool = False) -> list[int]:
+    query = query.casefold()
+    rows = []
+    for i, record in enumerate(items):
+        for value in (record["ssh"].get("banner"), record["http"].get("title")):
+            if not value:
+                continue
+            value = value.casefold()
+            if value.startswith(query) if prefix else query in value:
+                rows.append(i)
+                break
+    return rows
+
+
+@pytest.mark.parametrize(
+    "query",
+    ["openssh", "OpenSSH_7", "2.0-", "ftp", "o", "of /", "strasse", "x"],
+)
+def test_search_matches_scan(query: str) -> None:
+    items = records(300)
+    index = TrigramIndex(["ssh.banner", "http.title"])
+    index.extend(items)
+    assert len(index) == 300
+    assert index.search(query) == scan(items, query)
+
+
+@pytest.mark.parametrize("query", ["ssh-2.0-o", "220 ", "2", "Login", "index"])
+def test_prefix_matches_scan(query: str) -> None:
+    items = records(300)
+    index = TrigramIndex(["ssh.banner", "http.title"])
+    index.extend(items)
+    assert index.prefix(query) == scan(items, query, prefix=True)
+
+
+def test_fields_and_case() -> None:
+    index = TrigramIndex(["ssh.banner", "http.title"], case_sensitive=True)
+    index.add({"ssh": {"banner": "Login"}})
+    index.add({"http": {"title": "Login page"}})
+    assert index.search("Login") == [0, 1]
+    assert index.search("login") == []
+    assert index.search("Login", fields=["http.title"]) == [1]
+    with pytest.raises(ValueError, match="not indexed"):
+        index.search("x", fields=["ftp.banner"])
+    with pytest.raises(ValueError, match="has no field"):
+        TrigramIndex(["ssh.nope"])
+
+
+def test_models(raw: dict) -> None:
+    events = [
+        L9Event.from_dict(dict(raw, summary=f"service number {i}"))
+        for i in range(5)
+    ]
+    index = TrigramIndex()
+    index.extend(events)
+    assert index.search("number 3") == [3]
+    assert index.prefix("SERVICE") == [0, 1, 2, 3, 4]
+
+
+def test_save_and_load(tmp_path: Path) -> None:
+    items = records(200)
+    index = TrigramIndex(["ssh.banner", "http.title"])
+    index.extend(items)
+    path = tmp_path / "index.l9ngram"
+    index.save(path)
+    loaded = TrigramIndex.load(path)
+    assert loaded.fields == index.fields
+    for query in ("openssh", "ftp", "of /"):
+        assert loaded.search(query) == index.search(query)
+    # Rows added after loading extend the posting lists read from disk.
+    extra = {"ssh": {"banner": "SSH-2.0-OpenSSH_9.0"}, "http": {}}
+    assert loaded.add(extra) == 200
+    assert loaded.search("openssh") == scan([*items, extra], "openssh")
+    bad = tmp_path / "bad"
+    bad.write_bytes(b"nope")
+    with pytest.raises(ValueError, match="not a trigram index"):
+        TrigramIndex.load(bad)
@@ -0,0 +1,68 @@
+"""
+Tests for compact pickling of models and batches.
+"""
+
+import copy
+import pickle
+
+import pytest
+
+from l9format import (
+    HeaderMap,
+    L9Event,
+    L9HttpEvent,
+    Software,
+    SoftwareModule,
+)
+from l9format.pickling import dumps_batch, loads_batch
+
+
+@pytest.mark.parametrize("retain_raw", [False, True])
+def test_model_round_trip(retain_raw: bool, raws: list[dict]) -> None:
+    for raw in raws:
+        event = L9Event.from_dict(raw, retain_raw=retain_raw)
+        event.ip_int
+        for protocol in range(2, pickle.HIGHEST_PROTOCOL + 1):
+            loaded = pickle.loads(pickle.dumps(event, protocol))
+            assert loaded == event
+            assert loaded.to_json() == event.to_json()
+            assert not any(k.startswith("_l9") for k in vars(loaded))
+    assert copy.copy(event) == event
+    assert copy.deepcopy(event) == event
+
+
+def test_payload_is_positional(event: L9Event) -> None:
+    data = pickle.dumps(event)
+    assert b"favicon_hash" not in data
+    assert len(data) < len(pickle.dumps(event.to_dict()))
+
+
+def test_header_layouts_survive_pickling() -> None:
+    a = L9HttpEvent(header=HeaderMap({"Server": "nginx", "Date": "now"}))
+    b = L9HttpEvent(header=HeaderMap({"Server": "apache", "Date": "then"}))
+    a2, b2 = pickle.loads(pickle.dumps([a, b]))
+    assert (a2, b2) == (a, b)
+    assert a2.header._layout is a.header._layout
+    assert b2.header._layout is a.header._layout
+
+
+def test_batch_round_trip(raws: list[dict]) -> None:
+    events = [L9Event.from_dict(raw) for raw in raws * 3]
+    events[1] = events[1].evolve(http=None, ssl=None)
+    events[2] = events[2].evolve(
+        service=events[2].service.evolve(
+            software=Software(
+                name="x", modules=[SoftwareModule(name="m"), None]  # type: ignore[list-item]
+            )
+        )
+    )
+    mixed = [*events, Software(name="other")]
+    data = dumps_batch(mixed)
+    assert loads_batch(data) == mixed
+    assert len(data) < len(pickle.dumps(mixed, pickle.HIGHEST_PROTOCOL))
+    assert loads_batch(dumps_batch([])) == []
+
+
+def test_batch_rejects_other_payloads() -> None:
+    with pytest.raises(ValueError):
+        loads_batch(pickle.dumps([1, 2]))
@@ -0,0 +1,155 @@
+"""
+Tests for from_dict(retain_raw=True): unmodified subtrees are re-emitted
+from their retained form, and the output always equals a fresh to_dict().
+"""
+
+import copy
+import json
+from typing import Any, Callable
+
+import pytest
+
+from l9format import L9Aggregation, L9Event, Software, SoftwareModule
+from l9format.encoder import dumps
+
+
+@pytest.fixture
+def sample(raw: dict) -> dict:
+    """The sample event, as the scanners write it, with a software
+    module."""
+    raw["service"]["software"]["modules"] = [
+        {"name": "PHP", "version": "8.2.0", "fingerprint": "php"}
+    ]
+    return raw
+
+
+@pytest.fixture
+def canonical(sample: dict) -> dict:
+    """The sample event in the form ``to_json()`` writes."""
+    return json.loads(L9Event.from_dict(sample).to_json())
+
+
+def decode_both(raw: dict) -> tuple[Any, Any]:
+    return (
+        L9Event.from_dict(copy.deepcopy(raw)),
+        L9Event.from_dict(copy.deepcopy(raw), retain_raw=True),
+    )
+
+
+def assert_same_output(fresh: Any, retained: Any) -> None:
+    assert retained.to_dict() == fresh.to_dict()
+    assert retained.to_json() == fresh.to_json()
+    assert dumps(retained) == fresh.to_json()
+
+
+def test_unmodified_event_reuses_retained_dict(canonical: dict) -> None:
+    fresh, retained = decode_both(canonical)
+    first = retained.to_dict()
+    assert retained.to_dict() is first
+    assert first == fresh.to_dict()
+    assert list(first) == list(fresh.to_dict())
+    assert_same_output(fresh, retained)
+
+
+def test_only_changed_path_is_rebuilt(canonical: dict) -> None:
+    _, retained = decode_both(canonical)
+    before = retained.to_dict()
+    retained.tags.append("honeypot")
+    after = retained.to_dict()
+    assert after is not before
+    assert after["tags"] == ["plc", "honeypot"]
+    assert after["http"] is before["http"]
+    assert after["ssl"] is before["ssl"]
+
+
+MUTATIONS: list[Callable[[Any], Any]] = [
+    lambda e: e.tags.append("x"),
+    lambda e: e.http.header.update({"X-New": "1"}),
+    lambda e: setattr(e.ssl.certificate, "valid", True),
+    lambda e: e.ssl.certificate.domain.append("c.example.com"),
+    lambda e: setattr(e, "time", e.ssl.certificate.not_before),
+    lambda e: setattr(e, "leak", None),
+    lambda e: setattr(e.geoip.location, "lat", e.geoip.location.lon),
+    lambda e: e.service.software.modules.append(SoftwareModule(name="x")),
+    lambda e: setattr(e.service.software.modules[0], "version", "9"),
+    lambda e: setattr(e.service, "software", Software(name="nginx")),
+]
+
+
+@pytest.mark.parametrize("source", ["sample", "canonical"])
+@pytest.mark.parametrize("mutate", MUTATIONS)
+def test_mutations_match_fresh_encoding(
+    mutate: Callable[[Any], Any], source: str, request: pytest.FixtureRequest
+) -> None:
+    fresh, retained = decode_both(request.getfixturevalue(source))
+    mutate(fresh)
+    mutate(retained)
+    assert_same_output(fresh, retained)
+
+
+def test_evolved_copies_match_fresh_encoding(canonical: dict) -> None:
+    fresh, retained = decode_both(canonical)
+    change = {"ssl.certificate.cn": "other", "port": "1"}
+    assert_same_output(
+        fresh.with_changes(change), retained.with_changes(change)
+    )
+    assert_same_output(fresh, retained)
+
+
+def test_raw_samples_are_retained(raws: list[dict]) -> None:
+    for raw in raws:
+        fresh = L9Event.from_dict(copy.deepcopy(raw))
+        retained = L9Event.from_dict(raw, retain_raw=True)
+        encoded = retained.to_dict()
+        assert retained.to_dict() is encoded
+        assert encoded is retained.__dict__["_l9_retained"].encoded
+        assert encoded["event_pipeline"] is raw["event_pipeline"]
+        # Times with nanoseconds are serialized once, when decoding.
+        assert encoded["time"] != raw["time"]
+        assert_same_output(fresh, retained)
+
+
+def test_non_canonical_leaves_are_serialized_once(sample: dict) -> None:
+    fresh, retained = decode_both(sample)
+    before = retained.to_dict()
+    assert before["time"] == "0001-01-01T00:00:00+00:00" != sample["time"]
+    assert before["geoip"]["location"] == {"lat": "0.0", "lon": "0.0"}
+    retained.summary = "changed"
+    fresh.summary = "changed"
+    after = retained.to_dict()
+    assert after is not before
+    assert after["time"] is before["time"]
+    for name in ("http", "ssl", "service", "geoip", "network"):
+        assert after[name] is before[name], name
+    assert_same_output(fresh, retained)
+
+
+def test_aggregation_events(canonical: dict) -> None:
+    raw = {
+        "ip": "127.0.0.1",
+        "resource_id": "r",
+        "open_ports": ["80"],
+        "leak_count": 0,
+        "leak_event_count": 0,
+        "events": [canonical, copy.deepcopy(canonical)],
+        "plugins": [],
+        "geoip": canonical["geoip"],
+        "network": canonical["network"],
+        "creation_date": canonical["time"],
+        "update_date": canonical["time"],
+        "fresh": False,
+    }
+    fresh = L9Aggregation.from_dict(copy.deepcopy(raw))
+    retained = L9Aggregation.from_dict(copy.deepcopy(raw), retain_raw=True)
+    assert retained.to_dict() is retained.to_dict()
+    assert_same_output(fresh, retained)
+    for agg in (fresh, retained):
+        agg.events[1].port = "1"
+        agg.events.append(agg.events[0])
+    assert_same_output(fresh, retained)
+
+
+def test_from_json_retain_raw(canonical: dict) -> None:
+    text = L9Event.from_dict(canonical).to_json()
+    event = L9Event.from_json(text, retain_raw=True)
+    assert event.to_json() == text
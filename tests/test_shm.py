@@ -0,0 +1,102 @@
+"""
+Tests for passing batches through shared memory.
+"""
+
+import multiprocessing
+import subprocess
+import sys
+import time
+from multiprocessing import shared_memory
+
+import pytest
+
+from l9format import L9Event
+from l9format.shm import BatchHandle, SegmentRing, SharedBatch
+
+
+def test_write_and_read(events: list[L9Event]) -> None:
+    with SegmentRing(segments=2, segment_size=1 << 20) as ring:
+        handle = ring.write(events)
+        assert handle.records == len(events)
+        assert ring.free == 1
+        with SharedBatch(handle) as batch:
+            assert len(batch) == len(events)
+            assert list(batch) == events
+            assert batch[-1] == events[-1]
+            assert batch[1:3] == events[1:3]
+            with batch.raw(0) as record:
+                assert isinstance(record, memoryview)
+            with pytest.raises(IndexError):
+                batch[len(events)]
+        assert ring.free == 1
+        SharedBatch(handle).release()
+        assert ring.free == 2
+        with pytest.raises(ValueError):
+            SharedBatch(handle)
+        empty = ring.write([])
+        assert list(SharedBatch(empty)) == []
+
+
+def test_segments_are_reused(events: list[L9Event]) -> None:
+    with SegmentRing(segments=2, segment_size=1 << 20) as ring:
+        first = ring.write(events[:2])
+        second = ring.write(events[2:])
+        assert first.name != second.name
+        with pytest.raises(TimeoutError):
+            ring.write(events, timeout=0.01)
+        SharedBatch(first).release()
+        third = ring.write(events)
+        assert third.name == first.name
+        assert third.generation > first.generation
+        with pytest.raises(ValueError):
+            SharedBatch(first)
+        assert list(SharedBatch(third)) == events
+        with pytest.raises(ValueError):
+            ring.write(events * 1000)
+
+
+def read_in_child(handle: BatchHandle, queue: "multiprocessing.Queue") -> None:
+    with SharedBatch(handle) as batch:
+        queue.put([event.to_json() for event in batch])
+        batch.release()
+
+
+def test_cross_process(events: list[L9Event]) -> None:
+    if "fork" not in multiprocessing.get_all_start_methods():
+        pytest.skip("needs the fork start method")
+    context = multiprocessing.get_context("fork")
+    with SegmentRing(segments=1, segment_size=1 << 20) as ring:
+        handle = ring.write(events)
+        queue = context.Queue()
+        process = context.Process(target=read_in_child, args=(handle, queue))
+        process.start()
+        assert queue.get(timeout=30) == [e.to_json() for e in events]
+        process.join(30)
+        assert process.exitcode == 0
+        assert ring.free == 1
+        assert list(SharedBatch(ring.write(events))) == events
+
+
+def test_unrelated_reader_keeps_segment(events: list[L9Event]) -> None:
+    with SegmentRing(segments=1, segment_size=1 << 20) as ring:
+        handle = ring.write(events)
+        code = (
+            "import sys\n"
+            "from l9format.shm import BatchHandle, SharedBatch\n"
+            "name, generation, records = sys.argv[1:]\n"
+            "handle = BatchHandle(name, int(generation), int(records))\n"
+            "with SharedBatch(handle) as batch:\n"
+            "    print(len(list(batch)))\n"
+            "    batch.release()\n"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", code, *map(str, handle)],
+            capture_output=True,
+            text=True,
+            timeout=60,
+        )
+        assert result.stdout.strip() == str(len(events)), result.stderr
+        # The reader's resource tracker, if any, has had time to exit.
+        time.sleep(0.5)
+        assert list(SharedBatch(ring.write(events))) == events
+        shared_memory.SharedMemory(handle.name).close()
@@ -0,0 +1,97 @@
+"""
+Tests for the SQLite event store.
+"""
+
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+from l9format import L9Event
+from l9format.ndjson import EventWriter
+from l9format.sqlite import EventStore
+
+
+def test_round_trip(events: list[L9Event]) -> None:
+    events.append(events[1].evolve(http=None, geoip=None))
+    with EventStore() as store:
+        assert store.insert_many(events, batch_size=4) == len(events)
+        assert len(store) == len(events)
+        assert list(store) == events
+
+
+def test_table_layout() -> None:
+    store = EventStore()
+    columns = {
+        row[1]: row[2]
+        for row in store.connection.execute('PRAGMA table_info("events")')
+    }
+    assert columns["ip"] == "TEXT"
+    assert columns["mac"] == "TEXT"
+    assert columns["http.status"] == "INTEGER"
+    assert columns["service.software.name"] == "TEXT"
+    assert columns["geoip.country_iso_code"] == "TEXT"
+    assert columns["redis"] == "TEXT"
+    assert "redis.version" not in columns
+    indexes = {
+        row[1]
+        for row in store.connection.execute('PRAGMA index_list("events")')
+    }
+    assert "events_ip_idx" in indexes
+
+
+def test_query_and_select(events: list[L9Event]) -> None:
+    store = EventStore(indexes=())
+    store.insert_many(events)
+    store.create_indexes(["http.status"])
+    https = list(store.query(f"{store.column('protocol')} = ?", ("https",)))
+    assert https == [e for e in events if e.protocol == "https"]
+    assert store.count('"http.status" = ?', (200,)) == sum(
+        e.http.status == 200 for e in events
+    )
+    rows = list(
+        store.select(
+            ["ip", "time", "http", "http.status", "tags"],
+            order_by="id",
+            limit=2,
+        )
+    )
+    assert rows == [
+        (e.ip, e.time, True, e.http.status, e.tags) for e in events[:2]
+    ]
+    assert isinstance(rows[0][1], datetime)
+
+
+def test_json_columns_are_queryable(events: list[L9Event]) -> None:
+    store = EventStore()
+    store.insert_many(events)
+    with_tags = list(store.query("json_array_length(tags) > 0"))
+    assert with_tags == [e for e in events if e.tags]
+    ssl = list(
+        store.select(["ssl"], "json_extract(ssl, '$.enabled') = 1", limit=1)
+    )
+    assert ssl and ssl[0][0].enabled is True
+
+
+def test_invalid_column() -> None:
+    store = EventStore()
+    with pytest.raises(ValueError):
+        store.column("redis.version")
+    with pytest.raises(ValueError):
+        EventStore(indexes=["nope"])
+
+
+def test_load_ndjson_into_existing_connection(
+    tmp_path: Path, events: list[L9Event]
+) -> None:
+    path = tmp_path / "events.ndjson.gz"
+    with EventWriter(path) as writer:
+        writer.write_many(events)
+    connection = sqlite3.connect(tmp_path / "events.db")
+    with EventStore(connection, table="scan") as store:
+        assert store.load_ndjson(path, batch_size=2) == len(events)
+    reopened = EventStore(tmp_path / "events.db", table="scan")
+    assert list(reopened) == events
+    reopened.close()
+    connection.close()
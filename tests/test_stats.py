@@ -0,0 +1,143 @@
+"""
+Tests for the streaming sketches and field statistics.
+"""
+
+import json
+import pickle
+import random
+from collections import Counter
+
+import pytest
+
+from l9format import L9Event
+from l9format.stats import CountMinSketch, FieldStats, HyperLogLog, SpaceSaving
+
+
+def zipf_stream(n: int, seed: int = 0) -> list[int]:
+    rng = random.Random(seed)
+    return [int(rng.paretovariate(1.1)) for _ in range(n)]
+
+
+def test_space_saving_exact_below_capacity() -> None:
+    summary = SpaceSaving(10)
+    for value in "abracadabra":
+        summary.add(value)
+    assert summary.top(2) == [("a", 5, 0), ("b", 2, 0)]
+    assert summary.total == 11
+    assert len(summary) == 5
+
+
+def test_space_saving_bounds() -> None:
+    values = zipf_stream(50000)
+    exact = Counter(values)
+    summary = SpaceSaving(50)
+    for value in values:
+        summary.add(value)
+    assert len(summary) == 50
+    for item in summary.top():
+        assert item.estimate - item.error <= exact[item.value] <= item.estimate
+    # Every value above total / capacity is kept.
+    heavy = {v for v, c in exact.items() if c > len(values) / 50}
+    assert heavy <= {item.value for item in summary.top()}
+    assert [i.value for i in summary.top(5)] == [
+        v for v, _ in exact.most_common(5)
+    ]
+
+
+def test_space_saving_merge() -> None:
+    values = zipf_stream(40000, seed=1)
+    exact = Counter(values)
+    merged = SpaceSaving(50)
+    other = SpaceSaving(50)
+    for value in values[:20000]:
+        merged.add(value)
+    for value in values[20000:]:
+        other.add(value)
+    merged.merge(other)
+    assert merged.total == len(values)
+    assert len(merged) == 50
+    for item in merged.top():
+        assert item.estimate - item.error <= exact[item.value] <= item.estimate
+    assert [i.value for i in merged.top(3)] == [
+        v for v, _ in exact.most_common(3)
+    ]
+
+
+def test_hyperloglog() -> None:
+    sketch = HyperLogLog()
+    for i in range(20000):
+        sketch.add(f"10.0.{i // 256}.{i % 256}")
+        sketch.add(f"10.0.{i // 256}.{i % 256}")
+    assert abs(sketch.count() - 20000) < 20000 * 0.03
+    small = HyperLogLog()
+    for i in range(100):
+        small.add(i)
+    assert small.count() == 100
+    other = HyperLogLog()
+    for i in range(50, 150):
+        other.add(i)
+    small.merge(other)
+    assert small.count() == 150
+    with pytest.raises(ValueError):
+        small.merge(HyperLogLog(10))
+
+
+def test_count_min() -> None:
+    values = zipf_stream(20000, seed=2)
+    exact = Counter(values)
+    sketch = CountMinSketch(width=512, depth=4)
+    for value in values:
+        sketch.add(value)
+    for value, count in exact.items():
+        assert count <= sketch.estimate(value) <= count + 200
+    twice = CountMinSketch(width=512, depth=4)
+    twice.merge(sketch)
+    twice.merge(sketch)
+    assert twice.estimate(1) == 2 * sketch.estimate(1)
+    assert twice.total == 2 * len(values)
+    with pytest.raises(ValueError):
+        twice.merge(CountMinSketch(width=256))
+
+
+def test_field_stats(raw: dict) -> None:
+    stats = FieldStats(
+        top=["port", "service.software.name,service.software.version"],
+        distinct=["ip"],
+        counts=["port"],
+    )
+    for i in range(20):
+        raw["port"] = str(i % 3)
+        raw["ip"] = f"10.0.0.{i}"
+        event = L9Event.from_dict(raw)
+        # Models and raw objects give the same values.
+        stats.add(event if i % 2 else raw)
+    assert stats.records == 20
+    assert stats.top("port", 2) == [("0", 7, 0), ("1", 7, 0)]
+    software = stats.top("service.software.name,service.software.version")
+    assert software == [(("Apache", "2.2.4"), 20, 0)]
+    assert stats.distinct("ip") == 20
+    assert stats.estimate("port", "2") == 6
+
+
+def test_field_stats_lists_and_nulls() -> None:
+    stats = FieldStats(top=["tags", "geoip.city_name"])
+    stats.update([{"tags": ["a", "b"]}, {"tags": ["a"]}, {"tags": None}])
+    assert stats.top("tags") == [("a", 2, 0), ("b", 1, 0)]
+    assert stats.top("geoip.city_name") == []
+
+
+def test_field_stats_checkpoint_and_merge() -> None:
+    stats = FieldStats(top=["a"], distinct=["a"], counts=["a"], capacity=5)
+    stats.update({"a": i % 7} for i in range(100))
+    stats.update({"a": ["x", "y"]} for _ in range(3))
+    restored = FieldStats.from_dict(json.loads(json.dumps(stats.to_dict())))
+    assert restored.to_dict() == stats.to_dict()
+    unpickled = pickle.loads(pickle.dumps(stats))
+    unpickled.add({"a": 0})
+    assert unpickled.records == 104
+    restored.merge(stats)
+    assert restored.records == 206
+    assert restored.distinct("a") == 9
+    assert restored.estimate("a", 0) == 2 * stats.estimate("a", 0)
+    with pytest.raises(ValueError):
+        restored.merge(FieldStats(top=["b"]))
@@ -0,0 +1,154 @@
+"""
+Tests for the tag dictionary, bitmaps and tag filters.
+"""
+
+import random
+import sys
+from pathlib import Path
+from typing import Optional, Sequence
+
+import pytest
+
+from l9format import L9Event
+from l9format.filter import field
+from l9format.ndjson import EventWriter, read_events
+from l9format.tagindex import TagDictionary, TagIndex, tag_filter
+
+TAGS = ["honeypot", "cve-2021-44228", "tor", "cdn", "scanner"]
+
+
+def random_tags(count: int) -> list[Optional[list[str]]]:
+    rng = random.Random(0)
+    result: list[Optional[list[str]]] = [None, []]
+    for _ in range(count):
+        result.append(rng.sample(TAGS, rng.randrange(len(TAGS))))
+    return result
+
+
+def expected(
+    tags: Optional[list[str]],
+    all_of: Sequence[str] = (),
+    any_of: Sequence[str] = (),
+    none_of: Sequence[str] = (),
+) -> bool:
+    """The answer of a scan of the tag list."""
+    tags = tags or []
+    return (
+        all(tag in tags for tag in all_of)
+        and (not any_of or bool(set(any_of) & set(tags)))
+        and not set(none_of) & set(tags)
+    )
+
+
+def test_dictionary_grows() -> None:
+    dictionary = TagDictionary(["a"])
+    old = dictionary.encode(["a"])
+    both = dictionary.encode(["b", "a"])
+    assert dictionary.tags == ["a", "b"]
+    assert "b" in dictionary and "c" not in dictionary
+    assert dictionary.encode(["c"], grow=False) == 0
+    assert len(dictionary) == 2
+    # Bitmaps encoded before a tag was added stay valid.
+    query = dictionary.query(all_of=["a"], none_of=["b"])
+    assert query.matches(old) and not query.matches(both)
+    assert dictionary.decode(both) == ["a", "b"]
+    assert dictionary.encode(None) == 0
+
+
+def test_unknown_tags_in_queries() -> None:
+    dictionary = TagDictionary(["a"])
+    bits = dictionary.encode(["a"])
+    assert not dictionary.query(all_of=["a", "zz"]).matches(bits)
+    assert not dictionary.query(any_of=["zz"]).matches(bits)
+    assert dictionary.query(any_of=["a", "zz"]).matches(bits)
+    assert dictionary.query(none_of=["zz"]).matches(bits)
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        {"all_of": ("honeypot", "cve-2021-44228")},
+        {"any_of": ("tor", "cdn")},
+        {"none_of": ("scanner",)},
+        {
+            "all_of": ("honeypot",),
+            "any_of": ("tor", "cdn"),
+            "none_of": ("scanner",),
+        },
+        {},
+    ],
+)
+def test_select_matches_list_scan(query: dict) -> None:
+    tags = random_tags(300)
+    index = TagIndex()
+    for t in tags:
+        index.add_tags(t)
+    rows = [i for i, t in enumerate(tags) if expected(t, **query)]
+    assert index.select(**query) == rows
+    assert index.count(**query) == len(rows)
+    assert index.select(query=index.dictionary.query(**query)) == rows
+    assert sorted(index.tags(2)) == sorted(tags[2])
+
+
+def test_numpy_rows() -> None:
+    np = pytest.importorskip("numpy")
+    tags = random_tags(200)
+    index = TagIndex()
+    for t in tags:
+        index.add_tags(t)
+    bits = index.to_numpy()
+    assert bits.dtype == np.uint64
+    for query in ({"all_of": ("honeypot", "tor")}, {"any_of": ("cdn",)}):
+        q = index.dictionary.query(**query)
+        mask = q.matches_array(bits)
+        assert list(np.flatnonzero(mask)) == index.select(**query)
+    impossible = index.dictionary.query(all_of=["nope"])
+    assert not impossible.matches_array(bits).any()
+    wide = TagIndex()
+    wide.add_tags([str(i) for i in range(65)])
+    with pytest.raises(ValueError):
+        wide.to_numpy()
+
+
+def test_numpy_missing(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setitem(sys.modules, "numpy", None)
+    index = TagIndex()
+    index.add_tags(["tor"])
+    with pytest.raises(ImportError, match="to_numpy"):
+        index.to_numpy()
+    with pytest.raises(ImportError, match="matches_array"):
+        index.dictionary.query(all_of=["tor"]).matches_array([1])
+
+
+@pytest.fixture
+def tagged(raw: dict) -> list[dict]:
+    """Copies of the sample event with random tags."""
+    return [dict(raw, tags=t) for t in random_tags(40)]
+
+
+def test_index_models_and_raw(tagged: list[dict]) -> None:
+    events = [L9Event.from_dict(r) for r in tagged]
+    from_models = TagIndex()
+    from_models.extend(events)
+    from_raws = TagIndex(from_models.dictionary)
+    from_raws.extend(tagged)
+    assert from_models.rows == from_raws.rows
+    assert from_models.add(events[3]) == len(events)
+
+
+def test_tag_filter(tmp_path: Path, tagged: list[dict]) -> None:
+    events = [L9Event.from_dict(r) for r in tagged]
+    query = {"all_of": ("honeypot",), "none_of": ("tor",)}
+    f = tag_filter(**query)
+    wanted = [expected(r["tags"], **query) for r in tagged]
+    assert [f.matches_raw(r) for r in tagged] == wanted
+    assert [f.matches(e) for e in events] == wanted
+    assert any(wanted) and not all(wanted)
+    path = tmp_path / "events.ndjson"
+    with EventWriter(str(path)) as writer:
+        writer.write_many(events)
+    combined = f & (field("protocol") == events[0].protocol)
+    assert len(list(read_events(path, where=combined))) == sum(wanted)
+    assert not any(tag_filter(any_of=["nope"]).matches(e) for e in events)
+    with pytest.raises(ValueError):
+        tag_filter(all_of=["a"], path="nope")